@@ -0,0 +1,207 @@
+"""
+Benchmark de escalabilidad del proceso con datos sintéticos (ver generar_datos_sinteticos.py).
+
+Para cada tamaño (cantidad de tickets TOA) se generan los archivos de entrada en una carpeta propia y
+se ejecutan, midiendo cada uno con telemetria.py:
+  - combinar_datos_archivos y actualizar_base_datos de TOA, Autin y Autin PR, y la carga de SITIOS.
+  - combinar_tablas (incluye sus merges y clasificar_tickets_autin, que se miden por separado).
+  - convertir_tabla_a_excel de la tabla consolidada.
+  - El análisis de Remedy (remedy_logic.procesar_remedy) con la misma conexión, midiendo cada paso.
+  - La copia local de la base de datos y su publicación (ver copia_local.py).
+
+Al final se muestra una tabla con el tiempo de cada paso por tamaño y el exponente de escalamiento
+(pendiente en escala log-log: 1 es lineal, 2 es cuadrático) y se guardan los resultados en JSON y CSV.
+
+Uso:
+    python benchmark.py --tamanos 10000 100000 1000000 --carpeta C:/temp/benchmark
+"""
+import argparse
+import json
+import math
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+import copia_local
+import funciones as fn
+import telemetria as tm
+import generar_datos_sinteticos as gds
+import remedy_logic
+
+# Profundidad máxima de las mediciones que se incluyen en las curvas (0: pasos del benchmark, 1: sus sub-pasos)
+nivel_max_curvas = 1
+
+
+def medir_carga(carpeta, tabla, conexion, id, nombre):
+    """
+    Carga una fuente de tickets midiendo por separado la lectura y combinación de sus archivos
+    ('combinar_datos_archivos') y la escritura en la base de datos ('actualizar_base_datos').
+
+    Args:
+        carpeta (str): Carpeta de los archivos de la fuente.
+        tabla (str): Tabla de la base de datos.
+        conexion (sqlite3.Connection): Conexión a la base de datos.
+        id (str): Columna identificadora de la tabla.
+        nombre (str): Nombre de la fuente en las mediciones (ej. 'TOA').
+    """
+    archivos = [archivo['nombre'] for archivo in fn.obtener_archivos_excel(carpeta, conexion, tabla)]
+    with tm.medir(f"{nombre}: combinar_datos_archivos") as medicion:
+        df = fn.combinar_datos_archivos(carpeta, archivos)
+        medicion['filas_salida'] = tm.contar_filas(df)
+    if 'Mes' in df.columns:
+        df = df.drop(columns=['Mes'])
+    with tm.medir(f"{nombre}: actualizar_base_datos", filas_entrada=len(df)):
+        fn.actualizar_base_datos(conexion, tabla, df, id)
+
+
+def ejecutar_remedy(conexion, base_path):
+    """
+    Ejecuta el análisis de Remedy con los datos sintéticos y la conexión abierta del benchmark.
+    Sus pasos quedan anidados en la medición 'procesar_remedy'; si falla, se informa y se continúa.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos.
+        base_path (str): Carpeta del proceso.
+    """
+    try:
+        with tm.medir("procesar_remedy"):
+            remedy_logic.procesar_remedy(conexion, base_path)
+    except Exception as e:
+        print(f"❌ El análisis de Remedy terminó con error: {e}")
+
+
+def ejecutar_tamano(carpeta, tickets, semilla=0, remedy=True):
+    """
+    Genera los datos de un tamaño y mide cada paso del proceso sobre ellos.
+
+    Args:
+        carpeta (str): Carpeta donde se generan los datos (se crea una subcarpeta por tamaño).
+        tickets (int): Cantidad de tickets TOA.
+        semilla (int, opcional): Semilla del generador.
+        remedy (bool, opcional): Ejecutar también el análisis de Remedy.
+
+    Returns:
+        dict: Filas generadas de cada fuente y mediciones del proceso.
+    """
+    carpeta_usuario = os.path.join(carpeta, f"tickets_{tickets}")
+    filas = gds.generar(carpeta_usuario, tickets, semilla)
+    base_path = filas['base_path']
+
+    # El proceso toma las rutas de 'fn.base_path'; la cache de Excel se desactiva para medir la lectura real
+    fn.base_path = base_path
+    fn.tamano_max_cache = 0
+    fn.limpiar_planes_conversion()
+    tm.iniciar_ejecucion(f"benchmark_{tickets}")
+
+    print(f"\n▶️Ejecutando el proceso con {tickets} tickets TOA...")
+    base_datos_onedrive = os.path.join(base_path, "tickets_data.db")
+    base_datos = copia_local.preparar(base_datos_onedrive)
+    conexion = copia_local.conectar(base_datos)
+    try:
+        medir_carga(os.path.join(base_path, "TOA base"), "tickets_TOA", conexion, 'Nro_TOA', "TOA")
+        medir_carga(os.path.join(base_path, "Autin base", "Autin Tickets"), "tickets_autin", conexion, 'Task_Id', "Autin")
+        medir_carga(os.path.join(base_path, "Autin base", "Autin PR"), "tickets_pr", conexion, 'Index', "PR")
+        with tm.medir("SITIOS: combinar_datos_sitios"):
+            fn.combinar_datos_sitios(os.path.join(base_path, "DATA", "SITIOS"), "info_sitios", conexion, 'Codigo_Unico')
+        with tm.medir("combinar_tablas"):
+            fn.combinar_tablas(conexion, "tickets_TOA", "tickets_autin", "info_sitios", "tabla_consolidada")
+        with tm.medir("convertir_tabla_a_excel"):
+            fn.convertir_tabla_a_excel("tabla_consolidada", os.path.join(base_path, "ArchivoFinal.xlsx"), conexion)
+        if remedy:
+            print(f"\n▶️Ejecutando el análisis de Remedy con {filas['Remedy']} incidencias...")
+            ejecutar_remedy(conexion, base_path)
+    finally:
+        conexion.close()
+    copia_local.publicar(base_datos, base_datos_onedrive)
+    reporte = tm.generar_reporte()
+    tm.mostrar_resumen()
+    return {'tickets': tickets, 'filas': {k: v for k, v in filas.items() if k != 'base_path'},
+            'segundos': reporte['segundos'], 'memoria_pico_mb': reporte['memoria_pico_mb'],
+            'mediciones': reporte['mediciones']}
+
+
+def calcular_curvas(resultados):
+    """
+    Arma una tabla con el tiempo de cada paso (filas) por tamaño (columnas). Los pasos que se miden
+    varias veces en una ejecución (ej. la lectura de cada archivo) se suman.
+
+    Args:
+        resultados (list): Resultados de 'ejecutar_tamano' para cada tamaño.
+
+    Returns:
+        pd.DataFrame: Segundos por paso y tamaño, con la columna 'exponente' (pendiente log-log
+                      entre el menor y el mayor tamaño con tiempo medido).
+    """
+    filas = []
+    for resultado in resultados:
+        for m in resultado['mediciones']:
+            if m['nivel'] <= nivel_max_curvas:
+                # Las lecturas de cada archivo se agrupan en un solo paso ("lectura")
+                ruta = m['ruta'].rsplit("/", 1)[0] + "/lectura" if m['nombre'].startswith("lectura ") else m['ruta']
+                filas.append({'paso': ruta, 'tickets': resultado['tickets'], 'segundos': m['segundos']})
+    if not filas:
+        return pd.DataFrame()
+    df = pd.DataFrame(filas)
+    # Los pasos se muestran en el orden en que aparecen en las ejecuciones
+    orden = list(dict.fromkeys(df['paso']))
+    curvas = df.pivot_table(index='paso', columns='tickets', values='segundos', aggfunc='sum').reindex(orden)
+
+    def exponente(fila):
+        medidos = fila[fila > 0].dropna()
+        if len(medidos) < 2:
+            return None
+        menor, mayor = medidos.index.min(), medidos.index.max()
+        return round(math.log(medidos[mayor] / medidos[menor]) / math.log(mayor / menor), 2)
+
+    curvas['exponente'] = curvas.apply(exponente, axis=1)
+    return curvas
+
+
+def mostrar_curvas(curvas):
+    """Muestra en consola la tabla de tiempos por paso y tamaño con su exponente de escalamiento."""
+    tamanos = [c for c in curvas.columns if c != 'exponente']
+    print("\nCurvas de escalamiento (segundos por paso; exponente 1 = lineal, 2 = cuadrático):")
+    print(f"\t{'Paso':<70}" + "".join(f"{t:>12}" for t in tamanos) + f"{'Exponente':>11}")
+    for paso, fila in curvas.iterrows():
+        tiempos = "".join(f"{'':>12}" if pd.isna(fila[t]) else f"{fila[t]:>12.2f}" for t in tamanos)
+        exponente = '' if pd.isna(fila['exponente']) else f"{fila['exponente']:.2f}"
+        print(f"\t{paso[:70]:<70}{tiempos}{exponente:>11}")
+
+
+def ejecutar_benchmark(tamanos, carpeta, semilla=0, remedy=True):
+    """
+    Ejecuta el benchmark para cada tamaño y guarda los resultados.
+
+    Args:
+        tamanos (list): Cantidades de tickets TOA a medir (ej. [10000, 100000, 1000000]).
+        carpeta (str): Carpeta donde se generan los datos y se guardan los resultados.
+        semilla (int, opcional): Semilla del generador.
+        remedy (bool, opcional): Ejecutar también el análisis de Remedy.
+
+    Returns:
+        pd.DataFrame: Curvas de escalamiento (ver 'calcular_curvas').
+    """
+    resultados = [ejecutar_tamano(carpeta, tickets, semilla, remedy) for tickets in sorted(tamanos)]
+    curvas = calcular_curvas(resultados)
+    mostrar_curvas(curvas)
+
+    nombre = os.path.join(carpeta, f"benchmark_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    with open(f"{nombre}.json", "w", encoding="utf-8") as archivo:
+        json.dump(resultados, archivo, ensure_ascii=False, indent=2, default=str)
+    curvas.to_csv(f"{nombre}.csv", encoding="utf-8-sig")
+    print(f"\nResultados guardados en: {nombre}.json y {nombre}.csv")
+    return curvas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide cómo escala cada paso del proceso con datos sintéticos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Cantidades de tickets TOA a medir (ej. 10000 100000 1000000).")
+    parser.add_argument("--carpeta", default=os.path.join(tempfile.gettempdir(), "TOA_benchmark"),
+                        help="Carpeta donde se generan los datos y se guardan los resultados.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los números aleatorios.")
+    parser.add_argument("--sin-remedy", action="store_true", help="No ejecutar el análisis de Remedy.")
+    argumentos = parser.parse_args()
+    ejecutar_benchmark(argumentos.tamanos, argumentos.carpeta, argumentos.semilla, not argumentos.sin_remedy)
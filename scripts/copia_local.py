@@ -0,0 +1,254 @@
+"""
+Copia local de trabajo de la base de datos y publicación atómica en OneDrive.
+
+El proceso no trabaja directamente sobre 'tickets_data.db' en la carpeta sincronizada por OneDrive:
+cada escritura obligaría a OneDrive a subir el archivo completo y el acceso aleatorio de SQLite en una
+ruta sincronizada es lento y puede subir archivos a medio escribir. En su lugar:
+
+  1. 'preparar' usa una copia en 'carpeta_bd_local' (fuera de OneDrive), en modo WAL y con las
+     pragmas de 'pragmas_conexion'. La copia se reutiliza si la base de OneDrive no cambió desde la
+     última publicación; si cambió (u otra ejecución falló sin publicar) se vuelve a copiar.
+  2. Las etapas abren sus conexiones con 'conectar'.
+  3. Al terminar una ejecución sin errores, 'publicar' genera una copia consistente con la API de
+     backup de SQLite en un archivo temporal junto a la base de OneDrive y lo reemplaza con
+     'os.replace', por lo que OneDrive solo ve una base completa.
+
+El estado de la copia (huella de la base de OneDrive de la que se copió y si ya se publicó) se guarda
+en un archivo JSON junto a la copia. Con la variable de entorno TOA_BD_LOCAL=0 se trabaja
+directamente sobre la base de OneDrive, como antes.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import telemetria as tm
+
+# Usar una copia local de la base de datos (TOA_BD_LOCAL=0 trabaja directamente sobre OneDrive)
+usar_copia_local = os.environ.get("TOA_BD_LOCAL", "1") != "0"
+
+# Carpeta de las copias locales (fuera de OneDrive, junto a la cache de archivos Excel)
+carpeta_bd_local = os.path.join(os.environ.get("LOCALAPPDATA") or tempfile.gettempdir(), "TOA_proceso", "bd")
+
+# Tamaño de página de la copia local en bytes (se aplica una vez, con VACUUM, si la base usa otro)
+tamano_pagina = 8192
+
+# Pragmas que se aplican a cada conexión: cache de 256 MB (en KB, por eso el signo negativo),
+# tablas e índices temporales en memoria y lectura de la base mediante mapeo en memoria
+pragmas_conexion = {
+    'cache_size': -256 * 1024,
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 1024 ** 2,
+}
+
+# Con WAL basta con sincronizar el disco en cada checkpoint (no en cada transacción)
+sincronizacion_wal = 'NORMAL'
+
+# Intentos y espera (segundos) para reemplazar la base de OneDrive si está bloqueada por la sincronización
+intentos_publicacion = 5
+espera_publicacion = 2
+
+
+def huella_archivo(ruta):
+    """
+    Devuelve la huella (tamaño y fecha de modificación) de un archivo.
+
+    Returns:
+        dict: {'tamano', 'mtime_ns'}, o None si el archivo no existe.
+    """
+    try:
+        info = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return {'tamano': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+def ruta_copia(ruta_origen):
+    """
+    Devuelve la ruta de la copia local de una base de datos. El nombre incluye un hash de la ruta
+    de origen para que bases de distintas carpetas no compartan copia.
+    """
+    nombre, extension = os.path.splitext(os.path.basename(ruta_origen))
+    clave = hashlib.sha1(os.path.abspath(ruta_origen).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(carpeta_bd_local, f"{nombre}_{clave}{extension}")
+
+
+def leer_estado(ruta_local):
+    """Lee el archivo de estado de una copia local (un diccionario vacío si no existe o no es válido)."""
+    try:
+        with open(f"{ruta_local}.sync.json", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado(ruta_local, ruta_origen, estado):
+    """
+    Guarda el estado de una copia local junto con la huella actual de la base de origen.
+
+    Args:
+        ruta_local (str): Ruta de la copia local.
+        ruta_origen (str): Ruta de la base de datos en OneDrive.
+        estado (str): 'en_uso' (copia con cambios sin publicar) o 'publicada'.
+    """
+    datos = {'origen': os.path.abspath(ruta_origen), 'huella_origen': huella_archivo(ruta_origen),
+             'estado': estado, 'fecha': datetime.now().isoformat(timespec='seconds')}
+    ruta_temporal = f"{ruta_local}.sync.json.tmp"
+    with open(ruta_temporal, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    os.replace(ruta_temporal, f"{ruta_local}.sync.json")
+
+
+def eliminar_base(ruta):
+    """Elimina una base de datos SQLite junto con sus archivos -wal y -shm."""
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+
+def copiar_base(ruta_origen, ruta_destino):
+    """
+    Copia una base de datos con la API de backup de SQLite (copia consistente aunque otra conexión
+    la esté usando).
+    """
+    origen = sqlite3.connect(ruta_origen)
+    destino = sqlite3.connect(ruta_destino)
+    try:
+        origen.backup(destino)
+    finally:
+        destino.close()
+        origen.close()
+
+
+def configurar_copia(ruta_local):
+    """
+    Ajusta el tamaño de página de la copia local (con VACUUM, solo si es distinto) y la pasa a modo WAL.
+    Ambos valores quedan guardados en el archivo, por lo que se aplican una sola vez.
+    """
+    conexion = sqlite3.connect(ruta_local)
+    try:
+        if conexion.execute("PRAGMA page_size").fetchone()[0] != tamano_pagina:
+            conexion.execute("PRAGMA journal_mode=DELETE")
+            conexion.execute(f"PRAGMA page_size={tamano_pagina}")
+            conexion.execute("VACUUM")
+        conexion.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conexion.close()
+
+
+def preparar(ruta_origen):
+    """
+    Prepara la base de datos de trabajo de una ejecución.
+
+    La copia local se reutiliza si se publicó en la ejecución anterior y la base de OneDrive no cambió
+    desde entonces. En otro caso (primera ejecución, base modificada desde otro equipo o ejecución
+    anterior con errores) se descarta y se vuelve a copiar desde OneDrive.
+
+    Args:
+        ruta_origen (str): Ruta de la base de datos en OneDrive.
+
+    Returns:
+        str: Ruta de la base de datos con la que debe trabajar el proceso (la de OneDrive si
+             'usar_copia_local' es False).
+    """
+    if not usar_copia_local:
+        return ruta_origen
+
+    ruta_local = ruta_copia(ruta_origen)
+    estado = leer_estado(ruta_local)
+    with tm.medir("copia local de la base de datos"):
+        if (os.path.exists(ruta_local) and estado.get('estado') == 'publicada'
+                and estado.get('huella_origen') == huella_archivo(ruta_origen)):
+            print(f"\tSe usa la copia local de la base de datos: {ruta_local}")
+        else:
+            os.makedirs(carpeta_bd_local, exist_ok=True)
+            eliminar_base(ruta_local)
+            if os.path.exists(ruta_origen):
+                print(f"\tCopiando la base de datos de OneDrive a la copia local: {ruta_local}")
+                copiar_base(ruta_origen, ruta_local)
+            else:
+                print(f"\tLa base de datos {ruta_origen} no existe. Se creará en la copia local: {ruta_local}")
+            configurar_copia(ruta_local)
+        guardar_estado(ruta_local, ruta_origen, 'en_uso')
+    return ruta_local
+
+
+def conectar(ruta, timeout=5.0):
+    """
+    Abre una conexión a la base de datos con las pragmas de 'pragmas_conexion'. En modo WAL, además,
+    se usa la sincronización 'sincronizacion_wal'.
+
+    Args:
+        ruta (str): Ruta de la base de datos.
+        timeout (float, opcional): Segundos que se espera a que otra conexión libere la base.
+
+    Returns:
+        sqlite3.Connection: Conexión abierta.
+    """
+    conexion = sqlite3.connect(ruta, timeout=timeout)
+    for pragma, valor in pragmas_conexion.items():
+        conexion.execute(f"PRAGMA {pragma}={valor}")
+    if conexion.execute("PRAGMA journal_mode").fetchone()[0] == 'wal':
+        conexion.execute(f"PRAGMA synchronous={sincronizacion_wal}")
+    return conexion
+
+
+def publicar(ruta_local, ruta_origen):
+    """
+    Publica la copia local en OneDrive: genera una copia consistente con la API de backup en un archivo
+    temporal de la misma carpeta (en modo DELETE, sin archivos -wal) y reemplaza la base de OneDrive
+    con 'os.replace'. Si la base de OneDrive está bloqueada se reintenta; si no se puede reemplazar, la
+    copia local queda sin publicar y la siguiente ejecución vuelve a copiar la base de OneDrive.
+
+    La carpeta de OneDrive es compartida: si la base de OneDrive cambió desde que 'preparar' la copió
+    (otro usuario publicó durante esta ejecución), no se reemplaza, para no borrar sus cargas. La copia
+    queda sin publicar y la siguiente ejecución parte de la base de OneDrive actual.
+
+    Args:
+        ruta_local (str): Ruta de la copia local (devuelta por 'preparar').
+        ruta_origen (str): Ruta de la base de datos en OneDrive.
+
+    Returns:
+        bool: True si la base se publicó (o si no se usa copia local).
+    """
+    if ruta_local == ruta_origen:
+        return True
+
+    ruta_temporal = f"{ruta_origen}.{os.getpid()}.tmp"
+    with tm.medir("publicar base de datos") as medicion:
+        eliminar_base(ruta_temporal)
+        origen = sqlite3.connect(ruta_local)
+        destino = sqlite3.connect(ruta_temporal)
+        try:
+            origen.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            origen.backup(destino)
+            destino.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            destino.close()
+            origen.close()
+
+        if huella_archivo(ruta_origen) != leer_estado(ruta_local).get('huella_origen'):
+            print(f"⚠️ La base de datos {ruta_origen} cambió desde que se copió (otra ejecución la publicó). "
+                  f"No se publica para no sobrescribir sus cambios; la próxima ejecución volverá a copiarla.")
+            eliminar_base(ruta_temporal)
+            medicion['estado'] = 'error'
+            return False
+
+        for intento in range(1, intentos_publicacion + 1):
+            try:
+                os.replace(ruta_temporal, ruta_origen)
+                break
+            except PermissionError as e:
+                if intento == intentos_publicacion:
+                    print(f"❌ No se pudo publicar la base de datos en {ruta_origen}: {e}")
+                    eliminar_base(ruta_temporal)
+                    medicion['estado'] = 'error'
+                    return False
+                time.sleep(espera_publicacion)
+
+    guardar_estado(ruta_local, ruta_origen, 'publicada')
+    print(f"\tBase de datos publicada en: {ruta_origen}")
+    return True
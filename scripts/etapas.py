@@ -0,0 +1,354 @@
+"""
+Ejecución de las etapas del proceso según sus dependencias.
+
+Cada etapa declara sus entradas y salidas (tablas de la base de datos, carpetas o archivos); una
+etapa depende de las que producen alguna de sus entradas. Las etapas independientes se ejecutan a la
+vez en hilos, cada una con su propia conexión a la base de datos; las escrituras se serializan con
+'funciones.bloqueo_escritura' y la lectura de archivos Excel usa un único pool de procesos compartido.
+Si una etapa falla, solo se omiten las etapas que dependen de ella.
+
+Las etapas marcadas con 'memorizar' guardan en la tabla 'huellas_etapas' una huella de sus entradas
+(versión y cantidad de filas de las tablas, tamaño y fecha de modificación de archivos y carpetas), de
+la versión del código y de los tipos de dato de 'metadatos_de_tablas'. Si en la siguiente ejecución la huella no cambió y sus salidas existen, la
+etapa no se ejecuta y se reutilizan sus resultados.
+"""
+import hashlib
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import copia_local
+import funciones as fn
+import perfilado
+import telemetria as tm
+
+# Segundos que una conexión espera a que otra libere la base de datos antes de fallar
+tiempo_espera_bd = 300
+
+# Huella del código fuente (se calcula una vez por ejecución en 'version_codigo')
+huella_codigo = None
+
+
+def crear_etapa(nombre, funcion, entradas=(), salidas=(), memorizar=False):
+    """
+    Define una etapa del proceso.
+
+    Args:
+        nombre (str): Nombre de la etapa (único).
+        funcion (callable): Función que recibe una conexión a la base de datos y ejecuta la etapa.
+        entradas (list, opcional): Recursos que la etapa lee (tablas, carpetas o archivos).
+        salidas (list, opcional): Recursos que la etapa escribe.
+        memorizar (bool, opcional): Omitir la etapa si sus entradas y el código no cambiaron desde
+                                    su última ejecución correcta y sus salidas existen.
+
+    Returns:
+        dict: Definición de la etapa.
+    """
+    return {'nombre': nombre, 'funcion': funcion, 'entradas': set(entradas), 'salidas': set(salidas),
+            'memorizar': memorizar}
+
+
+def calcular_dependencias(etapas):
+    """
+    Obtiene las dependencias de cada etapa a partir de sus entradas y salidas.
+
+    Args:
+        etapas (list): Etapas creadas con 'crear_etapa'.
+
+    Returns:
+        dict: {nombre de la etapa: conjunto de etapas de las que depende}.
+
+    Raises:
+        ValueError: Si hay nombres repetidos o dependencias circulares.
+    """
+    nombres = [etapa['nombre'] for etapa in etapas]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError(f"Hay etapas con el mismo nombre: {nombres}")
+
+    productores = {}
+    for etapa in etapas:
+        for salida in etapa['salidas']:
+            productores.setdefault(salida, set()).add(etapa['nombre'])
+    dependencias = {
+        etapa['nombre']: {productor for entrada in etapa['entradas']
+                          for productor in productores.get(entrada, ()) if productor != etapa['nombre']}
+        for etapa in etapas
+    }
+
+    # Verificar que no haya ciclos (se eliminan sucesivamente las etapas sin dependencias pendientes)
+    pendientes = {nombre: set(deps) for nombre, deps in dependencias.items()}
+    while pendientes:
+        listas = [nombre for nombre, deps in pendientes.items() if not deps]
+        if not listas:
+            raise ValueError(f"Dependencias circulares entre las etapas: {sorted(pendientes)}")
+        for nombre in listas:
+            del pendientes[nombre]
+        for deps in pendientes.values():
+            deps.difference_update(listas)
+    return dependencias
+
+
+def version_codigo():
+    """
+    Calcula la huella del código fuente del proceso (todos los archivos .py de esta carpeta), de modo
+    que un cambio en el código invalida los resultados memorizados.
+
+    Returns:
+        str: Hash SHA-256 del código.
+    """
+    global huella_codigo
+    if huella_codigo is None:
+        carpeta = os.path.dirname(os.path.abspath(__file__))
+        hash_codigo = hashlib.sha256()
+        for nombre in sorted(os.listdir(carpeta)):
+            if nombre.endswith(".py"):
+                with open(os.path.join(carpeta, nombre), "rb") as archivo:
+                    hash_codigo.update(nombre.encode() + archivo.read())
+        huella_codigo = hash_codigo.hexdigest()
+    return huella_codigo
+
+
+def huella_metadatos(conexion):
+    """
+    Calcula la huella del contenido de 'metadatos_de_tablas', que define la conversión de tipos de
+    las tablas (ver 'funciones.actualizar_tipos_datos'). Se usa el contenido y no la cantidad de filas,
+    ya que al editar un 'tipo_dato' la tabla conserva sus filas.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+
+    Returns:
+        str: Hash SHA-256 de los tipos de dato, o None si la tabla no existe.
+    """
+    if not conexion.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metadatos_de_tablas'").fetchone():
+        return None
+    filas = conexion.execute(
+        "SELECT nombre_tabla, nombre_columna, tipo_dato FROM metadatos_de_tablas ORDER BY 1, 2"
+    ).fetchall()
+    return hashlib.sha256(repr(filas).encode()).hexdigest()
+
+
+def estado_recurso(conexion, recurso):
+    """
+    Describe el estado actual de una entrada o salida de una etapa.
+
+    - Tabla: versión (ver 'funciones.incrementar_version_tabla'), cantidad de filas y mayor rowid.
+    - Archivo: tamaño y fecha de modificación.
+    - Carpeta: nombre, tamaño y fecha de modificación de los archivos que contiene (sin subcarpetas).
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        recurso (str): Nombre de la tabla o ruta del archivo o carpeta.
+
+    Returns:
+        tuple: Estado del recurso, o None si no existe.
+    """
+    if conexion.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (recurso,)).fetchone():
+        return ('tabla', fn.obtener_version_tabla(conexion, recurso)) + \
+            conexion.execute(f'SELECT COUNT(*), MAX(rowid) FROM "{recurso}"').fetchone()
+    if os.path.isfile(recurso):
+        info = os.stat(recurso)
+        return ('archivo', info.st_size, info.st_mtime_ns)
+    if os.path.isdir(recurso):
+        with os.scandir(recurso) as entradas:
+            archivos = sorted((e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in entradas if e.is_file())
+        return ('carpeta', tuple(archivos))
+    return None
+
+
+def calcular_huella(conexion, etapa):
+    """
+    Calcula la huella de las entradas de una etapa, de la versión del código y de los metadatos de tipos.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        etapa (dict): Etapa creada con 'crear_etapa'.
+
+    Returns:
+        str: Hash SHA-256 de la huella.
+    """
+    estados = [(entrada, estado_recurso(conexion, entrada)) for entrada in sorted(etapa['entradas'])]
+    return hashlib.sha256(repr((version_codigo(), huella_metadatos(conexion), estados)).encode()).hexdigest()
+
+
+def asegurar_tabla_huellas(conexion):
+    """
+    Crea, si no existe, la tabla 'huellas_etapas' con la huella de la última ejecución correcta
+    de cada etapa memorizada.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+    """
+    with fn.bloqueo_escritura:
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS huellas_etapas (
+                etapa TEXT PRIMARY KEY,
+                huella TEXT NOT NULL,
+                fecha TEXT
+            )
+        """)
+        conexion.commit()
+
+
+def etapa_sin_cambios(conexion, etapa):
+    """
+    Indica si una etapa memorizada puede omitirse: su huella coincide con la de su última ejecución
+    correcta y todas sus salidas existen.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        etapa (dict): Etapa creada con 'crear_etapa'.
+
+    Returns:
+        bool: True si se pueden reutilizar los resultados anteriores.
+    """
+    asegurar_tabla_huellas(conexion)
+    fila = conexion.execute("SELECT huella FROM huellas_etapas WHERE etapa = ?", (etapa['nombre'],)).fetchone()
+    if fila is None or fila[0] != calcular_huella(conexion, etapa):
+        return False
+    return all(estado_recurso(conexion, salida) is not None for salida in etapa['salidas'])
+
+
+def guardar_huella(conexion, etapa):
+    """
+    Guarda la huella de una etapa después de ejecutarse correctamente. Se calcula con el estado de
+    las entradas al terminar, por lo que los cambios que la propia etapa hace en ellas no la invalidan.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        etapa (dict): Etapa creada con 'crear_etapa'.
+    """
+    huella = calcular_huella(conexion, etapa)
+    with fn.bloqueo_escritura:
+        conexion.execute(
+            """INSERT INTO huellas_etapas (etapa, huella, fecha) VALUES (?, ?, ?)
+               ON CONFLICT (etapa) DO UPDATE SET huella = excluded.huella, fecha = excluded.fecha""",
+            (etapa['nombre'], huella, time.strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        conexion.commit()
+
+
+def ejecutar_etapa(etapa, base_datos, forzar=False):
+    """
+    Ejecuta una etapa con una conexión propia a la base de datos y registra su medición de
+    rendimiento. Las etapas memorizadas cuyas entradas no cambiaron no se ejecutan.
+
+    Args:
+        etapa (dict): Etapa creada con 'crear_etapa'.
+        base_datos (str): Ruta de la base de datos SQLite.
+        forzar (bool, opcional): Ejecutar la etapa aunque sus entradas no hayan cambiado.
+
+    Returns:
+        str: 'completada', 'reutilizada' o 'error'.
+    """
+    inicio = time.time()
+    medicion = tm.iniciar(f"etapa {etapa['nombre']}")
+    error = None
+    conexion = copia_local.conectar(base_datos, timeout=tiempo_espera_bd)
+    try:
+        if etapa['memorizar'] and not forzar and etapa_sin_cambios(conexion, etapa):
+            print(f"⏩ Etapa {etapa['nombre']} sin cambios en sus entradas. Se reutilizan sus resultados.")
+            medicion['estado'] = 'reutilizada'
+            return 'reutilizada'
+        print(f"▶️Inicio de la etapa {etapa['nombre']}")
+        etapa['funcion'](conexion)
+        if etapa['memorizar']:
+            asegurar_tabla_huellas(conexion)
+            guardar_huella(conexion, etapa)
+        print(f"✅ Etapa {etapa['nombre']} completada en {time.time() - inicio:.1f} segundos.")
+        medicion['estado'] = 'completada'
+        return 'completada'
+    except Exception as e:
+        print(f"❌ Error en la etapa {etapa['nombre']}: {e}")
+        traceback.print_exc()
+        medicion['estado'] = 'error'
+        error = repr(e)
+        return 'error'
+    finally:
+        conexion.close()
+        tm.terminar(medicion, error=error)
+
+
+def iniciar_pool_lectura(procesos=None):
+    """
+    Crea el pool de procesos compartido para la lectura de archivos Excel.
+
+    Args:
+        procesos (int, opcional): Número de procesos. Por defecto 'procesos_lectura' o el número de CPUs.
+
+    Returns:
+        ProcessPoolExecutor: El pool creado, o None si la lectura es en serie o el pool no puede iniciarse.
+    """
+    procesos = procesos or fn.procesos_lectura or os.cpu_count() or 1
+    if procesos <= 1:
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=procesos)
+    except OSError as e:
+        print(f"Advertencia: No se pudo iniciar el pool de lectura ({e}). Cada etapa leerá por su cuenta.")
+        return None
+
+
+def ejecutar_etapas(etapas, base_datos, hilos=None, procesos=None, forzar=False):
+    """
+    Ejecuta las etapas respetando sus dependencias: cada etapa comienza en cuanto terminan las
+    etapas de las que depende, en paralelo con las demás etapas listas.
+
+    Args:
+        etapas (list): Etapas creadas con 'crear_etapa'.
+        base_datos (str): Ruta de la base de datos SQLite.
+        hilos (int, opcional): Máximo de etapas simultáneas. Por defecto, todas las que estén listas
+                               (con el perfilado activo, una a la vez).
+        procesos (int, opcional): Procesos del pool compartido de lectura de archivos Excel.
+        forzar (bool, opcional): Ejecutar también las etapas memorizadas cuyas entradas no cambiaron.
+
+    Returns:
+        dict: {nombre de la etapa: 'completada', 'reutilizada', 'error' u 'omitida'}.
+    """
+    dependencias = calcular_dependencias(etapas)
+    por_nombre = {etapa['nombre']: etapa for etapa in etapas}
+    pendientes = dict(dependencias)
+    estados = {}
+    en_curso = {}
+
+    # Con el perfilado activo las etapas se ejecutan en serie para que los perfiles no se mezclen
+    if perfilado.activo():
+        hilos = 1
+        procesos = 1
+    fn.pool_lectura = iniciar_pool_lectura(procesos)
+    try:
+        with ThreadPoolExecutor(max_workers=hilos or len(etapas) or 1) as ejecutor:
+            while pendientes or en_curso:
+                # Omitir (en cadena) las etapas que dependen de una etapa fallida u omitida
+                cambio = True
+                while cambio:
+                    cambio = False
+                    for nombre, deps in list(pendientes.items()):
+                        fallidas = [dep for dep in deps if estados.get(dep) in ('error', 'omitida')]
+                        if fallidas:
+                            estados[nombre] = 'omitida'
+                            del pendientes[nombre]
+                            cambio = True
+                            print(f"⏭️ Etapa {nombre} omitida porque falló: {', '.join(sorted(fallidas))}")
+
+                # Iniciar las etapas cuyas dependencias ya terminaron
+                for nombre, deps in list(pendientes.items()):
+                    if all(estados.get(dep) in ('completada', 'reutilizada') for dep in deps):
+                        del pendientes[nombre]
+                        en_curso[ejecutor.submit(ejecutar_etapa, por_nombre[nombre], base_datos, forzar)] = nombre
+
+                if not en_curso:
+                    break
+                terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    estados[en_curso.pop(futuro)] = futuro.result()
+    finally:
+        if fn.pool_lectura is not None:
+            fn.pool_lectura.shutdown()
+        fn.pool_lectura = None
+
+    print("\nResumen de etapas:")
+    for etapa in etapas:
+        print(f"\t{etapa['nombre']}: {estados.get(etapa['nombre'], 'omitida')}")
+    return estados
@@ -1,13 +1,25 @@
 import os
+import re
+import hashlib
+import warnings
 import pandas as pd
 import numpy as np
 import sqlite3
-from datetime import datetime, timedelta
-from openpyxl import Workbook
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.formatting.rule import ColorScaleRule, CellIsRule
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+from openpyxl.formatting.rule import ColorScaleRule, CellIsRule, FormulaRule
+import lector_xlsx
+import telemetria as tm
+import perfilado
 
 
 # Obtener el directorio del perfil del usuario actual:
@@ -16,33 +28,165 @@ user_profile = os.environ.get("USERPROFILE")
 # Construir la ruta a la carpeta de OneDrive de la empresa. Por ejemplo:
 base_path = os.path.join(user_profile, "OneDrive - Telefonica", "Dalia Paola Rodriguez Cruz's files - TOA_proceso")
 
-
-def procesar_archivos_tickets(carpeta, tabla, conexion, id):
+# Formatos de fecha aceptados en las columnas DATETIME, en el orden en que se prueban
+formatos_fecha = [
+    '%d/%m/%y %I:%M %p',  # Ejemplo: 03/02/25 10:44 AM
+    '%Y-%m-%d %H:%M:%S',  # Ejemplo: 2025-02-03 09:45:00
+    '%d/%m/%y %H:%M:%S',  # Ejemplo: 03/02/25 15:02:15
+    '%d/%m/%y',           # Ejemplo: 03/02/25
+    '%Y-%m-%d %H:%M',     # Ejemplo: 2025-02-03 09:48
+    '%d/%m/%Y %I:%M %p',  # Ejemplo: 03/02/2025 07:38 AM
+    '%d/%m/%Y %H:%M',     # Ejemplo: 31/01/2025 13:04
+]
+
+# Valores que indican ausencia de dato en las columnas de fecha
+valores_fecha_vacios = ['', '-', 'no se registro ?']
+
+# Formato canónico (ISO-8601) con el que se guardan en la base de datos las columnas DATETIME y DATE
+formatos_bd = {'DATETIME': '%Y-%m-%d %H:%M:%S', 'DATE': '%Y-%m-%d'}
+
+# Planes de conversión de tipos por tabla (se leen de 'metadatos_de_tablas' una vez por ejecución)
+planes_conversion = {}
+
+# Columnas sin metadatos cuyo tipo se infirió en esta ejecución: (tabla, columna, tipo_dato)
+columnas_provisionales = []
+
+# Cantidad de valores que se revisan para inferir el tipo de una columna sin metadatos
+tamano_muestra_tipos = 1000
+
+# Prioridad de los tickets de Autin según 'Task_Status' (los estados no definidos reciben prioridad 3)
+prioridad_estados_autin = {'closed': 1, 'completed': 2, 'canceled': 4}
+
+# Ventana (en días) para considerar reiterado un ticket del mismo sitio y equipo afectado
+dias_reiteracion = 7
+
+# Reglas de las etiquetas de la tabla consolidada: {columna: ([(condiciones, etiqueta), ...], valor_por_defecto)}.
+# Se asigna la etiqueta de la primera regla cuyas condiciones se cumplen todas. Cada condición es
+# (columna, operador, valor) con los operadores:
+#   'en': el valor está en la lista; 'contiene' / 'contiene_i': el texto contiene el valor (sin / con
+#   mayúsculas ignoradas); 'en_parametro': el valor está en la lista recibida como parámetro con ese nombre.
+estados_autin_abiertos = ['accepted', 'dispatched', 'inprocess', 'unscheduled']
+estados_autin_cerrados = ['closed', 'completed', 'canceled']
+reglas_etiquetas = {
+    'TEST': ([
+        ([('Nro_TOA', 'en_parametro', 'tickets_test')], 'TEST'),
+    ], ''),
+    'Empresa': ([
+        ([('Bucket_Inicial', 'contiene_i', 'comfica')], 'comfica'),
+        ([('Bucket_Inicial', 'contiene_i', 'huawei')], 'huawei'),
+    ], ''),
+    'Marcha_Blanca': ([
+        ([('Departamento', 'en', ['Puno'])], 'MB'),
+        ([('Provincia', 'en', ['Cañete'])], 'MB'),
+    ], ''),
+    'Proactivo': ([
+        ([('Notas', 'contiene_i', 'proactivo')], 'Proactivo'),
+    ], ''),
+    'Responsable': ([
+        ([('Bucket_Inicial', 'contiene', 'comfica')], 'FLM'),
+        ([('Bucket_Inicial', 'contiene', 'huawei')], 'FLM'),
+    ], 'TDP'),
+    'Etiqueta': ([
+        ([('Estado_TOA', 'en', ['Cancelado']), ('Estado_1', 'en', estados_autin_abiertos + ['closed', 'completed'])], 'cruce incorrecto'),
+        ([('Estado_TOA', 'en', ['Completado']), ('Estado_1', 'en', estados_autin_abiertos + ['canceled'])], 'cruce incorrecto'),
+        ([('Estado_TOA', 'en', ['Pendiente', 'Pre cierre', 'Suspendido']), ('Estado_1', 'en', estados_autin_cerrados)], 'falta de revisión'),
+    ], ''),
+}
+
+# Diferencias en días entre dos fechas: {columna: (fecha_final, fecha_inicial)}. Solo se conservan las positivas.
+diferencias_en_dias = {
+    'SWAP_dias': ('Fecha_de_Registro_de_actividad_TOA', 'Fecha_Fin_Swap'),
+    'TSS_dias': ('Fecha_de_Registro_de_actividad_TOA', 'Fecha_TSS'),
+}
+
+# Columnas que forman la clave de las tablas cuyo identificador no es una única columna
+claves_compuestas = {'Index': ['Order_ID', 'Operation_Time']}
+
+# Índices de las columnas de unión y de fecha de cada tabla. Los identificadores (Nro_TOA, Task_Id,
+# Codigo_Unico, ID_TOA y Order_ID con Operation_Time) ya tienen el índice único de 'asegurar_indice_unico'.
+indices_tablas = {
+    'tickets_TOA': ['Código_de_Cliente', 'ID_del_Ticket', 'Número_de_Petición', 'Fecha_de_Registro_de_actividad_TOA'],
+    'tickets_autin': ['Number_OS_SIOM', 'Site_Id', 'Createtime'],
+    'info_sitios': ['Fecha_Fin_Swap'],
+    'tabla_consolidada': ['Creacion_TOA'],
+}
+
+# Motivos de cancelación de los tickets de Autin que no se consideran al clasificarlos
+motivos_cancelacion_excluidos = ['Duplicado', 'Other', 'Tarea de prueba', 'Monitoreo']
+
+# Columnas de Autin que se usan al clasificar los tickets (las únicas que se leen de la base de datos)
+columnas_clasificacion_autin = ['Task_Id', 'Task_Category', 'Createtime', 'Cancel_Reason', 'Task_Status', 'Site_Id',
+                                'Com_Level_1_Aff_Equip', 'Number_OS_SIOM', 'Reject_Counter', 'Complete_Time']
+
+# Vistas de la base de datos con la unión TOA-sitios y los tickets de Autin que se clasifican (ver 'crear_vistas')
+vista_toa_sitios = "vista_toa_sitios"
+vista_autin = "vista_autin"
+
+# Modo compacto en memoria (TOA_MODO_COMPACTO=1): las tablas leídas de la base de datos guardan las columnas
+# TEXT con pocos valores distintos como categóricas y las INTEGER con el tipo entero más pequeño, conservando
+# los nulos (ver 'compactar_columnas'). Lo que se escribe en la base de datos y en los Excel no cambia.
+modo_compacto = os.environ.get("TOA_MODO_COMPACTO", "0") == "1"
+
+# Proporción máxima de valores distintos (respecto de las filas) para guardar una columna TEXT como categórica
+proporcion_max_categorias = 0.5
+
+# Tipos enteros que se prueban, de menor a mayor, al compactar las columnas INTEGER
+tipos_enteros_compactos = ['Int16', 'Int32', 'Int64']
+
+# Número de procesos para leer archivos Excel en paralelo (None: tantos como CPUs; 1: lectura en serie)
+procesos_lectura = None
+
+# Pool de procesos de lectura compartido por las etapas que se ejecutan a la vez (lo asigna
+# etapas.ejecutar_etapas). Con None cada lectura crea su propio pool.
+pool_lectura = None
+
+# Bloqueo que serializa las escrituras en la base de datos cuando varias etapas se ejecutan a la vez
+bloqueo_escritura = threading.RLock()
+
+# Cache local de archivos Excel ya leídos (fuera de OneDrive para no sincronizarla) y su tamaño máximo
+# en bytes. Al superarse se eliminan las entradas usadas hace más tiempo. Con 0 no se usa la cache.
+carpeta_cache_excel = os.path.join(os.environ.get("LOCALAPPDATA") or tempfile.gettempdir(), "TOA_proceso", "cache_excel")
+tamano_max_cache = 2 * 1024 ** 3
+
+# Motor de lectura de archivos Excel: "xlsx" recorre directamente el XML del archivo (ver lector_xlsx.py)
+# y "pandas" usa pd.read_excel. Se puede cambiar con la variable de entorno TOA_MOTOR_EXCEL.
+motor_excel = os.environ.get("TOA_MOTOR_EXCEL", "xlsx").lower()
+
+# Definición de las columnas que se requieren en los archivos TOA
+columnas_requeridas = ['Técnico', 'ID Recurso', 'Nro TOA', 'Subtipo de Actividad', 'Número de Petición', 'Fecha de Cita', 'SLA Inicio', 'SLA Fin', 'Localidad', 'Dirección', 
+                        'Direccion Polar X', 'Direccion Polar Y', 'Nombre Cliente', 'Hora de asignación de actividad', 'Fecha de Registro de actividad TOA', 
+                        'Notas', 'Código de Cliente', 'Fecha Hora de Cancelación', 'Empresa', 'Bucket Inicial', 'Usuario - Iniciado', 'Nombre Distrito', 'Sistema Origen', 
+                        'ID del Ticket', 'Quiebres', 'Fecha de Inicio PINT', 'Inicio PR1', 'Fin PR1', 'Fin PR2', 'Inicio PR2', 'Fin PR3', 'Inicio PR3', 'Fin PR4', 'Inicio PR4', 
+                        'Motivo PR1', 'Motivo PR2', 'Motivo PR3', 'Motivo PR4', 'Nombre Local', 'Tipo de local', 'Zona geográfica', 'Zona', 'Estado TOA']
+
+
+def procesar_archivos_tickets(carpeta, tabla, conexion, id, procesos=None):
     """
     Procesa los archivos Excel en la carpeta especificada y actualiza la base de datos.
 
     Este proceso realiza lo siguiente:
-      - Obtiene la lista de archivos Excel nuevos (no procesados) en la carpeta.
+      - Obtiene la lista de archivos Excel nuevos (no registrados en 'processed_files') en la carpeta.
       - Combina los datos de dichos archivos en un único DataFrame.
       - Elimina la columna 'Mes' en caso de existir, ya que no es requerida.
       - Actualiza la base de datos con el DataFrame combinado.
-      - Marca los archivos procesados para evitar reprocesamientos futuros.
+      - Registra los archivos procesados para evitar reprocesamientos futuros.
 
     Args:
         carpeta (str): Ruta de la carpeta que contiene los archivos.
         tabla (str): Nombre de la tabla en la base de datos donde se actualizarán los datos.
         conexion (sqlite3.Connection): Conexión activa a la base de datos SQLite.
         id (str): Nombre de la columna identificadora para eliminar duplicados.
+        procesos (int, opcional): Número de procesos para leer los archivos en paralelo.
     """
     # Se obtienen los archivos Excel a procesar
-    archivos = obtener_archivos_excel(carpeta)
+    archivos = obtener_archivos_excel(carpeta, conexion, tabla)
     
     if not archivos:
         print("\tNo se encontraron archivos nuevos para procesar.")
         return
 
     # Se combinan los datos de los archivos en un solo DataFrame
-    df_final = combinar_datos_archivos(carpeta, archivos)
+    df_final = combinar_datos_archivos(carpeta, [archivo['nombre'] for archivo in archivos], procesos)
 
     # Si hay datos combinados y el DataFrame no está vacío
     if df_final is not None and not df_final.empty:
@@ -51,135 +195,431 @@ def procesar_archivos_tickets(carpeta, tabla, conexion, id):
             df_final.drop(columns=['Mes'], inplace=True)
         print("Ya se puede actualizar la base de datos.")
         actualizar_base_datos(conexion, tabla, df_final, id)
-        marcar_archivos_procesados(carpeta, archivos)
+        registrar_archivos_procesados(conexion, tabla, archivos)
     else:
         print("\tNo hay datos nuevos para actualizar.")
 
 
-def obtener_archivos_excel(carpeta):
+def asegurar_tabla_archivos(conexion):
+    """
+    Crea, si no existe, la tabla 'processed_files' con el registro de los archivos ya procesados.
+
+    Cada archivo se identifica por tabla, nombre, tamaño y fecha de modificación (para no volver a
+    leerlo si no cambió) y guarda el hash de su contenido (para detectar exportaciones repetidas
+    con otro nombre) y la fecha obtenida de su nombre (para ordenar).
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+    """
+    with bloqueo_escritura:
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS processed_files (
+                tabla TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                fecha_archivo TEXT,
+                fecha_procesado TEXT,
+                duplicado INTEGER DEFAULT 0,
+                UNIQUE (tabla, nombre, tamano, mtime)
+            )
+        """)
+        conexion.execute("CREATE INDEX IF NOT EXISTS ix_processed_files_hash ON processed_files (tabla, hash)")
+        conexion.commit()
+
+
+def calcular_hash_archivo(ruta):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo, leyéndolo por bloques.
+
+    Args:
+        ruta (str): Ruta del archivo.
+
+    Returns:
+        str: Hash del contenido en hexadecimal.
+    """
+    hash_archivo = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            hash_archivo.update(bloque)
+    return hash_archivo.hexdigest()
+
+
+def fecha_desde_nombre(archivo, mtime):
+    """
+    Obtiene la fecha de un archivo a partir de su nombre, que comienza con el día y el mes
+    separados por puntos (ej. '03.02 TOA.xlsx').
+
+    El año se toma de la fecha de modificación del archivo: si el día y mes del nombre son
+    posteriores a esa fecha, el archivo corresponde al año anterior.
+
+    Args:
+        archivo (str): Nombre del archivo.
+        mtime (int): Fecha de modificación del archivo en nanosegundos (os.stat().st_mtime_ns).
+
+    Returns:
+        date or None: Fecha del archivo, o None si el nombre no contiene una fecha válida.
+    """
+    fecha_modificacion = datetime.fromtimestamp(mtime / 1e9)
+    try:
+        coincidencia = re.match(r'(\d{1,2})\.(\d{1,2})\b', archivo)
+        if coincidencia is None:
+            return None  # Si falla, se ordenará alfabéticamente
+        dia, mes = map(int, coincidencia.groups())
+        año = fecha_modificacion.year if (mes, dia) <= (fecha_modificacion.month, fecha_modificacion.day) else fecha_modificacion.year - 1
+        return date(año, mes, dia)
+    except (ValueError, IndexError):
+        return None  # Si falla, se ordenará alfabéticamente
+
+
+def obtener_archivos_excel(carpeta, conexion, tabla):
     """
-    Obtiene una lista de archivos Excel en la carpeta que aún no han sido procesados.
+    Obtiene una lista de archivos Excel en la carpeta que aún no han sido procesados para la tabla,
+    según el registro de la tabla 'processed_files'.
 
     Se excluyen aquellos archivos que:
-      - Tengan extensión '_procesado.xlsx' o '_procesado.xls' para evitar reprocesamiento.
+      - Tengan extensión '_procesado.xlsx' o '_procesado.xls' (archivos movidos por versiones anteriores).
       - Tengan nombre 'deskto.xlsx' (ignora archivos no relevantes).
       - No sean archivos (por ejemplo, directorios).
+      - Ya estén registrados con el mismo nombre, tamaño y fecha de modificación (no se calcula su hash).
+      - Tengan el mismo contenido (hash) que un archivo ya procesado o que otro archivo de la carpeta.
+        Estas exportaciones repetidas se registran como duplicadas sin leerlas.
 
-    Además, se intenta ordenar los archivos que contienen fecha en el nombre.
+    Los archivos se devuelven ordenados: primero los que no tienen fecha en el nombre (en orden
+    alfabético) y luego los que sí la tienen, por fecha.
 
     Args:
         carpeta (str): Ruta de la carpeta que contiene los archivos.
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla a la que se cargan los archivos.
 
     Returns:
-        list: Lista de nombres de archivos a procesar.
+        list: Lista de diccionarios con 'nombre', 'tamano', 'mtime', 'hash' y 'fecha_archivo'
+              de cada archivo a procesar.
     """
-    archivos = [f for f in os.listdir(carpeta) 
-                if f.endswith(('.xlsx', '.xls')) and 
-                not f.endswith('_procesado.xlsx') and 
-                not f.endswith('_procesado.xls') and 
-                f.lower() != 'deskto.xlsx' and 
-                os.path.isfile(os.path.join(carpeta, f))]
+    asegurar_tabla_archivos(conexion)
+    registrados = set(conexion.execute(
+        "SELECT nombre, tamano, mtime FROM processed_files WHERE tabla = ?", (tabla,)
+    ).fetchall())
+    hashes_procesados = {fila[0] for fila in conexion.execute(
+        "SELECT hash FROM processed_files WHERE tabla = ? AND duplicado = 0", (tabla,)
+    )}
+
+    archivos, duplicados = [], []
+    with os.scandir(carpeta) as entradas:
+        for entrada in sorted(entradas, key=lambda e: e.name):
+            nombre = entrada.name
+            if (not nombre.endswith(('.xlsx', '.xls')) or
+                    nombre.endswith(('_procesado.xlsx', '_procesado.xls')) or
+                    nombre.lower() == 'deskto.xlsx' or
+                    not entrada.is_file()):
+                continue
+            info = entrada.stat()
+            if (nombre, info.st_size, info.st_mtime_ns) in registrados:
+                continue
 
-    def ordenar_por_fecha(archivo):
-        """
-        Función interna para extraer la fecha del nombre del archivo.
+            fecha = fecha_desde_nombre(nombre, info.st_mtime_ns)
+            archivo = {
+                'nombre': nombre,
+                'tamano': info.st_size,
+                'mtime': info.st_mtime_ns,
+                'hash': calcular_hash_archivo(entrada.path),
+                'fecha_archivo': fecha.isoformat() if fecha else None,
+            }
+            if archivo['hash'] in hashes_procesados:
+                print(f"\tEl archivo {nombre} tiene el mismo contenido que otro archivo ya procesado o en proceso. Se omite.")
+                duplicados.append(archivo)
+            else:
+                hashes_procesados.add(archivo['hash'])
+                archivos.append(archivo)
 
-        Se asume que el nombre del archivo comienza con el día y mes (separados por puntos).
-        La lógica asigna:
-          - Año 2024 si el mes es mayor o igual a 8.
-          - Año 2025 en caso contrario.
-          
-        Nota: Esta lógica funcionará correctamente hasta junio de 2025. A partir de julio de 2025,
-        se deberá actualizar para reflejar el año real.
+    # Las exportaciones repetidas se registran para no volver a calcular su hash
+    registrar_archivos_procesados(conexion, tabla, duplicados, duplicado=True)
 
-        Args:
-            archivo (str): Nombre del archivo.
+    # Primero los archivos sin fecha en el nombre y luego los ordenados por fecha
+    archivos.sort(key=lambda archivo: (archivo['fecha_archivo'] is not None, archivo['fecha_archivo'] or '', archivo['nombre']))
+    return archivos
 
-        Returns:
-            tuple or None: Tupla (año, mes, día) si se pudo extraer la fecha, o None en caso contrario.
-        """
+
+def usar_cache_excel(ruta, parametros, lector):
+    """
+    Devuelve el resultado de leer un archivo usando la cache local 'carpeta_cache_excel'.
+
+    La clave de la cache es la huella del archivo (ruta, tamaño y fecha de modificación) junto con
+    los parámetros de lectura, el motor ('motor_excel') y la versión de 'lector_xlsx', por lo que un
+    archivo modificado, o leído con otro lector, se vuelve a leer. Los resultados se
+    guardan en formato pickle (binario, sin volver a convertir tipos al cargarlos). Cada uso de una
+    entrada actualiza su fecha de modificación, que define el orden de eliminación (LRU).
+    Los errores de la cache no detienen el proceso: en ese caso el archivo se lee normalmente.
+
+    Args:
+        ruta (str): Ruta del archivo a leer.
+        parametros (dict): Parámetros de lectura que forman parte de la clave.
+        lector (callable): Función sin argumentos que lee el archivo.
+
+    Returns:
+        El resultado de 'lector' (por ejemplo, un DataFrame).
+    """
+    if tamano_max_cache <= 0:
+        return lector()
+
+    info = os.stat(ruta)
+    # El motor y la versión del lector forman parte de la clave: al cambiar de lector o corregirlo
+    # no se entregan resultados leídos con el anterior
+    huella = repr((os.path.abspath(ruta), info.st_size, info.st_mtime_ns, sorted(parametros.items()),
+                   motor_excel, lector_xlsx.version))
+    ruta_cache = os.path.join(carpeta_cache_excel, hashlib.sha256(huella.encode()).hexdigest() + ".pkl")
+
+    if os.path.exists(ruta_cache):
         try:
-            dia, mes = map(int, archivo.split('.')[0:2])
-            año = 2024 if mes >= 8 else 2025
-            return (año, mes, dia)
-        except (ValueError, IndexError):
-            return None  # Si falla, se ordenará alfabéticamente
+            resultado = pd.read_pickle(ruta_cache)
+            os.utime(ruta_cache)
+            return resultado
+        except Exception as e:
+            print(f"\tNo se pudo usar la cache de {ruta}: {e}")
 
-    # Se separan los archivos que tienen fecha en el nombre de los que no
-    archivos_fecha = [archivo for archivo in archivos if ordenar_por_fecha(archivo) is not None]
-    archivos_sin_fecha = [archivo for archivo in archivos if ordenar_por_fecha(archivo) is None]
-    
-    archivos_fecha.sort(key=ordenar_por_fecha)
-    archivos_sin_fecha.sort()
-    
-    # Se devuelve la lista combinada: primero los archivos sin fecha, luego los ordenados por fecha
-    return archivos_sin_fecha + archivos_fecha
+    resultado = lector()
+    try:
+        os.makedirs(carpeta_cache_excel, exist_ok=True)
+        # Se escribe a un archivo temporal con nombre único (los archivos se leen desde varios hilos
+        # y procesos) para que nunca se lea una entrada incompleta
+        descriptor, ruta_temporal = tempfile.mkstemp(suffix=".tmp", dir=carpeta_cache_excel)
+        os.close(descriptor)
+        try:
+            pd.to_pickle(resultado, ruta_temporal)
+            os.replace(ruta_temporal, ruta_cache)
+        finally:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+        limpiar_cache_excel()
+    except OSError as e:
+        print(f"\tNo se pudo guardar en la cache el archivo {ruta}: {e}")
+    return resultado
+
+
+def leer_excel(ruta, **parametros):
+    """
+    Lee un archivo Excel con el motor definido en 'motor_excel'.
 
+    Con el motor "xlsx" los archivos .xlsx/.xlsm se leen con 'lector_xlsx.leer_xlsx', que devuelve el
+    mismo DataFrame que 'pd.read_excel'. Se usa 'pd.read_excel' con otros formatos, con parámetros
+    que el lector no admite o si el archivo no se puede recorrer directamente.
 
-def combinar_datos_archivos(carpeta, archivos):
+    Args:
+        ruta (str): Ruta del archivo Excel.
+        **parametros: Parámetros de 'pd.read_excel' (ej. sheet_name, skiprows, usecols).
+
+    Returns:
+        pd.DataFrame: Datos del archivo.
+    """
+    if (motor_excel == "xlsx" and ruta.lower().endswith((".xlsx", ".xlsm"))
+            and set(parametros) <= lector_xlsx.parametros_soportados):
+        try:
+            return lector_xlsx.leer_xlsx(ruta, **parametros)
+        except (lector_xlsx.ErrorLectorXlsx, zipfile.BadZipFile) as e:
+            print(f"\tSe usa pd.read_excel para {ruta}: {e}")
+    return pd.read_excel(ruta, **parametros)
+
+
+def leer_excel_cacheado(ruta, **parametros):
+    """
+    Lee un archivo con 'leer_excel' usando la cache local de archivos ya leídos.
+
+    Args:
+        ruta (str): Ruta del archivo Excel.
+        **parametros: Parámetros de 'pd.read_excel' (ej. sheet_name, skiprows).
+
+    Returns:
+        pd.DataFrame: Datos del archivo.
+    """
+    return usar_cache_excel(ruta, parametros, lambda: leer_excel(ruta, **parametros))
+
+
+def obtener_encabezado_excel(ruta, hojas_validas):
+    """
+    Obtiene, sin leer los datos, la primera hoja de 'hojas_validas' presente en un archivo Excel y
+    su fila de encabezado. Usa la cache local.
+
+    El libro se abre en modo de solo lectura de openpyxl, que solo carga la lista de hojas y recorre
+    la hoja hasta la primera fila con datos (la misma que pandas toma como encabezado).
+
+    Args:
+        ruta (str): Ruta del archivo Excel.
+        hojas_validas (list): Nombres de hoja aceptados, en orden de preferencia.
+
+    Returns:
+        tuple: (nombre de la hoja, lista con los valores del encabezado), o (None, None) si el archivo
+               no tiene ninguna de las hojas.
+    """
+    def leer_encabezado():
+        wb = load_workbook(ruta, read_only=True)
+        try:
+            hoja = next((h for h in hojas_validas if h in wb.sheetnames), None)
+            if hoja is None:
+                return None, None
+            for fila in wb[hoja].iter_rows(values_only=True):
+                if any(valor is not None for valor in fila):
+                    return hoja, list(fila)
+            return hoja, []
+        finally:
+            wb.close()
+
+    return usar_cache_excel(ruta, {'encabezado': tuple(hojas_validas)}, leer_encabezado)
+
+
+def limpiar_cache_excel(tamano_max=None):
+    """
+    Elimina las entradas de la cache usadas hace más tiempo hasta que su tamaño total no supere
+    el máximo indicado.
+
+    Args:
+        tamano_max (int, opcional): Tamaño máximo en bytes. Por defecto se usa 'tamano_max_cache'.
+    """
+    tamano_max = tamano_max_cache if tamano_max is None else tamano_max
+    with os.scandir(carpeta_cache_excel) as entradas:
+        archivos = [(e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in entradas if e.name.endswith(".pkl")]
+
+    tamano_total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if tamano_total <= tamano_max:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass  # Otro proceso ya la eliminó
+        tamano_total -= tamano
+
+
+def leer_archivo_excel(carpeta, archivo):
+    """
+    Lee un único archivo Excel y valida que tenga la estructura esperada según la carpeta de origen.
+
+    Dependiendo del contenido de la carpeta (ej. "TOA" o "PR"), se selecciona la hoja adecuada
+    o se renombra la columna correspondiente. En los archivos TOA la hoja y las columnas se validan
+    antes de leer los datos, y solo se leen las columnas requeridas. Se define a nivel de módulo para que pueda
+    ejecutarse en un proceso independiente.
+
+    Args:
+        carpeta (str): Ruta de la carpeta que contiene el archivo.
+        archivo (str): Nombre del archivo Excel a leer.
+
+    Returns:
+        pd.DataFrame: DataFrame con los datos del archivo, o None si el archivo no es válido.
+    """
+    ruta_completa = os.path.join(carpeta, archivo)
+    print(f"▶️Procesando archivo: {ruta_completa}")
+    # Lógica para archivos provenientes de TOA
+    if "TOA base" in carpeta:
+        # Se valida la hoja ('Sheet1' o 'Page 1') y las columnas requeridas leyendo solo el encabezado
+        sheet, encabezado = obtener_encabezado_excel(ruta_completa, ['Sheet1', 'Page 1'])
+        if sheet is None:
+            print(f"Advertencia: El archivo {ruta_completa} no contiene una hoja llamada 'Sheet1'. Saltando este archivo.")
+            return None
+        if not all(col in encabezado for col in columnas_requeridas):
+            print(f"Advertencia: El archivo {ruta_completa} no contiene todas las columnas requeridas. Saltando este archivo.")
+            return None
+        # Lectura completa limitada a las columnas requeridas
+        df = leer_excel_cacheado(ruta_completa, sheet_name=sheet, engine="openpyxl", usecols=columnas_requeridas)
+        return df[columnas_requeridas]
+    # Lógica para archivos provenientes de la carpeta que contiene "PR"
+    elif "Autin PR" in carpeta:
+        df = leer_excel_cacheado(ruta_completa)
+        if 'Order ID' in df.columns:
+            return df
+        print(f"Advertencia: El archivo {ruta_completa} no contiene la columna 'Order ID'. Saltando este archivo.")
+        return None
+    # Lógica para otros archivos
+    else:
+        df = leer_excel_cacheado(ruta_completa)
+        # Renombrar la columna 'Nro TOA' a 'Number_OS_SIOM'
+        df.rename(columns={'Nro TOA': 'Number_OS_SIOM'}, inplace=True)
+        if 'Task Id' in df.columns:
+            return df
+        print(f"Advertencia: El archivo {ruta_completa} no contiene la columna 'Task Id'. Saltando este archivo.")
+        return None
+
+
+def leer_archivo_excel_medido(carpeta, archivo):
+    """
+    Lee un archivo con 'leer_archivo_excel' y mide la lectura. Se define a nivel de módulo para que
+    pueda ejecutarse en un proceso independiente; la medición se devuelve junto con los datos para
+    registrarla en el proceso principal.
+
+    Args:
+        carpeta (str): Ruta de la carpeta que contiene el archivo.
+        archivo (str): Nombre del archivo Excel a leer.
+
+    Returns:
+        tuple: (DataFrame o None, medición de la lectura).
+    """
+    with tm.medir(f"lectura {archivo}", pendiente=True) as medicion:
+        df = leer_archivo_excel(carpeta, archivo)
+        medicion['filas_salida'] = 0 if df is None else len(df)
+    return df, medicion
+
+
+def leer_archivos_excel(carpeta, archivos, procesos=None):
+    """
+    Lee varios archivos Excel, en paralelo cuando es posible, conservando el orden de 'archivos'.
+
+    Cada archivo se procesa con 'leer_archivo_excel' en un pool de procesos (el compartido
+    'pool_lectura' si está asignado). Si solo hay un archivo, si se pide un único proceso o si el
+    pool no puede iniciarse, la lectura se hace en serie (también con el perfilado activo, para que
+    cProfile mida la lectura). La lectura de cada archivo se registra en la telemetría de la etapa que la pide.
+
+    Args:
+        carpeta (str): Ruta de la carpeta que contiene los archivos.
+        archivos (list): Lista de archivos Excel a leer, en el orden en que deben combinarse.
+        procesos (int, opcional): Número de procesos a utilizar. Por defecto se usa
+                                  'procesos_lectura' o, si no está definido, el número de CPUs.
+
+    Returns:
+        list: Lista con un DataFrame (o None si el archivo no es válido) por cada archivo, en el mismo orden.
+    """
+    procesos = procesos or procesos_lectura or os.cpu_count() or 1
+    procesos = 1 if perfilado.activo() else min(procesos, len(archivos))
+
+    resultados = None
+    if procesos > 1 and pool_lectura is not None:
+        try:
+            resultados = list(pool_lectura.map(leer_archivo_excel_medido, [carpeta] * len(archivos), archivos))
+        except BrokenProcessPool as e:
+            print(f"Advertencia: No se pudo leer en paralelo ({e}). Se leerán los archivos en serie.")
+    elif procesos > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                # 'map' devuelve los resultados en el mismo orden de 'archivos'
+                resultados = list(ejecutor.map(leer_archivo_excel_medido, [carpeta] * len(archivos), archivos))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Advertencia: No se pudo leer en paralelo ({e}). Se leerán los archivos en serie.")
+
+    if resultados is None:
+        resultados = [leer_archivo_excel_medido(carpeta, archivo) for archivo in archivos]
+    for _, medicion in resultados:
+        tm.registrar(medicion)
+    return [df for df, _ in resultados]
+
+
+def combinar_datos_archivos(carpeta, archivos, procesos=None):
     """
     Combina los datos de los archivos Excel en un solo DataFrame.
 
-    Se definen las columnas requeridas para el proceso y se valida que cada archivo
-    contenga todas estas columnas. Dependiendo del contenido de la carpeta (ej. "TOA" o "PR"),
-    se selecciona la hoja adecuada o se renombra la columna correspondiente.
+    Los archivos se leen (en paralelo si es posible) mediante 'leer_archivos_excel', que valida
+    que cada archivo tenga la estructura requerida. Los DataFrames se concatenan en el mismo orden
+    de 'archivos', de modo que al eliminar duplicados se conserva el registro del archivo más reciente.
 
     Args:
         carpeta (str): Ruta de la carpeta que contiene los archivos.
         archivos (list): Lista de archivos Excel a combinar.
+        procesos (int, opcional): Número de procesos para la lectura. Con 1 se lee en serie.
 
     Returns:
         pd.DataFrame: DataFrame combinado con los datos más recientes.
                       Devuelve None si no se encontraron datos válidos.
     """
-    # Definición de las columnas que se requieren en los archivos TOA
-    columnas_requeridas = ['Técnico', 'ID Recurso', 'Nro TOA', 'Subtipo de Actividad', 'Número de Petición', 'Fecha de Cita', 'SLA Inicio', 'SLA Fin', 'Localidad', 'Dirección', 
-                            'Direccion Polar X', 'Direccion Polar Y', 'Nombre Cliente', 'Hora de asignación de actividad', 'Fecha de Registro de actividad TOA', 
-                            'Notas', 'Código de Cliente', 'Fecha Hora de Cancelación', 'Empresa', 'Bucket Inicial', 'Usuario - Iniciado', 'Nombre Distrito', 'Sistema Origen', 
-                            'ID del Ticket', 'Quiebres', 'Fecha de Inicio PINT', 'Inicio PR1', 'Fin PR1', 'Fin PR2', 'Inicio PR2', 'Fin PR3', 'Inicio PR3', 'Fin PR4', 'Inicio PR4', 
-                            'Motivo PR1', 'Motivo PR2', 'Motivo PR3', 'Motivo PR4', 'Nombre Local', 'Tipo de local', 'Zona geográfica', 'Zona', 'Estado TOA']
-
-    df_list = []
-    for archivo in archivos:
-        ruta_completa = os.path.join(carpeta, archivo)
-        print(f"▶️Procesando archivo: {ruta_completa}")
-        # Lógica para archivos provenientes de TOA
-        if "TOA base" in carpeta:
-            hojas = pd.ExcelFile(ruta_completa, engine="openpyxl").sheet_names
-            # Se busca la hoja 'Sheet1' o 'Page 1'
-            if 'Sheet1' in hojas or 'Page 1' in hojas:
-                sheet = 'Sheet1' if 'Sheet1' in hojas else 'Page 1'
-                df = pd.read_excel(ruta_completa, sheet_name=sheet, engine="openpyxl")
-                # Verificar que el archivo contenga todas las columnas requeridas
-                if all(col in df.columns for col in columnas_requeridas):
-                    df['origen'] = archivo  # Se añade la columna 'origen' para identificar el archivo
-                    df = df[columnas_requeridas]
-                    df_list.append(df)
-                else:
-                    print(f"Advertencia: El archivo {ruta_completa} no contiene todas las columnas requeridas. Saltando este archivo.")
-                    continue
-            else:
-                print(f"Advertencia: El archivo {ruta_completa} no contiene una hoja llamada 'Sheet1'. Saltando este archivo.")
-            continue
-        # Lógica para archivos provenientes de la carpeta que contiene "PR"
-        elif "Autin PR" in carpeta:
-            df = pd.read_excel(ruta_completa)
-            if 'Order ID' in df.columns:
-                df_list.append(df)
-            else:
-                print(f"Advertencia: El archivo {ruta_completa} no contiene la columna 'Order ID'. Saltando este archivo.")
-                continue
-        # Lógica para otros archivos
-        else:
-            df = pd.read_excel(ruta_completa)
-            # Renombrar la columna 'Nro TOA' a 'Number_OS_SIOM'
-            df.rename(columns={'Nro TOA': 'Number_OS_SIOM'}, inplace=True)
-            if 'Task Id' in df.columns:
-                df_list.append(df)
-            else:
-                print(f"Advertencia: El archivo {ruta_completa} no contiene la columna 'Task Id'. Saltando este archivo.")
-                continue
-        
+    df_list = [df for df in leer_archivos_excel(carpeta, archivos, procesos) if df is not None]
+
     # Si se han leído archivos válidos, se concatenan y se procesan
     if df_list:
         df_concatenado = pd.concat(df_list, ignore_index=True)
@@ -202,69 +642,82 @@ def combinar_datos_archivos(carpeta, archivos):
         return None
     
 
-def convertir_fechas(df, nombre_columna):
+def parsear_fechas(serie):
     """
-    Convierte una columna del DataFrame a formato datetime unificado (YYYY-MM-DD HH:MM:SS).
-    Si se encuentra algún valor que no se pueda convertir, se almacena en una lista para mostrarlos en consola.
+    Convierte una Serie a datetime probando, en orden, cada formato de 'formatos_fecha'.
 
-    Nota: La función utiliza la expresión "convertir_fecha(x) or valores_no_convertidos.append(x)"
-    para capturar valores no convertibles. Aunque la lógica actual funciona, se sugiere en futuras mejoras
-    refinar este mecanismo para manejar de forma más elegante los errores de conversión.
+    La conversión se hace por columna y no por celda:
+      - Los valores nulos o que indican ausencia de dato ('', '-', 'no se registro ?') quedan como NaT.
+      - El resto se convierte a texto sin espacios y se trabaja solo con sus valores únicos,
+        ya que muchas marcas de tiempo se repiten.
+      - Para cada formato los valores aún no convertidos se convierten en bloque con 'pd.to_datetime';
+        solo los que quedan como NaT con todos los formatos se prueban uno a uno con 'datetime.strptime'.
 
     Args:
-        df (pd.DataFrame): DataFrame con los datos.
-        nombre_columna (str): Nombre de la columna a convertir.
+        serie (pd.Series): Serie con los valores a convertir.
 
     Returns:
-        pd.DataFrame: DataFrame con la columna convertida a datetime.
+        tuple: (pd.Series datetime64 con NaT en los valores no convertidos,
+                pd.Series con los valores originales que no se pudieron convertir).
     """
-    def convertir_fecha(valor):
-        """
-        Intenta convertir un valor a datetime utilizando una lista de formatos predefinidos.
-        Si el valor es nulo o indica ausencia de dato, devuelve np.nan.
-        
-        Args:
-            valor: Valor a convertir.
-
-        Returns:
-            datetime o np.nan: Valor convertido o np.nan si no se pudo convertir.
-        """
-        if pd.isna(valor) or valor == '' or valor == '-' or valor == 'no se registro ?':
-            return np.nan
-        
-        # Convertir el valor a string y eliminar espacios en blanco
-        valor = str(valor).strip()
-        
-        # Lista de formatos de fecha a intentar
-        formatos_fecha = [
-            '%d/%m/%y %I:%M %p',  # Ejemplo: 03/02/25 10:44 AM
-            '%Y-%m-%d %H:%M:%S',  # Ejemplo: 2025-02-03 09:45:00
-            '%d/%m/%y %H:%M:%S',  # Ejemplo: 03/02/25 15:02:15
-            '%d/%m/%y',           # Ejemplo: 03/02/25
-            '%Y-%m-%d %H:%M',     # Ejemplo: 2025-02-03 09:48
-            '%d/%m/%Y %I:%M %p',  # Ejemplo: 03/02/2025 07:38 AM
-            '%d/%m/%Y %H:%M',     # Ejemplo: 31/01/2025 13:04
-        ]
-        
-        # Intentar convertir el valor con cada formato
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, serie.iloc[:0]
+
+    validos = serie.notna() & ~serie.isin(valores_fecha_vacios)
+    textos = serie[validos].astype(str).str.strip()
+
+    # Trabajar solo con los valores únicos
+    pendientes = pd.Series(textos.unique(), dtype=object)
+    convertidas = []
+    for formato in formatos_fecha:
+        if pendientes.empty:
+            break
+        fechas = pd.to_datetime(pendientes, format=formato, errors='coerce').dropna()
+        convertidas.append(pd.Series(fechas.values, index=pendientes[fechas.index].values))
+        pendientes = pendientes.drop(fechas.index)
+
+    # Valores que pandas no convirtió con ningún formato: se prueban con 'strptime' para
+    # mantener su mismo criterio (los que tampoco calzan quedan como no convertidos)
+    rescatadas = {}
+    for texto in pendientes:
         for formato in formatos_fecha:
             try:
-                return datetime.strptime(valor, formato)
+                rescatadas[texto] = datetime.strptime(texto, formato)
+                break
             except ValueError:
-                continue
-        
-        # Si ninguno de los formatos funciona, devuelve np.nan
-        return np.nan
+                pass
+    if rescatadas:
+        convertidas.append(pd.Series(pd.to_datetime(list(rescatadas.values())), index=list(rescatadas.keys())))
+
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    mapa = pd.concat(convertidas) if convertidas else None
+    # Con un mapa vacío 'map' intenta convertir las fechas a float, por lo que se omite
+    if mapa is not None and not mapa.empty:
+        resultado[validos] = textos.map(mapa)
+
+    no_convertidos = serie[validos & resultado.isna()]
+    return resultado, no_convertidos
+
 
-    valores_no_convertidos = []  # Lista para almacenar valores que no se pudieron convertir
+def convertir_fechas(df, nombre_columna):
+    """
+    Convierte una columna del DataFrame a formato datetime unificado (YYYY-MM-DD HH:MM:SS)
+    utilizando 'parsear_fechas'. Si algún valor no se puede convertir, se muestra en consola
+    la cantidad de valores no convertidos junto con una muestra de ellos.
+
+    Args:
+        df (pd.DataFrame): DataFrame con los datos.
+        nombre_columna (str): Nombre de la columna a convertir.
 
-    # Aplicar la función de conversión a la columna especificada.
-    # Se utiliza "or valores_no_convertidos.append(x)" para capturar los valores no convertidos.
-    columna_unificada = df[nombre_columna].apply(lambda x: convertir_fecha(x) or valores_no_convertidos.append(x))
+    Returns:
+        pd.DataFrame: DataFrame con la columna convertida a datetime.
+    """
+    columna_unificada, no_convertidos = parsear_fechas(df[nombre_columna])
 
-    # Imprimir los primeros 20 valores que no se pudieron convertir, si los hubiera.
-    if valores_no_convertidos:
-        print(f"Columna: {nombre_columna} - Valores no convertidos: {', '.join(map(str, valores_no_convertidos[:20]))}")
+    # Mostrar la cantidad de valores no convertidos y una muestra de hasta 20 valores distintos
+    if not no_convertidos.empty:
+        muestra = no_convertidos.astype(str).unique()[:20]
+        print(f"Columna: {nombre_columna} - {len(no_convertidos)} valores no convertidos. Muestra: {', '.join(muestra)}")
 
     # Reemplazar la columna original con la columna convertida
     df[nombre_columna] = columna_unificada
@@ -272,146 +725,515 @@ def convertir_fechas(df, nombre_columna):
     return df
 
 
-def actualizar_tipos_datos(conexion, tabla, df):
+def obtener_tipos_columnas(conexion, tabla):
+    """
+    Obtiene el tipo de dato de cada columna de una tabla según 'metadatos_de_tablas'.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+
+    Returns:
+        dict: Diccionario {nombre_columna: tipo_dato}.
+    """
+    query = "SELECT nombre_columna, tipo_dato FROM metadatos_de_tablas WHERE nombre_tabla = ?"
+    return dict(conexion.execute(query, (tabla,)).fetchall())
+
+
+def decodificar_fecha_bd(serie, tipo_dato):
+    """
+    Convierte una columna DATETIME o DATE leída de la base de datos usando su formato canónico.
+
+    Los datos guardados por este proceso ya están en formato ISO, por lo que basta una única
+    conversión con formato fijo. Solo los valores antiguos que no cumplan el formato se convierten
+    con el criterio anterior ('parsear_fechas' para DATETIME, inferencia de pandas para DATE).
+
+    Args:
+        serie (pd.Series): Columna leída de la base de datos.
+        tipo_dato (str): 'DATETIME' o 'DATE'.
+
+    Returns:
+        pd.Series: Serie datetime64 (DATETIME) o con objetos date (DATE).
+    """
+    fechas = pd.to_datetime(serie, format=formatos_bd[tipo_dato], errors='coerce')
+    pendientes = serie.notna() & fechas.isna()
+    if pendientes.any():
+        if tipo_dato == 'DATETIME':
+            fechas[pendientes] = parsear_fechas(serie[pendientes])[0]
+        else:
+            fechas[pendientes] = pd.to_datetime(serie[pendientes], errors='coerce')
+    return fechas.dt.date if tipo_dato == 'DATE' else fechas
+
+
+def decodificar_fechas(conexion, tabla, df):
+    """
+    Convierte únicamente las columnas DATETIME y DATE de un DataFrame leído de la base de datos,
+    según los tipos registrados en 'metadatos_de_tablas' para la tabla de origen.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla de origen de los datos.
+        df (pd.DataFrame): DataFrame leído de la tabla.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas de fecha convertidas.
+    """
+    for nombre_columna, tipo_dato in obtener_plan_conversion(conexion, tabla).items():
+        if nombre_columna in df.columns and tipo_dato in formatos_bd:
+            df[nombre_columna] = decodificar_fecha_bd(df[nombre_columna], tipo_dato)
+    return df
+
+
+def codificar_fechas_bd(df, tipos_columnas):
+    """
+    Devuelve un DataFrame con las columnas DATETIME y DATE convertidas a texto en el formato
+    canónico de la base de datos. El DataFrame original no se modifica.
+
+    Args:
+        df (pd.DataFrame): DataFrame con los tipos de datos ya actualizados.
+        tipos_columnas (dict): Diccionario {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        pd.DataFrame: DataFrame listo para guardarse en la base de datos.
+    """
+    columnas_fecha = {
+        nombre_columna: pd.to_datetime(df[nombre_columna], errors='coerce').dt.strftime(formatos_bd[tipo_dato])
+        for nombre_columna, tipo_dato in tipos_columnas.items()
+        if nombre_columna in df.columns and tipo_dato in formatos_bd
+    }
+    return df.assign(**columnas_fecha) if columnas_fecha else df
+
+
+def leer_tabla(conexion, tabla, consulta=None):
+    """
+    Lee una tabla (o una consulta sobre ella) y asigna los tipos de datos según los metadatos.
+
+    Las columnas de fecha se decodifican desde su formato canónico, sin probar formatos.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+        consulta (str, opcional): Consulta SQL a ejecutar. Por defecto "SELECT * FROM tabla".
+
+    Returns:
+        pd.DataFrame: DataFrame con los tipos de datos actualizados.
+    """
+    df = pd.read_sql_query(consulta or f"SELECT * FROM {tabla}", conexion)
+    return actualizar_tipos_datos(conexion, tabla, df, desde_bd=True)
+
+
+def obtener_plan_conversion(conexion, tabla):
+    """
+    Devuelve el plan de conversión de una tabla: el diccionario {nombre_columna: tipo_dato}
+    de 'metadatos_de_tablas'. Los metadatos se leen una sola vez por ejecución y se guardan
+    en 'planes_conversion'.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+
+    Returns:
+        dict: Plan de conversión de la tabla.
+    """
+    if tabla not in planes_conversion:
+        planes_conversion[tabla] = obtener_tipos_columnas(conexion, tabla)
+    return planes_conversion[tabla]
+
+
+def limpiar_planes_conversion():
+    """
+    Descarta los planes de conversión y las columnas provisionales registradas, para que la
+    siguiente ejecución vuelva a leer los metadatos.
+    """
+    planes_conversion.clear()
+    columnas_provisionales.clear()
+
+
+def inferir_tipo_dato(serie):
+    """
+    Infiere el tipo de dato de una columna sin metadatos a partir de una muestra de sus valores.
+
+    Solo las columnas numéricas se consideran INTEGER o REAL; el texto que parece un número
+    (códigos, IDs con ceros a la izquierda) se mantiene como TEXT salvo que sea una fecha.
+
+    Args:
+        serie (pd.Series): Columna a analizar.
+
+    Returns:
+        str: 'INTEGER', 'REAL', 'DATETIME' o 'TEXT'.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return 'DATETIME'
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    muestra = serie.dropna()
+    muestra = muestra[~muestra.isin(valores_fecha_vacios)].head(tamano_muestra_tipos)
+    if pd.api.types.is_float_dtype(serie):
+        return 'INTEGER' if (muestra % 1 == 0).all() else 'REAL'
+    if not muestra.empty and not len(parsear_fechas(muestra)[1]):
+        return 'DATETIME'
+    return 'TEXT'
+
+
+def registrar_columnas_provisionales(conexion, tabla, df, columnas):
+    """
+    Registra en 'metadatos_de_tablas' el tipo de dato inferido para columnas sin metadatos,
+    marcándolas como provisionales para que se revisen al final de la ejecución.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+        df (pd.DataFrame): DataFrame que contiene las columnas.
+        columnas (list): Columnas sin metadatos.
+    """
+    plan = obtener_plan_conversion(conexion, tabla)
+    tipos = {columna: inferir_tipo_dato(df[columna]) for columna in columnas}
+
+    with bloqueo_escritura:
+        # Agregar la columna 'provisional' a los metadatos si aún no existe
+        existentes = [fila[1] for fila in conexion.execute("PRAGMA table_info(metadatos_de_tablas)")]
+        if 'provisional' not in existentes:
+            conexion.execute("ALTER TABLE metadatos_de_tablas ADD COLUMN provisional INTEGER DEFAULT 0")
+
+        for columna, tipo_dato in tipos.items():
+            conexion.execute(
+                "INSERT INTO metadatos_de_tablas (nombre_tabla, nombre_columna, tipo_dato, provisional) VALUES (?, ?, ?, 1)",
+                (tabla, columna, tipo_dato)
+            )
+            plan[columna] = tipo_dato
+            columnas_provisionales.append((tabla, columna, tipo_dato))
+            print(f"\tColumna '{columna}' de la tabla {tabla} sin metadatos. Se registró como '{tipo_dato}' (provisional).")
+        conexion.commit()
+
+
+def reportar_columnas_provisionales():
+    """
+    Muestra las columnas cuyo tipo de dato se infirió durante la ejecución, para que se
+    confirmen o corrijan en 'metadatos_de_tablas' (columna 'provisional').
+    """
+    if not columnas_provisionales:
+        return
+    print("\nColumnas registradas con tipo de dato provisional:")
+    for tabla, columna, tipo_dato in columnas_provisionales:
+        print(f"\tTabla: {tabla}, Columna: {columna}, Tipo: {tipo_dato}")
+
+
+@tm.medido("tipos de datos {tabla}")
+def actualizar_tipos_datos(conexion, tabla, df, desde_bd=False):
     """
     Actualiza el tipo de dato de cada columna en el DataFrame según la información en la tabla de metadatos.
 
     La función realiza los siguientes pasos:
-      - Lee la tabla de metadatos 'metadatos_de_tablas' para la tabla específica.
-      - Verifica que todas las columnas del DataFrame existan en los metadatos.
-      - Si faltan columnas en los metadatos, solicita al usuario que ingrese el tipo de dato adecuado.
-      - Convierte las columnas del DataFrame al tipo de dato indicado:
+      - Obtiene el plan de conversión de la tabla (los metadatos se leen una vez por ejecución).
+      - Si faltan columnas en los metadatos, infiere su tipo de dato a partir de una muestra y
+        lo registra como provisional, sin detener la ejecución.
+      - Convierte en bloque las columnas del DataFrame al tipo de dato indicado:
             INTEGER, REAL, TEXT, DATE o DATETIME.
 
     Args:
         conexion (sqlite3.Connection): Conexión activa a la base de datos.
         tabla (str): Nombre de la tabla a actualizar.
-        df (pd.DataFrame): DataFrame con los datos a actualizar.
-    """
-    tabla_de_columnas = 'metadatos_de_tablas'
-
-    # Leer los metadatos para la tabla indicada
-    query = f"SELECT * FROM {tabla_de_columnas} WHERE nombre_tabla = '{tabla}'"
-    metadatos = pd.read_sql_query(query, conexion)
-
-    # Verificar si hay columnas en el DataFrame que no están en los metadatos
-    columnas_faltantes = [col for col in df.columns if col not in metadatos['nombre_columna'].values]
-
-    # Para cada columna faltante, se solicita al usuario que ingrese el tipo de dato
-    for columna in columnas_faltantes:
-        while True:
-            tipo_dato = input(f"Por favor, ingrese el tipo de dato para la columna '{columna}' \n(1: INTEGER, 2: REAL, 3: TEXT, 4: DATE, 5: DATETIME): ").strip()
-            tipo_dato_map = {'1': 'INTEGER', '2': 'REAL', '3': 'TEXT', '4': 'DATE', '5': 'DATETIME'}
-            if tipo_dato in tipo_dato_map:
-                tipo_dato = tipo_dato_map[tipo_dato]
-                print(f"Se ha seleccionado el tipo de dato '{tipo_dato}' para la columna '{columna}'.\n")
-                nuevo_metadato = pd.DataFrame({'nombre_tabla': [tabla], 'nombre_columna': [columna], 'tipo_dato': [tipo_dato]})
-                nuevo_metadato.to_sql(tabla_de_columnas, conexion, if_exists='append', index=False)
-                break
-            else:
-                print("Tipo de dato no válido. Intente nuevamente.")
-                
-    # Actualizar la tabla de metadatos luego de agregar las nuevas columnas
-    metadatos = pd.read_sql_query(query, conexion)
-
-    # Convertir cada columna del DataFrame al tipo de dato correspondiente
-    for _, row in metadatos.iterrows():
-        nombre_columna = row['nombre_columna']
-        tipo_dato = row['tipo_dato']
-        
+        df (pd.DataFrame): DataFrame con los datos a actualizar. Se modifica en el lugar.
+        desde_bd (bool, opcional): Indica que los datos se leyeron de la base de datos, por lo que
+                                   las fechas están en formato canónico y se decodifican sin probar formatos.
+                                   En modo compacto, además, las columnas se compactan ('compactar_columnas').
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con los tipos de datos actualizados.
+    """
+    plan = obtener_plan_conversion(conexion, tabla)
+
+    # Registrar las columnas que no están en los metadatos con el tipo de dato inferido
+    columnas_faltantes = [col for col in df.columns if col not in plan]
+    if columnas_faltantes:
+        registrar_columnas_provisionales(conexion, tabla, df, columnas_faltantes)
+
+    # Agrupar las columnas del DataFrame por tipo de dato
+    columnas_por_tipo = {}
+    for nombre_columna, tipo_dato in plan.items():
         if nombre_columna in df.columns:
-            if tipo_dato == 'INTEGER':
-                df[nombre_columna] = pd.to_numeric(df[nombre_columna], errors='coerce')
-                # Si el resultado es float64, se redondea y se convierte a entero
-                if df[nombre_columna].dtype == 'float64':
-                    df[nombre_columna] = df[nombre_columna].round(0)
-                df[nombre_columna] = df[nombre_columna].astype('Int64')
-            elif tipo_dato == 'REAL':
-                df[nombre_columna] = pd.to_numeric(df[nombre_columna], errors='coerce').astype(float)
-            elif tipo_dato == 'TEXT':
-                df[nombre_columna] = df[nombre_columna].astype(str)
+            columnas_por_tipo.setdefault(tipo_dato, []).append(nombre_columna)
+
+    # Convertir cada grupo de columnas al tipo de dato correspondiente
+    columnas = columnas_por_tipo.get('INTEGER')
+    if columnas:
+        # Los valores decimales se redondean antes de convertir a entero
+        df[columnas] = df[columnas].apply(pd.to_numeric, errors='coerce').round(0).astype('Int64')
+    columnas = columnas_por_tipo.get('REAL')
+    if columnas:
+        df[columnas] = df[columnas].apply(pd.to_numeric, errors='coerce').astype(float)
+    columnas = columnas_por_tipo.get('TEXT')
+    if columnas and not (modo_compacto and desde_bd):
+        df[columnas] = df[columnas].astype(str)
+    if modo_compacto and desde_bd:
+        compactar_columnas(df, columnas_por_tipo.get('INTEGER', []), columnas_por_tipo.get('TEXT', []))
+    for tipo_dato in formatos_bd:
+        for nombre_columna in columnas_por_tipo.get(tipo_dato, []):
+            if desde_bd:
+                df[nombre_columna] = decodificar_fecha_bd(df[nombre_columna], tipo_dato)
             elif tipo_dato == 'DATE':
                 df[nombre_columna] = pd.to_datetime(df[nombre_columna], errors='coerce').dt.date
-            elif tipo_dato == 'DATETIME':
-                df = convertir_fechas(df, nombre_columna)
+            else:
+                convertir_fechas(df, nombre_columna)
+    return df
+
+
+def compactar_columnas(df, columnas_enteras, columnas_texto):
+    """
+    Reduce la memoria que ocupan las columnas de un DataFrame leído de la base de datos (modo compacto):
+      - INTEGER: se guardan con el primer tipo de 'tipos_enteros_compactos' que admite sus valores.
+      - TEXT: los valores se convierten a texto conservando los nulos (no se convierten en "nan"), y las
+        columnas con pocos valores distintos ('proporcion_max_categorias') se guardan como categóricas.
+
+    Args:
+        df (pd.DataFrame): DataFrame a compactar. Se modifica en el lugar.
+        columnas_enteras (list): Columnas INTEGER (ya convertidas a 'Int64').
+        columnas_texto (list): Columnas TEXT.
+    """
+    for columna in columnas_enteras:
+        minimo, maximo = df[columna].min(), df[columna].max()
+        for tipo in tipos_enteros_compactos:
+            limites = np.iinfo(tipo.lower())
+            if pd.isna(minimo) or (limites.min <= minimo and maximo <= limites.max):
+                df[columna] = df[columna].astype(tipo)
+                break
+    for columna in columnas_texto:
+        serie = df[columna]
+        serie = serie.astype(object).where(serie.isna(), serie.astype(str))
+        if serie.nunique() <= proporcion_max_categorias * len(serie):
+            serie = serie.astype('category')
+        df[columna] = serie
+
+
+def expandir_categoricas(df):
+    """
+    Convierte las columnas categóricas de un DataFrame (modo compacto) a columnas de objetos, para
+    guardarlo o exportarlo con los mismos valores que en el modo normal.
+
+    Args:
+        df (pd.DataFrame): DataFrame a convertir. Se modifica en el lugar.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame sin columnas categóricas.
+    """
+    for columna in df.columns[df.dtypes == 'category']:
+        df[columna] = df[columna].astype(object)
+    return df
+
+
+def asegurar_indice_unico(conexion, tabla, claves):
+    """
+    Crea (si no existe) un índice único sobre las columnas clave de la tabla.
+
+    Las tablas creadas antes de existir el índice pueden tener registros repetidos; en ese caso
+    se conserva la última fila insertada de cada clave (equivalente a keep='last') antes de crear
+    el índice. En las tablas TOA se limpia además el sufijo "(antiguo)" de 'Estado_TOA' de los
+    registros históricos, ya que a partir de ahora la limpieza se aplica solo a los datos nuevos.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+        claves (list): Columnas que identifican de forma única cada registro.
+    """
+    nombre_indice = f"ux_{tabla}_{'_'.join(claves)}"
+    existe = conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (nombre_indice,)
+    ).fetchone()
+    if existe:
+        return
+
+    columnas_sql = ", ".join(f'"{col}"' for col in claves)
+    with conexion:
+        conexion.execute(
+            f'DELETE FROM "{tabla}" WHERE rowid NOT IN (SELECT MAX(rowid) FROM "{tabla}" GROUP BY {columnas_sql})'
+        )
+        columnas_tabla = [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{tabla}")')]
+        if "TOA" in tabla and 'Estado_TOA' in columnas_tabla:
+            conexion.execute(
+                f"""UPDATE "{tabla}" SET Estado_TOA = TRIM(REPLACE(Estado_TOA, '(antiguo)', ''))
+                WHERE Estado_TOA LIKE '%(antiguo)%'"""
+            )
+        conexion.execute(f'CREATE UNIQUE INDEX "{nombre_indice}" ON "{tabla}" ({columnas_sql})')
+    print(f"\tSe ha creado el índice único {nombre_indice} en la tabla {tabla}.")
+
+
+def asegurar_indices(conexion, tabla):
+    """
+    Crea (si no existen) los índices de 'indices_tablas' sobre las columnas de unión y de fecha de
+    la tabla. Las columnas que la tabla aún no tiene se omiten.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+    """
+    columnas_tabla = {fila[1] for fila in conexion.execute(f'PRAGMA table_info("{tabla}")')}
+    with conexion:
+        for columna in indices_tablas.get(tabla, []):
+            if columna in columnas_tabla:
+                conexion.execute(f'CREATE INDEX IF NOT EXISTS "ix_{tabla}_{columna}" ON "{tabla}" ("{columna}")')
 
 
 def actualizar_base_datos(conexion, tabla, df, id):
     """
-    Guarda el DataFrame en la tabla especificada de la base de datos SQLite.
+    Guarda el DataFrame en la tabla especificada de la base de datos SQLite de forma incremental.
 
     La función realiza lo siguiente:
-      - Intenta leer la tabla existente para obtener datos previos.
-      - Si la tabla existe, concatena los datos nuevos con los existentes y elimina duplicados según la columna 'id'.
-      - Si la tabla no existe, procede a crearla.
+      - Si la tabla incluye "TOA", limpia la columna 'Estado_TOA' de los registros nuevos.
+      - Elimina duplicados dentro de los datos nuevos según la clave (se conserva el último).
       - Actualiza los tipos de datos de cada columna mediante la función 'actualizar_tipos_datos'.
-      - Finalmente, guarda el DataFrame en la base de datos reemplazando la tabla existente.
+      - Si la tabla no existe, la crea; si existe, agrega las columnas nuevas que falten.
+      - Asegura un índice único sobre la clave y los índices de 'indices_tablas', y aplica los registros con
+        INSERT ... ON CONFLICT DO UPDATE en una sola transacción, sin releer la tabla completa. Los registros
+        con la clave incompleta (algún valor vacío) reemplazan al registro con la misma clave.
 
     Args:
         conexion (sqlite3.Connection): Conexión activa a la base de datos.
         tabla (str): Nombre de la tabla donde se guardarán los datos.
         df (pd.DataFrame): DataFrame con los datos a insertar.
         id (str): Nombre de la columna utilizada para identificar duplicados. 
-                  Si es 'Index', se crea una columna compuesta a partir de 'Order_ID' y 'Operation_Time'.
+                  Si es 'Index', la clave es compuesta por 'Order_ID' y 'Operation_Time'.
     """
-    try:
-        # Se intenta leer la tabla existente
-        query = f"SELECT * FROM {tabla}"
-        df_viejo = pd.read_sql_query(query, conexion)
-        print(f"\tLa tabla {tabla} se actualiza.")
-        # Se concatenan los datos existentes con los nuevos
-        df = pd.concat([df_viejo, df], ignore_index=True)
-        # Si la tabla incluye "TOA", limpiar la columna 'Estado_TOA'
-        if "TOA" in tabla:
-            df['Estado_TOA'] = df['Estado_TOA'].str.replace("(antiguo)", "", regex=False).str.strip()
-            print("\tSe ha limpiado la columna 'Estado_TOA' de la tabla.")
-        # Se eliminan duplicados basándose en la columna 'id'
-        if id != 'Index':
-            df = df.drop_duplicates(subset=id, keep='last')
-        else:
-            df['Index'] = df['Order_ID'].astype(str) + '_' + df['Operation_Time'].astype(str)
-            df = df.drop_duplicates(subset=id, keep='last')
-    except pd.io.sql.DatabaseError:
-        # Si la tabla no existe, se utilizarán los datos nuevos para crearla
-        print(f"\tLa tabla {tabla} no existe. Se creará una nueva.")
+    claves = claves_compuestas.get(id, [id])
+
+    # Si la tabla incluye "TOA", limpiar la columna 'Estado_TOA' de los registros nuevos
+    if "TOA" in tabla and 'Estado_TOA' in df.columns:
+        df['Estado_TOA'] = df['Estado_TOA'].str.replace("(antiguo)", "", regex=False).str.strip()
+        print("\tSe ha limpiado la columna 'Estado_TOA' de los registros nuevos.")
+    if id == 'Index':
+        df['Index'] = df['Order_ID'].astype(str) + '_' + df['Operation_Time'].astype(str)
+
+    # Se eliminan duplicados dentro de los datos nuevos basándose en la clave
+    if df.duplicated(subset=claves).any():
+        df = df.drop_duplicates(subset=claves, keep='last')
 
     # Actualizar los tipos de datos de cada columna según los metadatos
-    actualizar_tipos_datos(conexion, tabla, df)
+    df = actualizar_tipos_datos(conexion, tabla, df)
+
+    def insertar_o_actualizar(tabla_sql, conn, columnas, filas):
+        """
+        Método de inserción para 'to_sql' que aplica INSERT ... ON CONFLICT DO UPDATE.
+
+        El índice único trata los NULL como distintos, por lo que los registros con alguna parte de la
+        clave vacía nunca entran en conflicto: para ellos se elimina antes el registro con la misma clave
+        (comparando con IS) y luego se insertan, de modo que también se conserva el último.
+        """
+        columnas_sql = ", ".join(f'"{col}"' for col in columnas)
+        marcadores = ", ".join("?" for _ in columnas)
+        claves_sql = ", ".join(f'"{col}"' for col in claves)
+        actualizaciones = ", ".join(f'"{col}" = excluded."{col}"' for col in columnas if col not in claves)
+        accion = f"DO UPDATE SET {actualizaciones}" if actualizaciones else "DO NOTHING"
+        posiciones_claves = [list(columnas).index(col) for col in claves]
+        filas = list(filas)
+        filas_clave_vacia = [fila for fila in filas if any(fila[i] is None for i in posiciones_claves)]
+        if filas_clave_vacia:
+            print(f"\t⚠️ {len(filas_clave_vacia)} registros tienen la clave ({', '.join(claves)}) incompleta; "
+                  f"reemplazan al registro con la misma clave.")
+            condicion = " AND ".join(f'"{col}" IS ?' for col in claves)
+            conn.executemany(
+                f'DELETE FROM "{tabla}" WHERE {condicion}',
+                [tuple(fila[i] for i in posiciones_claves) for fila in filas_clave_vacia]
+            )
+            conn.executemany(f'INSERT INTO "{tabla}" ({columnas_sql}) VALUES ({marcadores})', filas_clave_vacia)
+            filas = [fila for fila in filas if not any(fila[i] is None for i in posiciones_claves)]
+        conn.executemany(
+            f'INSERT INTO "{tabla}" ({columnas_sql}) VALUES ({marcadores}) ON CONFLICT ({claves_sql}) {accion}',
+            filas
+        )
+
+    # Las fechas se guardan en formato canónico para no tener que adivinar el formato al leerlas
+    df_bd = codificar_fechas_bd(df, obtener_plan_conversion(conexion, tabla))
+
+    # Las escrituras se serializan con las de otras etapas que se ejecuten a la vez
+    with bloqueo_escritura:
+        tabla_existe = conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+        ).fetchone()
+        if tabla_existe:
+            print(f"\tLa tabla {tabla} se actualiza.")
+            # Agregar las columnas que aún no existan en la tabla
+            columnas_tabla = [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{tabla}")')]
+            with conexion:
+                for columna in df.columns:
+                    if columna not in columnas_tabla:
+                        conexion.execute(f'ALTER TABLE "{tabla}" ADD COLUMN "{columna}"')
+                        print(f"\tSe ha agregado la columna '{columna}' a la tabla {tabla}.")
+        else:
+            print(f"\tLa tabla {tabla} no existe. Se creará una nueva.")
+            codificar_fechas_bd(df.head(0), obtener_plan_conversion(conexion, tabla)).to_sql(tabla, conexion, index=False)
+
+        asegurar_indice_unico(conexion, tabla, claves)
+        asegurar_indices(conexion, tabla)
 
-    # Guardar (o reemplazar) la tabla en la base de datos
-    print(f"\tGuardando datos en la tabla {tabla}...")
-    df.to_sql(tabla, conexion, if_exists='replace', index=False)
+        # Insertar o actualizar los registros nuevos (pandas ejecuta la inserción en una sola transacción)
+        print(f"\tGuardando {len(df)} registros en la tabla {tabla}...")
+        df_bd.to_sql(tabla, conexion, if_exists='append', index=False, method=insertar_o_actualizar)
+        incrementar_version_tabla(conexion, tabla)
     print(f"\tTabla {tabla} actualizada correctamente.")
 
 
-def marcar_archivos_procesados(carpeta, archivos):
+def incrementar_version_tabla(conexion, tabla):
     """
-    Renombra los archivos Excel agregando el sufijo '_procesado' junto con la fecha actual
-    y los mueve a una subcarpeta 'old' para indicar que ya fueron procesados.
+    Incrementa la versión de una tabla en 'versiones_tablas'. Se llama cada vez que se escriben datos
+    en la tabla, de modo que las etapas que la leen detectan el cambio sin recorrer sus datos.
 
     Args:
-        carpeta (str): Ruta de la carpeta que contiene los archivos.
-        archivos (list): Lista de nombres de archivos procesados.
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla modificada.
     """
-    # Se define la ruta de la carpeta 'old' donde se moverán los archivos procesados
-    carpeta_old = os.path.join(carpeta, 'old')
-    # Se crea la carpeta 'old' si no existe
-    if not os.path.exists(carpeta_old):
-        os.makedirs(carpeta_old)
-    
-    # Para cada archivo en la lista, se renombra y se mueve a la carpeta 'old'
-    for archivo in archivos:
-        ruta_antigua = os.path.join(carpeta, archivo)
-        nombre_base, extension = os.path.splitext(archivo)
-        # Se obtiene la fecha actual en formato YYYYMMDD
-        dia_actual = datetime.now().strftime("%Y%m%d")
-        nuevo_nombre = f"{nombre_base}_procesado_{dia_actual}{extension}"
-        ruta_nueva = os.path.join(carpeta_old, nuevo_nombre)
-        
-        try:
-            os.rename(ruta_antigua, ruta_nueva)
-        except OSError as e:
-            print(f"Error al mover y renombrar el archivo {archivo}: {e}")
+    with bloqueo_escritura:
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS versiones_tablas (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL, fecha TEXT)"
+        )
+        conexion.execute(
+            """INSERT INTO versiones_tablas (tabla, version, fecha) VALUES (?, 1, ?)
+               ON CONFLICT (tabla) DO UPDATE SET version = version + 1, fecha = excluded.fecha""",
+            (tabla, datetime.now().strftime(formatos_bd['DATETIME']))
+        )
+        conexion.commit()
+
+
+def obtener_version_tabla(conexion, tabla):
+    """
+    Devuelve la versión actual de una tabla según 'versiones_tablas'.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla.
+
+    Returns:
+        int: Versión de la tabla (0 si nunca se registró una escritura).
+    """
+    try:
+        fila = conexion.execute("SELECT version FROM versiones_tablas WHERE tabla = ?", (tabla,)).fetchone()
+    except sqlite3.OperationalError:
+        return 0  # La tabla de versiones aún no existe
+    return fila[0] if fila else 0
+
+
+def registrar_archivos_procesados(conexion, tabla, archivos, duplicado=False):
+    """
+    Registra los archivos procesados en la tabla 'processed_files' para evitar reprocesos.
+    Los archivos se mantienen en su carpeta.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla (str): Nombre de la tabla a la que se cargaron los archivos.
+        archivos (list): Diccionarios devueltos por 'obtener_archivos_excel'.
+        duplicado (bool, opcional): Indica que los archivos se omitieron por tener el mismo contenido
+                                    que un archivo ya procesado.
+    """
+    if not archivos:
+        return
+    fecha_procesado = datetime.now().strftime(formatos_bd['DATETIME'])
+    with bloqueo_escritura:
+        conexion.executemany(
+            """INSERT OR REPLACE INTO processed_files
+               (tabla, nombre, tamano, mtime, hash, fecha_archivo, fecha_procesado, duplicado)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(tabla, a['nombre'], a['tamano'], a['mtime'], a['hash'], a['fecha_archivo'], fecha_procesado, int(duplicado))
+             for a in archivos]
+        )
+        conexion.commit()
 
 
 def combinar_datos_sitios(carpeta, tabla, conexion, id):
@@ -444,13 +1266,13 @@ def combinar_datos_sitios(carpeta, tabla, conexion, id):
         file_path = os.path.join(carpeta, file)
         
         if "sitios" in file.lower():
-            base_sitios = pd.read_excel(file_path)
+            base_sitios = leer_excel_cacheado(file_path)
         elif "swap" in file.lower():
-            casos_swap = pd.read_excel(file_path)
+            casos_swap = leer_excel_cacheado(file_path)
             # Se filtran únicamente las columnas relevantes
             casos_swap = casos_swap[["Codigo Estacion", "Fecha Fin Swap", "Alarmas Activas Nodo"]]
         elif "tss" in file.lower():
-            casos_tss = pd.read_excel(file_path)
+            casos_tss = leer_excel_cacheado(file_path)
 
     # Validar que se hayan encontrado los tres archivos requeridos
     if base_sitios is None or casos_swap is None or casos_tss is None:
@@ -497,10 +1319,10 @@ def actualizar_lista_tickets_test(conexion, tabla_tickets, tabla_tickets_test):
 
     # Leer la hoja 'TEST' del archivo Excel 'Tickets_cambios.xlsx'
     ruta_tickets_cambios = os.path.join(base_path, "DATA", 'INFO TICKETS', 'Tickets_cambios.xlsx')
-    df_tickets_test = pd.read_excel(ruta_tickets_cambios, sheet_name='TEST')
+    df_tickets_test = leer_excel(ruta_tickets_cambios, sheet_name='TEST')
 
     # Leer la hoja 'ERRORES' del archivo Excel y filtrar los registros que corresponden a TEST
-    df_errores = pd.read_excel(ruta_tickets_cambios, sheet_name='ERRORES')
+    df_errores = leer_excel(ruta_tickets_cambios, sheet_name='ERRORES')
     df_errores_test = df_errores[df_errores['Sustituido'] == 'TEST']
     df_errores_test = df_errores_test[['Nro_TOA']].copy()
     df_errores_test['Notas'] = 'Error al pasar de Autin'
@@ -531,7 +1353,9 @@ def actualizar_lista_tickets_test(conexion, tabla_tickets, tabla_tickets_test):
             df_combined.at[index, 'Confirmado'] = 'NO'
 
     # Guardar los datos combinados en la tabla de tickets_test en la base de datos
-    df_combined.to_sql(tabla_tickets_test, conexion, if_exists='replace', index=False)
+    with bloqueo_escritura:
+        df_combined.to_sql(tabla_tickets_test, conexion, if_exists='replace', index=False)
+        incrementar_version_tabla(conexion, tabla_tickets_test)
     print(f"\tTabla {tabla_tickets_test} actualizada correctamente.")
     
     # Actualizar la hoja 'TEST' en el archivo Excel con el DataFrame combinado
@@ -664,7 +1488,7 @@ def etiquetar_nro_toa_y_rango(df_merged, archivo_excel):
         pd.DataFrame: DataFrame con las nuevas columnas 'EN_TDE' y 'en_rango' actualizadas.
     """
     # Leer el archivo Excel que contiene los datos de referencia
-    df_excel = pd.read_excel(archivo_excel)
+    df_excel = leer_excel(archivo_excel)
 
     # Asegurar que las columnas 'ID_TOA' y 'activityId' sean de tipo string para la comparación
     df_merged['ID_TOA'] = df_merged['ID_TOA'].astype(str)
@@ -686,27 +1510,208 @@ def etiquetar_nro_toa_y_rango(df_merged, archivo_excel):
     return df_merged
 
 
+def identificar_reiteradas(df, dias=None):
+    """
+    Marca como 'Reiterada' los tickets con otro ticket anterior del mismo sitio y equipo afectado
+    dentro de la ventana de días indicada, y asigna en 'TOA_Reiterado' el Nro_TOA del ticket anterior.
+
+    Como los tickets se ordenan por fecha dentro de cada sitio y equipo, basta comparar cada ticket
+    con el inmediatamente anterior del grupo: si algún ticket previo está dentro de la ventana,
+    el último de ellos también lo está.
+
+    Args:
+        df (pd.DataFrame): DataFrame con 'Codigo_Unico', 'Com_Level_1_Aff_Equip_1',
+                           'Fecha_de_Registro_de_actividad_TOA' y 'Nro_TOA'.
+        dias (int, opcional): Largo de la ventana en días. Por defecto se usa 'dias_reiteracion'.
+
+    Returns:
+        pd.DataFrame: DataFrame ordenado por sitio, equipo y fecha, con las columnas 'Reiteradas' y 'TOA_Reiterado'.
+    """
+    claves = ['Codigo_Unico', 'Com_Level_1_Aff_Equip_1']
+    df = df.sort_values(by=claves + ['Fecha_de_Registro_de_actividad_TOA'])
+    fecha = df['Fecha_de_Registro_de_actividad_TOA']
+
+    # Fecha y Nro_TOA del ticket anterior del mismo sitio y equipo
+    anterior = df.groupby(claves, sort=False)[['Fecha_de_Registro_de_actividad_TOA', 'Nro_TOA']].shift()
+
+    # Se evalúa solo si 'Com_Level_1_Aff_Equip_1' tiene valor
+    equipo = df['Com_Level_1_Aff_Equip_1']
+    reiterada = (
+        df['Codigo_Unico'].notna() & equipo.notna() & (equipo != '')
+        & (anterior['Fecha_de_Registro_de_actividad_TOA'] >= fecha - pd.Timedelta(days=dias or dias_reiteracion))
+    )
+    df['Reiteradas'] = np.where(reiterada, 'Reiterada', '')
+    df['TOA_Reiterado'] = anterior['Nro_TOA'].where(reiterada, '')
+    return df
+
+
+def evaluar_condicion(df, columna, operador, valor, parametros):
+    """
+    Evalúa una condición de 'reglas_etiquetas' sobre una columna completa del DataFrame.
+
+    Args:
+        df (pd.DataFrame): DataFrame a evaluar.
+        columna (str): Columna sobre la que se evalúa la condición.
+        operador (str): 'en', 'contiene', 'contiene_i' o 'en_parametro'.
+        valor: Lista de valores, texto a buscar o nombre del parámetro, según el operador.
+        parametros (dict): Parámetros recibidos por 'aplicar_reglas'.
+
+    Returns:
+        pd.Series: Serie booleana con el resultado de la condición para cada fila.
+    """
+    serie = df[columna]
+    if operador == 'en':
+        return serie.isin(valor)
+    if operador == 'en_parametro':
+        return serie.isin(parametros[valor])
+    if operador in ('contiene', 'contiene_i'):
+        return serie.astype(str).str.contains(valor, case=operador == 'contiene', regex=False, na=False)
+    raise ValueError(f"Operador de regla no válido: '{operador}'")
+
+
+def aplicar_reglas(df, columnas, **parametros):
+    """
+    Asigna las columnas de etiquetas indicadas según 'reglas_etiquetas', evaluando cada condición
+    sobre la columna completa y eligiendo la etiqueta de la primera regla que se cumple con 'np.select'.
+
+    Args:
+        df (pd.DataFrame): DataFrame a etiquetar. Se modifica en el lugar.
+        columnas (list): Columnas de 'reglas_etiquetas' que se asignan.
+        **parametros: Listas usadas por las condiciones 'en_parametro' (ej. tickets_test).
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas asignadas.
+    """
+    for columna in columnas:
+        reglas, valor_por_defecto = reglas_etiquetas[columna]
+        # Las condiciones se pasan a arreglos booleanos de numpy: sobre columnas 'Int64' 'isin' devuelve
+        # el tipo 'boolean' de pandas, que 'np.select' no acepta
+        condiciones = [
+            np.logical_and.reduce([evaluar_condicion(df, *condicion, parametros).to_numpy(dtype=bool, na_value=False)
+                                   for condicion in condiciones_regla])
+            for condiciones_regla, _ in reglas
+        ]
+        df[columna] = np.select(condiciones, [etiqueta for _, etiqueta in reglas], default=valor_por_defecto)
+    return df
+
+
+def calcular_diferencias_en_dias(df):
+    """
+    Calcula las columnas de 'diferencias_en_dias' como la cantidad de días entre dos fechas,
+    dejando vacías las diferencias que no son positivas.
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas de fecha. Se modifica en el lugar.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas de días calculadas.
+    """
+    for columna, (fecha_final, fecha_inicial) in diferencias_en_dias.items():
+        dias = (pd.to_datetime(df[fecha_final], errors='coerce') - pd.to_datetime(df[fecha_inicial], errors='coerce')).dt.days
+        df[columna] = dias.where(dias > 0)
+    return df
+
+
+def crear_vistas(conexion, tabla_TOA, tabla_autin, tabla_sitios):
+    """
+    Crea (o vuelve a crear, ya que las tablas pueden ganar columnas) las vistas que usa el análisis:
+      - 'vista_toa_sitios': tickets TOA unidos (LEFT JOIN) con sus sitios por el código de cliente, en
+        el orden de la tabla TOA. 'Código_de_Cliente' se llama 'Codigo_Unico' y las columnas de sitios
+        que también existen en TOA llevan el sufijo '_sitios'.
+      - 'vista_autin': columnas 'columnas_clasificacion_autin' de los tickets de Autin que se clasifican:
+        los de abastecimiento no cancelados y los CM o PLM proactivos sin un motivo de cancelación de
+        'motivos_cancelacion_excluidos' (un motivo vacío no los excluye). LIKE no distingue mayúsculas,
+        igual que los filtros de 'clasificar_tickets_autin'.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla_TOA (str): Nombre de la tabla TOA.
+        tabla_autin (str): Nombre de la tabla autin.
+        tabla_sitios (str): Nombre de la tabla sitios.
+
+    Returns:
+        dict: Columnas de sitios de 'vista_toa_sitios' con su nombre en la tabla de sitios.
+    """
+    columnas_TOA = [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{tabla_TOA}")')]
+    columnas_TOA = ['Codigo_Unico' if col == 'Código_de_Cliente' else col for col in columnas_TOA]
+    columnas_sitios = {}
+    for fila in conexion.execute(f'PRAGMA table_info("{tabla_sitios}")'):
+        if fila[1] != 'Codigo_Unico':
+            columnas_sitios[f"{fila[1]}_sitios" if fila[1] in columnas_TOA else fila[1]] = fila[1]
+
+    seleccion = [f't."Código_de_Cliente" AS "Codigo_Unico"' if col == 'Codigo_Unico' else f't."{col}"' for col in columnas_TOA]
+    seleccion += [f's."{original}" AS "{alias}"' for alias, original in columnas_sitios.items()]
+    # 's.rowid' indica si el ticket tiene sitio (las columnas de los tickets sin sitio quedan vacías)
+    seleccion.append('s.rowid AS "_fila_sitio"')
+    columnas_autin = ", ".join(f'"{col}"' for col in columnas_clasificacion_autin)
+    motivos = ", ".join(f"'{motivo}'" for motivo in motivos_cancelacion_excluidos)
+
+    with bloqueo_escritura, conexion:
+        conexion.execute(f'DROP VIEW IF EXISTS "{vista_toa_sitios}"')
+        conexion.execute(f'''
+            CREATE VIEW "{vista_toa_sitios}" AS
+            SELECT {", ".join(seleccion)}
+            FROM "{tabla_TOA}" t LEFT JOIN "{tabla_sitios}" s ON s."Codigo_Unico" = t."Código_de_Cliente"
+            ORDER BY t.rowid
+        ''')
+        conexion.execute(f'DROP VIEW IF EXISTS "{vista_autin}"')
+        conexion.execute(f'''
+            CREATE VIEW "{vista_autin}" AS
+            SELECT {columnas_autin}
+            FROM "{tabla_autin}"
+            WHERE (Task_Category LIKE '%Abastecimiento%' AND Task_Status IS NOT 'canceled')
+               OR ((Cancel_Reason IS NULL OR Cancel_Reason NOT IN ({motivos}))
+                   AND (Task_Id LIKE '%CM%' OR (Task_Id LIKE '%PLM%' AND Task_Category = 'PROACTIVO')))
+            ORDER BY rowid
+        ''')
+    return columnas_sitios
+
+
+def leer_toa_con_sitios(conexion, tabla_TOA, tabla_sitios, columnas_sitios):
+    """
+    Lee 'vista_toa_sitios' y asigna a cada columna el tipo de dato de su tabla de origen según los metadatos.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión activa a la base de datos.
+        tabla_TOA (str): Nombre de la tabla TOA.
+        tabla_sitios (str): Nombre de la tabla sitios.
+        columnas_sitios (dict): Columnas de sitios de la vista (devueltas por 'crear_vistas').
+
+    Returns:
+        pd.DataFrame: Tickets TOA con las columnas de su sitio, como el merge 'left' de ambas tablas.
+    """
+    df = pd.read_sql_query(f'SELECT * FROM "{vista_toa_sitios}"', conexion)
+    con_sitio = df.pop('_fila_sitio').notna()
+
+    columnas_TOA = [col for col in df.columns if col not in columnas_sitios]
+    df_TOA = df[columnas_TOA].rename(columns={'Codigo_Unico': 'Código_de_Cliente'})
+    df_TOA = actualizar_tipos_datos(conexion, tabla_TOA, df_TOA, desde_bd=True)
+    df_sitios = df[list(columnas_sitios)].rename(columns=columnas_sitios)
+    df_sitios = actualizar_tipos_datos(conexion, tabla_sitios, df_sitios, desde_bd=True)
+
+    # Los tickets sin sitio quedan con las columnas de sitios vacías (como en un merge 'left')
+    df_sitios = df_sitios.where(con_sitio, axis=0).rename(columns={v: k for k, v in columnas_sitios.items()})
+    return pd.concat([df_TOA.rename(columns={'Código_de_Cliente': 'Codigo_Unico'}), df_sitios], axis=1)
+
+
 def combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final):
     """
     Combina las tablas TOA, autin y sitios de la base de datos en una tabla consolidada.
     
     La función realiza los siguientes pasos:
-      1. Lee las tablas TOA, autin y sitios desde la base de datos.
-      2. Actualiza los tipos de datos en cada DataFrame usando metadatos.
-      3. Renombra la columna 'Código_de_Cliente' a 'Codigo_Unico' en TOA para facilitar la unión.
-      4. Verifica columnas duplicadas entre TOA y sitios (excepto 'Codigo_Unico') y las renombra en sitios.
-      5. Une TOA y sitios usando 'Codigo_Unico' y ordena por 'Fecha_de_Registro_de_actividad_TOA'.
+      1. Crea las vistas de la base de datos (ver 'crear_vistas').
+      2. Lee de 'vista_autin' solo las columnas y los tickets de Autin que se clasifican, con sus tipos de datos.
+      3. Lee de 'vista_toa_sitios' los tickets TOA unidos con sus sitios por el código de cliente
+         ('Codigo_Unico'), con las columnas de sitios repetidas en TOA renombradas con el sufijo '_sitios'.
+      4-5. Asigna los tipos de datos de cada tabla y ordena por 'Fecha_de_Registro_de_actividad_TOA'.
       6. Actualiza la lista de tickets test y marca en TOA los tickets confirmados como test.
-      7. Asigna valores en la columna 'Empresa' según si 'Bucket_Inicial' contiene "comfica" o "huawei".
-      8. Marca 'Marcha_Blanca' si el Departamento es "Puno" o la Provincia es "Cañete".
-      9. Marca como "Proactivo" en función de si en las Notas aparece la palabra "proactivo".
-      10. Define el responsable como 'FLM' si el Bucket contiene "comfica" o "huawei"; de lo contrario, 'TDP'.
+      7-10. Asigna 'TEST', 'Empresa', 'Marcha_Blanca', 'Proactivo' y 'Responsable' según 'reglas_etiquetas'.
       11. Convierte columnas de fechas y calcula los días de diferencia para SWAP y TSS.
       12. Clasifica los tickets de Autin, renombra la columna de unión y la une con TOA.
       13. Calcula el tiempo entre la creación de TOA y el ticket de Autin (en minutos).
-      14. Identifica tickets reiterados (tickets repetidos en un lapso de 7 días) y asigna la referencia del ticket anterior.
+      14. Identifica tickets reiterados (tickets repetidos en un lapso de 'dias_reiteracion' días) y asigna la referencia del ticket anterior.
       15. Estandariza los nombres de las columnas y etiqueta los tickets en función de un rango definido en un archivo Excel.
-      16. Asigna etiquetas personalizadas según condiciones en 'Estado_TOA' y 'Estado_1'.
+      16. Asigna la 'Etiqueta' según las condiciones en 'Estado_TOA' y 'Estado_1' de 'reglas_etiquetas'.
       17. Actualiza la tabla final en la base de datos y genera archivos Excel separados para Comfica y Huawei.
     
     Args:
@@ -716,69 +1721,29 @@ def combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
         tabla_sitios (str): Nombre de la tabla sitios en la base de datos.
         tabla_final (str): Nombre de la tabla consolidada a crear/actualizar.
     """
-    # 1. Leer las tablas desde la base de datos
-    query_TOA = f"SELECT * FROM {tabla_TOA}"
-    query_autin = f"SELECT * FROM {tabla_autin}"
-    query_sitios = f"SELECT * FROM {tabla_sitios}"
-
-    df_TOA = pd.read_sql_query(query_TOA, conexion)
-    df_autin = pd.read_sql_query(query_autin, conexion)
-    df_sitios = pd.read_sql_query(query_sitios, conexion)
-
-    # 2. Actualizar los tipos de datos en cada DataFrame según los metadatos
-    actualizar_tipos_datos(conexion, tabla_TOA, df_TOA)
-    actualizar_tipos_datos(conexion, tabla_autin, df_autin)
-    actualizar_tipos_datos(conexion, tabla_sitios, df_sitios)
-
-    # 3. Renombrar 'Código_de_Cliente' a 'Codigo_Unico' en TOA para facilitar la unión
-    df_TOA.rename(columns={'Código_de_Cliente': 'Codigo_Unico'}, inplace=True)
-
-    # 4. Verificar columnas duplicadas entre TOA y sitios (excepto 'Codigo_Unico') y renombrarlas en sitios
-    columnas_repetidas = [col for col in df_TOA.columns if col in df_sitios.columns and col != 'Codigo_Unico']
-    if columnas_repetidas:
-        for col in columnas_repetidas:
-            df_sitios.rename(columns={col: f"{col}_sitios"}, inplace=True)
-
-    # 5. Unir df_TOA y df_sitios usando 'Codigo_Unico' y ordenar por 'Fecha_de_Registro_de_actividad_TOA'
-    df_merged = df_TOA.merge(df_sitios, on="Codigo_Unico", how="left")    
+    # 1 y 2. Crear las vistas y leer los tickets de Autin a clasificar con los tipos de datos según los metadatos
+    columnas_sitios = crear_vistas(conexion, tabla_TOA, tabla_autin, tabla_sitios)
+    df_autin = leer_tabla(conexion, tabla_autin, f"SELECT * FROM {vista_autin}")
+
+    # 3 a 5. Leer TOA unida con sitios (la unión se hace en SQLite) y ordenar por 'Fecha_de_Registro_de_actividad_TOA'
+    with tm.medir("merge TOA-sitios") as medicion:
+        df_merged = leer_toa_con_sitios(conexion, tabla_TOA, tabla_sitios, columnas_sitios)
+        medicion['filas_salida'] = len(df_merged)
     df_merged.sort_values(by='Fecha_de_Registro_de_actividad_TOA', inplace=True)
 
-    # 6. Actualizar la lista de tickets test y marcar en TOA los tickets confirmados como test
+    # 6. Actualizar la lista de tickets test y obtener los tickets confirmados como test
     actualizar_lista_tickets_test(conexion, tabla_TOA, 'tickets_test')
     df_tickets_test = pd.read_sql_query("SELECT Nro_TOA FROM tickets_test WHERE Confirmado = 'SI'", conexion)
-    nro_toa_tickets_test = df_tickets_test['Nro_TOA'].tolist()
-    df_merged['TEST'] = df_merged['Nro_TOA'].apply(lambda x: 'TEST' if x in nro_toa_tickets_test else '')
-
-    # 7. Asignar la columna 'Empresa' según el contenido de 'Bucket_Inicial'
-    df_merged['Empresa'] = df_merged['Bucket_Inicial'].apply(
-        lambda x: 'comfica' if 'comfica' in x.lower() else ('huawei' if 'huawei' in x.lower() else '')
-    )
-    
-    # 8. Marcar como 'MB' en 'Marcha_Blanca' si Departamento es "Puno" o Provincia es "Cañete"
-    df_merged['Marcha_Blanca'] = df_merged.apply(
-        lambda x: 'MB' if x['Departamento'] == 'Puno' or x['Provincia'] == 'Cañete' else '', axis=1
-    )
 
-    # 9. Marcar como "Proactivo" si en 'Notas' aparece la palabra "proactivo"
-    df_merged['Notas'] = df_merged['Notas'].fillna('')
-    df_merged['Proactivo'] = df_merged['Notas'].str.contains('proactivo', case=False, na=False).map({True: 'Proactivo', False: ''})
-
-    # 10. Asignar 'Responsable': 'FLM' si 'Bucket_Inicial' contiene "comfica" o "huawei", de lo contrario 'TDP'
-    df_merged['Responsable'] = df_merged['Bucket_Inicial'].apply(
-        lambda x: 'FLM' if 'comfica' in x or 'huawei' in x else 'TDP'
-    )
+    # 7 a 10. Asignar 'TEST', 'Empresa', 'Marcha_Blanca', 'Proactivo' y 'Responsable' según 'reglas_etiquetas'
+    df_merged['Notas'] = df_merged['Notas'].astype(object).fillna('')
+    aplicar_reglas(df_merged, ['TEST', 'Empresa', 'Marcha_Blanca', 'Proactivo', 'Responsable'],
+                   tickets_test=df_tickets_test['Nro_TOA'].tolist())
 
     # 11. Convertir las columnas de fechas para SWAP y TSS a datetime y calcular la diferencia en días
     df_merged['Fecha_Fin_Swap'] = pd.to_datetime(df_merged['Fecha_Fin_Swap'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
     df_merged['Fecha_TSS'] = pd.to_datetime(df_merged['Fecha_TSS'], errors='coerce')
-    df_merged['SWAP_dias'] = df_merged.apply(
-        lambda x: (x['Fecha_de_Registro_de_actividad_TOA'] - x['Fecha_Fin_Swap']).days if (x['Fecha_de_Registro_de_actividad_TOA'] - x['Fecha_Fin_Swap']).days > 0 else None,
-        axis=1
-    )
-    df_merged['TSS_dias'] = df_merged.apply(
-        lambda x: (x['Fecha_de_Registro_de_actividad_TOA'] - x['Fecha_TSS']).days if (x['Fecha_de_Registro_de_actividad_TOA'] - x['Fecha_TSS']).days > 0 else None,
-        axis=1
-    )
+    calcular_diferencias_en_dias(df_merged)
 
     # 12. Clasificar los tickets de Autin y renombrar 'Number_OS_SIOM' a 'Nro_TOA' para la unión
     df_autin = clasificar_tickets_autin(df_autin, conexion)
@@ -787,25 +1752,16 @@ def combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
     # 13. Asegurar formato string y sin espacios en 'Nro_TOA' en ambos DataFrames, y unirlos
     df_merged['Nro_TOA'] = df_merged['Nro_TOA'].astype(str).str.strip()
     df_autin['Nro_TOA'] = df_autin['Nro_TOA'].astype(str).str.strip()
-    df_merged = df_merged.merge(df_autin, on='Nro_TOA', how='left')
+    with tm.medir("merge TOA-Autin", filas_entrada=len(df_merged)) as medicion:
+        df_merged = df_merged.merge(df_autin, on='Nro_TOA', how='left')
+        medicion['filas_salida'] = len(df_merged)
     print(f"\tSe han combinado los DataFrames de TOA y Autin. Tamaño: {df_merged.shape}")
 
     # 14. Calcular 'Tiempo_TOA_Autin' en minutos
     df_merged['Tiempo_TOA_Autin'] = (df_merged['Createtime_1'] - df_merged['Fecha_de_Registro_de_actividad_TOA']).dt.total_seconds() / 60
 
     # 15. Identificar tickets reiterados en un lapso de 7 días y asignar referencia
-    df_merged.sort_values(by=['Codigo_Unico', 'Com_Level_1_Aff_Equip_1', 'Fecha_de_Registro_de_actividad_TOA'], inplace=True)
-    df_merged['Reiteradas'] = ''
-    df_merged['TOA_Reiterado'] = ''
-    for (codigo_unico, equip), group in df_merged.groupby(['Codigo_Unico', 'Com_Level_1_Aff_Equip_1']):
-        if equip:  # Se evalúa solo si 'Com_Level_1_Aff_Equip_1' tiene valor
-            for i in range(1, len(group)):
-                current_ticket = group.iloc[i]
-                previous_tickets = group.iloc[:i]
-                previous_ticket = previous_tickets[previous_tickets['Fecha_de_Registro_de_actividad_TOA'] >= current_ticket['Fecha_de_Registro_de_actividad_TOA'] - pd.Timedelta(days=7)]
-                if not previous_ticket.empty:
-                    df_merged.loc[current_ticket.name, 'Reiteradas'] = 'Reiterada'
-                    df_merged.loc[current_ticket.name, 'TOA_Reiterado'] = previous_ticket.iloc[-1]['Nro_TOA']
+    df_merged = identificar_reiteradas(df_merged)
 
     # 16. Estandarizar nombres de columnas mediante la función 'actulizar_columnas'
     df_merged = actulizar_columnas(df_merged)
@@ -818,22 +1774,10 @@ def combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
     df_merged = etiquetar_nro_toa_y_rango(df_merged, archivo_excel)
 
     # 19. Asignar etiquetas personalizadas según condiciones en 'Estado_TOA' y 'Estado_1'
-    def asignar_etiqueta(row):
-        if row['Estado_TOA'] in ['Cancelado'] and row['Estado_1'] in ['accepted', 'closed', 'completed', 'dispatched', 'inprocess', 'unscheduled']:
-            return 'cruce incorrecto'
-        elif row['Estado_TOA'] in ['Completado'] and row['Estado_1'] in ['accepted', 'canceled', 'dispatched', 'inprocess', 'unscheduled']:
-            return 'cruce incorrecto'
-        elif row['Estado_TOA'] in ['Pendiente'] and row['Estado_1'] in ['closed', 'completed', 'canceled']:
-            return 'falta de revisión'
-        elif row['Estado_TOA'] in ['Pre cierre'] and row['Estado_1'] in ['closed', 'completed', 'canceled']:
-            return 'falta de revisión'
-        elif row['Estado_TOA'] in ['Suspendido'] and row['Estado_1'] in ['closed', 'completed', 'canceled']:
-            return 'falta de revisión'
-        else:
-            return ''
-    df_merged['Etiqueta'] = df_merged.apply(asignar_etiqueta, axis=1)
+    aplicar_reglas(df_merged, ['Etiqueta'])
 
-    # 20. Actualizar la tabla final consolidada en la base de datos
+    # 20. Actualizar la tabla final consolidada en la base de datos (en modo compacto, sin columnas categóricas)
+    expandir_categoricas(df_merged)
     actualizar_base_datos(conexion, tabla_final, df_merged, 'ID_TOA')
 
     # 21. Generar archivos Excel separados para Comfica y Huawei
@@ -848,52 +1792,50 @@ def combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
     archivo_comfica = os.path.join(base_path, "reporte_Comfica.xlsx")
     df_comfica.replace([0, np.nan, None, 'nan'], '', inplace=True)
     df_comfica.drop(columns=columnas_a_eliminar, inplace=True, errors='ignore')
-    df_comfica.to_excel(archivo_comfica, index=False)
+    with tm.medir("exportar reporte_Comfica", filas_entrada=len(df_comfica)) as medicion:
+        df_comfica.to_excel(archivo_comfica, index=False)
+        medicion['filas_salida'] = len(df_comfica)
     print(f"\tArchivo Excel para Comfica guardado en: {archivo_comfica}")
 
     df_huawei = df_merged[df_merged['Bucket'].str.contains('huawei', case=False, na=False)].copy()
     archivo_huawei = os.path.join(base_path, "reporte_Huawei.xlsx")
     df_huawei.replace([0, np.nan, None, 'nan'], '', inplace=True)
     df_huawei.drop(columns=columnas_a_eliminar, inplace=True, errors='ignore')
-    df_huawei.to_excel(archivo_huawei, index=False)
+    with tm.medir("exportar reporte_Huawei", filas_entrada=len(df_huawei)) as medicion:
+        df_huawei.to_excel(archivo_huawei, index=False)
+        medicion['filas_salida'] = len(df_huawei)
     print(f"\tArchivo Excel para Huawei guardado en: {archivo_huawei}")
 
 
-def ordenar_y_seleccionar_tickets(grupo, max_tickets):
+def seleccionar_tickets_por_prioridad(df, max_tickets):
     """
-    Ordena los tickets de un grupo según una clave de prioridad y la fecha de creación, y selecciona
-    los primeros 'max_tickets' tickets.
+    Ordena los tickets de cada 'Number_OS_SIOM' según una clave de prioridad y la fecha de creación,
+    y selecciona los primeros 'max_tickets' tickets de cada uno.
 
-    La prioridad se define en base al estado de la tarea:
+    La prioridad se define en base al estado de la tarea ('prioridad_estados_autin'):
       - 'closed' tiene la mayor prioridad (1)
       - 'completed' es la segunda prioridad (2)
       - 'canceled' es la menor prioridad (4)
       - Estados no definidos reciben prioridad 3
 
+    Se hace un único ordenamiento estable de todo el DataFrame, por lo que los empates conservan
+    el orden original igual que al ordenar cada grupo por separado.
+
     Args:
-        grupo (pd.DataFrame): Grupo de tickets a ordenar.
-        max_tickets (int): Número máximo de tickets a seleccionar.
+        df (pd.DataFrame): DataFrame con los tickets.
+        max_tickets (int): Número máximo de tickets a seleccionar por 'Number_OS_SIOM'.
 
     Returns:
-        pd.DataFrame: DataFrame con hasta 'max_tickets' tickets ordenados.
+        pd.DataFrame: DataFrame con hasta 'max_tickets' tickets por 'Number_OS_SIOM', con las
+                      columnas 'Prioridad' y 'Orden' (posición dentro del grupo).
     """
-    if grupo.empty:
-        return pd.DataFrame()
-
-    # Asignar prioridad basada en 'Task_Status'
-    prioridad = {
-        'closed': 1,
-        'completed': 2,
-        'canceled': 4  # 'canceled' es de menor prioridad
-    }
-    grupo['Prioridad'] = grupo['Task_Status'].map(prioridad).fillna(3)
-    # Ordenar por prioridad y por 'Createtime'
-    grupo = grupo.sort_values(by=['Prioridad', 'Createtime'], ascending=[True, True])
-    grupo['Orden'] = range(1, len(grupo) + 1)
-    # Seleccionar los primeros max_tickets
-    return grupo.head(max_tickets)
+    df = df.assign(Prioridad=df['Task_Status'].astype(object).map(prioridad_estados_autin).fillna(3))
+    df = df.sort_values(by=['Number_OS_SIOM', 'Prioridad', 'Createtime'], kind='mergesort')
+    df['Orden'] = df.groupby('Number_OS_SIOM').cumcount() + 1
+    return df[df['Orden'] <= max_tickets]
 
 
+@tm.medido()
 def clasificar_tickets_autin(df_autin, conexion):
     """
     Clasifica los tickets de Autin y les asigna una prioridad, consolidando información adicional
@@ -905,9 +1847,9 @@ def clasificar_tickets_autin(df_autin, conexion):
       3. Verificar duplicados en 'Task_Id' y notificar si existen.
       4. Filtrar los tickets relacionados con "Abastecimiento" (excluyendo cancelados) y renombrar columnas.
       5. Excluir tickets con ciertas razones de cancelación y filtrar por patrones en 'Task_Id' y 'Task_Category'.
-      6. Unir la información de abastecimiento con df_autin y calcular la diferencia en días.
+      6. Asociar el último ticket de abastecimiento previo del mismo sitio (unión as-of) y calcular la diferencia en días.
       7. Unir la información de PR proveniente de 'tickets_pr'.
-      8. Agrupar por 'Number_OS_SIOM', ordenar y seleccionar hasta 3 tickets por grupo.
+      8. Ordenar por 'Number_OS_SIOM' y prioridad, y seleccionar hasta 3 tickets por grupo.
       9. Calcular la duración en horas entre 'Complete_Time' y 'Createtime'.
       10. Pivotar el DataFrame para tener un ticket por fila y asegurar que existan las columnas esperadas.
 
@@ -926,7 +1868,7 @@ def clasificar_tickets_autin(df_autin, conexion):
 
     # 2. Convertir 'Createtime' a datetime y seleccionar columnas relevantes de df_autin
     df_autin['Createtime'] = pd.to_datetime(df_autin['Createtime'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-    df_autin = df_autin[['Task_Id', 'Task_Category', 'Createtime', 'Cancel_Reason', 'Task_Status', 'Site_Id', 'Com_Level_1_Aff_Equip', 'Number_OS_SIOM', 'Reject_Counter', 'Complete_Time']]
+    df_autin = df_autin[columnas_clasificacion_autin]
     
     # 3. Comprobar duplicados en 'Task_Id'
     if df_autin['Task_Id'].duplicated().any():
@@ -941,18 +1883,26 @@ def clasificar_tickets_autin(df_autin, conexion):
     Autin_abastecimiento.sort_values(by=['Site_Id', 'Createtime_Abastecimiento'], inplace=True)
 
     # 5. Excluir tickets con ciertas razones de cancelación y aplicar filtros basados en 'Task_Id' y 'Task_Category'
-    df_autin = df_autin[(df_autin['Cancel_Reason'] != 'Duplicado') &
-                        (df_autin['Cancel_Reason'] != 'Other') &
-                        (df_autin['Cancel_Reason'] != 'Tarea de prueba') &
-                        (df_autin['Cancel_Reason'] != 'Monitoreo')]
+    df_autin = df_autin[~df_autin['Cancel_Reason'].isin(motivos_cancelacion_excluidos)]
     df_autin = df_autin[
         (df_autin['Task_Id'].str.contains("CM", case=False, na=False)) |
         ((df_autin['Task_Id'].str.contains("PLM", case=False, na=False)) & (df_autin['Task_Category'] == "PROACTIVO"))
     ]
 
-    # 6. Unir la información de abastecimiento con df_autin basándose en 'Site_Id'
-    df_autin_con_abastecimiento = df_autin.merge(Autin_abastecimiento, on='Site_Id', how='left')
-    df_autin_con_abastecimiento = df_autin_con_abastecimiento[df_autin_con_abastecimiento['Createtime_Abastecimiento'] < df_autin_con_abastecimiento['Createtime']]
+    # 6. Asociar a cada ticket el último ticket de abastecimiento del mismo 'Site_Id' creado antes que él.
+    # Se usa una unión as-of (ambos lados ordenados por fecha), por lo que no se genera el producto
+    # de todos los tickets del sitio con todos sus abastecimientos.
+    df_autin = df_autin.reset_index(drop=True)
+    tickets_con_fecha = df_autin[df_autin['Createtime'].notna()].sort_values(by='Createtime', kind='mergesort')
+    abastecimientos_con_fecha = Autin_abastecimiento[Autin_abastecimiento['Createtime_Abastecimiento'].notna()].sort_values(
+        by='Createtime_Abastecimiento', kind='mergesort'
+    )
+    df_autin_con_abastecimiento = pd.merge_asof(
+        tickets_con_fecha.reset_index(), abastecimientos_con_fecha,
+        left_on='Createtime', right_on='Createtime_Abastecimiento', by='Site_Id',
+        direction='backward', allow_exact_matches=False
+    ).set_index('index').sort_index()
+    df_autin_con_abastecimiento = df_autin_con_abastecimiento[df_autin_con_abastecimiento['Createtime_Abastecimiento'].notna()]
     df_autin_con_abastecimiento.sort_values(by=['Site_Id', 'Createtime_Abastecimiento'], inplace=True)
     df_autin_con_abastecimiento.drop_duplicates(subset=['Site_Id', 'Task_Id'], keep='last', inplace=True)
     df_autin = pd.concat([df_autin, df_autin_con_abastecimiento], ignore_index=True)
@@ -962,22 +1912,17 @@ def clasificar_tickets_autin(df_autin, conexion):
     # 7. Unir la información de PR proveniente de 'tickets_pr'
     df_autin = df_autin.merge(df_tickets_pr, on='Task_Id', how='left')
 
-    # 8. Agrupar por 'Number_OS_SIOM', ordenar y seleccionar hasta 3 tickets por grupo
+    # 8. Ordenar por 'Number_OS_SIOM' y prioridad, y seleccionar hasta 3 tickets por grupo
     df_autin['Number_OS_SIOM'] = df_autin['Number_OS_SIOM'].astype(str)
     df_autin = df_autin[df_autin['Number_OS_SIOM'].str.len() == 8]
-    df_autin = df_autin.groupby('Number_OS_SIOM', group_keys=False).apply(lambda x: ordenar_y_seleccionar_tickets(x, 3))
-    
+    df_autin = seleccionar_tickets_por_prioridad(df_autin, 3)
+
     # 9. Convertir 'Complete_Time' a datetime y calcular la duración en horas
     df_autin['Complete_Time'] = pd.to_datetime(df_autin['Complete_Time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-    df_autin['Duration_hours'] = df_autin.apply(
-        lambda row: (row['Complete_Time'] - row['Createtime']).total_seconds() / 3600 if pd.notnull(row['Complete_Time']) else None,
-        axis=1
-    )
+    df_autin['Duration_hours'] = (df_autin['Complete_Time'] - df_autin['Createtime']).dt.total_seconds() / 3600
 
-    # 10. Reordenar y pivotar el DataFrame para tener un ticket por fila
-    df_autin = df_autin.sort_values(by=['Number_OS_SIOM', 'Orden'])
-    df_autin['Orden_Index'] = df_autin.groupby('Number_OS_SIOM').cumcount() + 1
-    df_pivot = df_autin.pivot(index='Number_OS_SIOM', columns='Orden_Index')
+    # 10. Pivotar el DataFrame para tener un ticket por fila (columnas '<columna>_<orden>')
+    df_pivot = df_autin.set_index(['Number_OS_SIOM', df_autin['Orden'].rename('Orden_Index')]).unstack('Orden_Index')
     df_pivot.columns = [f"{col[0]}_{col[1]}" for col in df_pivot.columns]
     df_final = df_pivot.reset_index()
 
@@ -993,18 +1938,39 @@ def clasificar_tickets_autin(df_autin, conexion):
     return df_final
 
 
+def valor_celda_excel(valor):
+    """
+    Prepara un valor del DataFrame para escribirlo en una celda de Excel.
+
+    Los valores "nan", "None", nulos o 0 se dejan vacíos para evitar mostrar datos no deseados.
+
+    Args:
+        valor: Valor de la celda.
+
+    Returns:
+        El valor a escribir, o None si la celda debe quedar vacía.
+    """
+    if pd.isna(valor) or valor in ["nan", "None"] or valor == 0:
+        return None
+    return valor
+
+
 def convertir_tabla_a_excel(tabla, archivo_salida, conexion, hoja_nombre='Sheet1'):
     """
     Convierte una tabla de la base de datos en un archivo Excel formateado.
 
     La función realiza lo siguiente:
       - Lee la tabla desde la base de datos y actualiza sus tipos de datos.
-      - Crea un nuevo libro de trabajo y define una hoja con el nombre especificado.
-      - Agrega los datos del DataFrame a la hoja, aplicando formatos condicionales:
-            * Para celdas con valores numéricos (ej. "Rechazos", "Dias_Swap", "Dias_TSS") se aplica un formato naranja si cumplen ciertas condiciones.
-            * Para celdas correspondientes a "Estado_PR_X", si contienen la palabra "Pause", también se formatean en naranja.
-      - Agrega una columna con una fórmula de Excel que calcula el "Semaforo" (diferencia en horas entre la fecha actual y un valor en la columna B).
-      - Define y crea una tabla de Excel con estilo y aplica formato condicional a la columna "Semaforo".
+      - Crea un libro de trabajo en modo de solo escritura y escribe las filas en una sola pasada,
+        sin mantener las celdas en memoria.
+      - Agrega una columna con una fórmula de Excel que calcula el "Semaforo" (diferencia en horas
+        entre la fecha actual y un valor en la columna B) en las filas no completadas ni canceladas.
+      - Define y crea una tabla de Excel con estilo.
+      - Aplica formatos condicionales por rango (se evalúan en Excel, no celda por celda):
+            * Naranja en "Rechazos" mayor a 0, y en "Dias_Swap" / "Dias_TSS" distintos de 0 y menores a 8
+              (junto con las columnas anteriores).
+            * Naranja en "Estado_PR_X" (y las dos columnas anteriores) si contiene la palabra "Pause".
+            * Verde, amarillo o rojo en la columna "Semaforo" según las horas transcurridas.
       - Guarda y cierra el archivo Excel.
 
     Args:
@@ -1013,124 +1979,99 @@ def convertir_tabla_a_excel(tabla, archivo_salida, conexion, hoja_nombre='Sheet1
         conexion (sqlite3.Connection): Conexión activa a la base de datos SQLite.
         hoja_nombre (str, opcional): Nombre de la hoja en el archivo Excel. Por defecto "Sheet1".
     """
-    # Crear un nuevo libro de trabajo y establecer la hoja activa con el nombre indicado
-    wb = Workbook()
-    ws = wb.active
-    ws.title = hoja_nombre
-
-    # Leer la tabla desde la base de datos y actualizar los tipos de datos usando los metadatos
-    df = pd.read_sql_query(f"SELECT * FROM {tabla}", conexion)
-    actualizar_tipos_datos(conexion, tabla, df)
-
-    # Definir estilos para formateo condicional
-    orange_fill = PatternFill(start_color="FCAF3E", end_color="FCAF3E", fill_type="solid")
-    dark_orange_font = Font(color="993300")  # Naranja oscuro
-    green_fill = PatternFill(start_color="ACEB67", end_color="ACEB67", fill_type="solid")   # Verde pastel
-    yellow_fill = PatternFill(start_color="F5F19D", end_color="F5F19D", fill_type="solid")  # Amarillo pastel
-    red_fill = PatternFill(start_color="F4CCCC", end_color="F4CCCC", fill_type="solid")     # Rojo pastel
-
-    green_font = Font(color="2B7204")   # Verde oscuro
-    yellow_font = Font(color="9D8705")  # Amarillo oscuro
-    red_font = Font(color="8B0000")     # Rojo oscuro
-
-    # Obtener los índices (1-indexados) de columnas específicas que serán evaluadas en formato condicional
-    col_indices = {col: df.columns.get_loc(col) + 1 for col in df.columns 
-                   if col in ["Estado_TOA", "Rechazos", "Dias_Swap", "Dias_TSS", "Estado_PR_1", "Estado_PR_2", "Estado_PR_3"]}
-    
-    # Agregar las filas del DataFrame a la hoja de Excel (incluyendo cabecera)
-    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-        for c_idx, value in enumerate(row, 1):
-            # Reemplazar valores "nan", None o 0 por cadena vacía para evitar mostrar datos no deseados
-            cell_value = "" if pd.isna(value) or value in ["nan", "None"] or value is None or value == 0 else value
-
-            # Si el valor es un Timestamp, convertirlo a datetime para Excel y aplicar formato de fecha-hora
-            if isinstance(value, pd.Timestamp):
-                cell_value = value.to_pydatetime()
-                cell = ws.cell(row=r_idx, column=c_idx, value=cell_value)
-                cell.number_format = "DD/MM/YYYY HH:MM AM/PM"
-            else:
-                cell = ws.cell(row=r_idx, column=c_idx, value=cell_value)
-
-            # Si no es la primera o segunda columna, obtener las dos celdas anteriores (para formato condicional)
-            if c_idx > 2:
-                cell_prev = ws.cell(row=r_idx, column=c_idx-1)
-                cell_prev_prev = ws.cell(row=r_idx, column=c_idx-2)
-
-            # Aplicar formato condicional a partir de la segunda fila (omitiendo la cabecera)
-            if r_idx > 1 and c_idx in col_indices.values():
-                # Para columnas que deben contener valores numéricos: Rechazos, Dias_Swap y Dias_TSS
-                if c_idx in [col_indices.get("Rechazos"), col_indices.get("Dias_Swap"), col_indices.get("Dias_TSS")]:
-                    try:
-                        numeric_value = int(cell_value)
-                    except (ValueError, TypeError):
-                        numeric_value = None
-
-                # Condiciones específicas para cada columna:
-                if "Rechazos" in df.columns and c_idx == col_indices.get("Rechazos") and numeric_value and numeric_value > 0:
-                    cell.fill = orange_fill
-                    cell.font = dark_orange_font
-
-                elif "Dias_Swap" in df.columns and c_idx == col_indices.get("Dias_Swap") and numeric_value and numeric_value < 8:
-                    cell.fill = orange_fill
-                    cell.font = dark_orange_font
-                    cell_prev.fill = orange_fill 
-                    cell_prev.font = dark_orange_font
-                    cell_prev_prev.fill = orange_fill 
-                    cell_prev_prev.font = dark_orange_font
-
-                elif "Dias_TSS" in df.columns and c_idx == col_indices.get("Dias_TSS") and numeric_value and numeric_value < 8:
-                    cell.fill = orange_fill
-                    cell.font = dark_orange_font
-                    cell_prev.fill = orange_fill  
-                    cell_prev.font = dark_orange_font
-
-                # Para columnas de Estado_PR_x: si el valor es cadena y contiene "Pause", se formatea la celda y las dos anteriores
-                elif any(f"Estado_PR_{i}" in df.columns and c_idx == col_indices.get(f"Estado_PR_{i}") 
-                         and isinstance(value, str) and "Pause" in value for i in range(1, 4)):
-                    cell.fill = orange_fill
-                    cell.font = dark_orange_font  
-                    cell_prev.fill = orange_fill 
-                    cell_prev.font = dark_orange_font
-                    cell_prev_prev.fill = orange_fill 
-                    cell_prev_prev.font = dark_orange_font                
-
-    # Agregar una columna con fórmula en la última columna: "Semaforo"
-    ultima_columna = ws.max_column + 1
-    ws.cell(row=1, column=ultima_columna, value="Semaforo")
-    # Para cada fila (excepto la cabecera), si el estado no es "Completado" ni "Cancelado", se asigna una fórmula
-    for row in range(2, ws.max_row + 1):
-        if ws.cell(row=row, column=col_indices.get('Estado_TOA')).value not in ["Completado", "Cancelado"]:
-            # La fórmula calcula la diferencia en horas entre la fecha actual y la celda en la columna B
-            ws.cell(row=row, column=ultima_columna, value=f"=(NOW()-B{row})*24").number_format = "0.00"
-
-    # Definir el rango de la tabla en base al contenido de la hoja
-    ultima_columna_letra = ws.cell(row=1, column=ultima_columna).column_letter
-    rango_tabla = f"A1:{ultima_columna_letra}{ws.max_row}"
-
-    # Crear una tabla de Excel con estilo y agregarla a la hoja
-    tabla_excel = Table(displayName="TablaDatos", ref=rango_tabla)
-    estilo_tabla = TableStyleInfo(name="TableStyleLight2", showRowStripes=True)
-    tabla_excel.tableStyleInfo = estilo_tabla
-    ws.add_table(tabla_excel)
-    
-    # Aplicar formato condicional a la columna "Semaforo"
-    col_letter = ws.cell(row=1, column=ultima_columna).column_letter
-    ws.conditional_formatting.add(
-        f"{col_letter}2:{col_letter}{ws.max_row}",
-        CellIsRule(operator="between", formula=[0.000001, 3], stopIfTrue=True, fill=green_fill, font=green_font)
-    )
-    ws.conditional_formatting.add(
-        f"{col_letter}2:{col_letter}{ws.max_row}",
-        CellIsRule(operator="between", formula=[3, 6], stopIfTrue=True, fill=yellow_fill, font=yellow_font)
-    )
-    ws.conditional_formatting.add(
-        f"{col_letter}2:{col_letter}{ws.max_row}",
-        CellIsRule(operator="greaterThan", formula=[6], stopIfTrue=True, fill=red_fill, font=red_font)
-    )
-
-    # Guardar y cerrar el archivo Excel
-    wb.save(archivo_salida)
-    wb.close()
+    with tm.medir(f"exportar {os.path.basename(archivo_salida)}") as medicion:
+        # Crear un nuevo libro de trabajo en modo de solo escritura con una hoja con el nombre indicado
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(hoja_nombre)
+
+        # Leer la tabla desde la base de datos con los tipos de datos según los metadatos
+        df = leer_tabla(conexion, tabla)
+        medicion['filas_entrada'] = len(df)
+
+        # Definir estilos para formateo condicional
+        orange_fill = PatternFill(start_color="FCAF3E", end_color="FCAF3E", fill_type="solid")
+        dark_orange_font = Font(color="993300")  # Naranja oscuro
+        green_fill = PatternFill(start_color="ACEB67", end_color="ACEB67", fill_type="solid")   # Verde pastel
+        yellow_fill = PatternFill(start_color="F5F19D", end_color="F5F19D", fill_type="solid")  # Amarillo pastel
+        red_fill = PatternFill(start_color="F4CCCC", end_color="F4CCCC", fill_type="solid")     # Rojo pastel
+
+        green_font = Font(color="2B7204")   # Verde oscuro
+        yellow_font = Font(color="9D8705")  # Amarillo oscuro
+        red_font = Font(color="8B0000")     # Rojo oscuro
+
+        # Cabecera, incluyendo la columna con fórmula "Semaforo" al final
+        encabezados = [str(col) for col in df.columns] + ["Semaforo"]
+        ws.append(encabezados)
+        ultima_fila = len(df) + 1
+        col_semaforo = get_column_letter(len(encabezados))
+        posicion_estado = df.columns.get_loc('Estado_TOA')
+
+        # Agregar las filas del DataFrame a la hoja de Excel en una sola pasada
+        for r_idx, fila in enumerate(df.itertuples(index=False, name=None), 2):
+            valores = []
+            for valor in fila:
+                # Si el valor es un Timestamp, convertirlo a datetime para Excel y aplicar formato de fecha-hora
+                if isinstance(valor, pd.Timestamp):
+                    celda = WriteOnlyCell(ws, value=valor.to_pydatetime())
+                    celda.number_format = "DD/MM/YYYY HH:MM AM/PM"
+                    valores.append(celda)
+                else:
+                    valores.append(valor_celda_excel(valor))
+
+            # Si el estado no es "Completado" ni "Cancelado", se asigna la fórmula del Semaforo, que calcula
+            # la diferencia en horas entre la fecha actual y la celda en la columna B
+            if fila[posicion_estado] not in ["Completado", "Cancelado"]:
+                celda = WriteOnlyCell(ws, value=f"=(NOW()-B{r_idx})*24")
+                celda.number_format = "0.00"
+                valores.append(celda)
+            ws.append(valores)
+
+        # Crear una tabla de Excel con estilo. En modo de solo escritura las columnas de la tabla
+        # se definen a partir de la cabecera (openpyxl no puede leerlas de la hoja y advierte de ello)
+        tabla_excel = Table(displayName="TablaDatos", ref=f"A1:{col_semaforo}{ultima_fila}")
+        tabla_excel.tableStyleInfo = TableStyleInfo(name="TableStyleLight2", showRowStripes=True)
+        tabla_excel.tableColumns = [TableColumn(id=i, name=encabezado) for i, encabezado in enumerate(encabezados, 1)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            ws.add_table(tabla_excel)
+
+        if ultima_fila > 1:
+            # Formato naranja por rango: {columna evaluada: (condición en Excel, columnas anteriores a resaltar)}
+            reglas_naranja = {
+                "Rechazos": ("AND(ISNUMBER({c}),TRUNC({c})>0)", 0),
+                "Dias_Swap": ("AND(ISNUMBER({c}),TRUNC({c})<8,TRUNC({c})<>0)", 2),
+                "Dias_TSS": ("AND(ISNUMBER({c}),TRUNC({c})<8,TRUNC({c})<>0)", 1),
+            }
+            reglas_naranja.update({f"Estado_PR_{i}": ('ISNUMBER(FIND("Pause",{c}))', 2) for i in range(1, 4)})
+            for columna, (condicion, anteriores) in reglas_naranja.items():
+                if columna not in df.columns:
+                    continue
+                c_idx = df.columns.get_loc(columna) + 1
+                letra = get_column_letter(c_idx)
+                rango = f"{get_column_letter(max(c_idx - anteriores, 1))}2:{letra}{ultima_fila}"
+                ws.conditional_formatting.add(
+                    rango, FormulaRule(formula=[condicion.format(c=f"${letra}2")], fill=orange_fill, font=dark_orange_font)
+                )
+
+            # Aplicar formato condicional a la columna "Semaforo"
+            rango_semaforo = f"{col_semaforo}2:{col_semaforo}{ultima_fila}"
+            ws.conditional_formatting.add(
+                rango_semaforo,
+                CellIsRule(operator="between", formula=[0.000001, 3], stopIfTrue=True, fill=green_fill, font=green_font)
+            )
+            ws.conditional_formatting.add(
+                rango_semaforo,
+                CellIsRule(operator="between", formula=[3, 6], stopIfTrue=True, fill=yellow_fill, font=yellow_font)
+            )
+            ws.conditional_formatting.add(
+                rango_semaforo,
+                CellIsRule(operator="greaterThan", formula=[6], stopIfTrue=True, fill=red_fill, font=red_font)
+            )
+
+        # Guardar y cerrar el archivo Excel
+        wb.save(archivo_salida)
+        wb.close()
+        medicion['filas_salida'] = len(df)
 
 
 def guardar_todas_las_tablas(conexion, archivo_salida):
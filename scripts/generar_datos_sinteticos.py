@@ -0,0 +1,542 @@
+"""
+Generador de datos sintéticos para medir el proceso sin las exportaciones reales de OneDrive.
+
+Crea, dentro de una carpeta de usuario, la misma estructura que espera el proceso
+("OneDrive - Telefonica/<carpeta del proceso>") con:
+  - TOA base: exportaciones TOA (hoja 'Sheet1') con las 'columnas_requeridas' y dos columnas extra.
+  - Autin base/Autin Tickets y Autin base/Autin PR: exportaciones de tickets y de pausas (PR).
+  - DATA/SITIOS: base de sitios, casos SWAP y casos TSS.
+  - DATA/INFO TICKETS/Tickets_cambios.xlsx (hojas TEST y ERRORES) y REPORTES TDE/PINT_Reporte_Mtto_Correctivo.xlsx.
+  - Remedy base: exportaciones Remedy (dos filas antes del encabezado, se leen con skiprows=2) y alarmas.xlsx.
+  - tickets_data.db: base de datos vacía con 'metadatos_de_tablas'.
+
+Las exportaciones diarias se reparten en varios archivos con fecha en el nombre (y como fecha de
+modificación) y repiten una parte de los registros del archivo anterior, como las descargas reales.
+Los datos son coherentes entre sí (tickets Autin y Remedy asociados a tickets TOA, sitios
+existentes, notas con alarmas, TOA y códigos de sitio) para que todas las ramas del proceso trabajen.
+
+Uso:
+    python generar_datos_sinteticos.py --tickets 100000 --carpeta C:/temp/sinteticos
+    # Luego: USERPROFILE=C:/temp/sinteticos python main.py
+"""
+import argparse
+import math
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+import funciones as fn
+
+# Carpeta del proceso dentro de la carpeta de usuario (la misma ruta que arma funciones.base_path)
+ruta_proceso = os.path.join("OneDrive - Telefonica", "Dalia Paola Rodriguez Cruz's files - TOA_proceso")
+
+# Primer día de los datos generados y cantidad de días que abarcan
+inicio_datos = pd.Timestamp("2024-10-01")
+dias_datos = 180
+
+# Cantidad máxima de filas por archivo Excel (límite de una hoja: 1.048.576 filas)
+filas_max_archivo = 1_000_000
+
+# Fracción de registros del archivo anterior que se repiten en el siguiente
+fraccion_solapamiento = 0.05
+
+# Prefijos de los códigos de sitio (dos letras y cinco dígitos; no se usan NC, CD ni CR, que Remedy descarta)
+prefijos_sitios = ["LI", "AR", "PI", "CU", "TA", "JU", "LA", "IC", "AN", "SM"]
+
+# Tipos de dato de las columnas principales de cada tabla (las demás se infieren al cargarlas)
+metadatos_sinteticos = {
+    'tickets_TOA': {
+        'Nro_TOA': 'INTEGER', 'ID_del_Ticket': 'TEXT', 'Número_de_Petición': 'TEXT', 'Código_de_Cliente': 'TEXT',
+        'Fecha_de_Registro_de_actividad_TOA': 'DATETIME', 'Fecha_Hora_de_Cancelación': 'DATETIME',
+        'Fecha_de_Cita': 'DATETIME', 'SLA_Inicio': 'DATETIME', 'SLA_Fin': 'DATETIME',
+        'Hora_de_asignación_de_actividad': 'DATETIME', 'Fecha_de_Inicio_PINT': 'DATETIME',
+        'Direccion_Polar_X': 'REAL', 'Direccion_Polar_Y': 'REAL', 'Estado_TOA': 'TEXT', 'Notas': 'TEXT',
+        **{f"{evento}_PR{i}": 'DATETIME' for evento in ('Inicio', 'Fin') for i in range(1, 5)},
+    },
+    'tickets_autin': {
+        'Task_Id': 'TEXT', 'Number_OS_SIOM': 'TEXT', 'Site_Id': 'TEXT', 'Task_Category': 'TEXT',
+        'Task_Status': 'TEXT', 'Cancel_Reason': 'TEXT', 'Reject_Counter': 'INTEGER',
+        'Createtime': 'DATETIME', 'Complete_Time': 'DATETIME', 'Cancel_Time': 'DATETIME', 'Arrive_Time': 'DATETIME',
+    },
+    'tickets_pr': {
+        'Order_ID': 'TEXT', 'Operation_Time': 'TEXT', 'Pause_Time': 'TEXT', 'Reason': 'TEXT',
+    },
+    'info_sitios': {
+        'Codigo_Unico': 'TEXT', 'ubigeotoa': 'TEXT', 'Alarmas_Activas_Nodo': 'REAL',
+        'Fecha_Fin_Swap': 'DATETIME', 'Fecha_TSS': 'DATETIME',
+    },
+    'tabla_consolidada': {
+        'ID_TOA': 'TEXT', 'Creacion_TOA': 'DATETIME', 'Cierre_TOA': 'DATETIME', 'SLA_Inicio': 'DATETIME',
+        'SLA_Fin': 'DATETIME', 'Fecha_Fin_Swap': 'DATETIME', 'Fecha_TSS': 'DATETIME',
+        'Hora_Creacion_Abastecimiento': 'DATETIME', 'Site_ID': 'TEXT', 'Estado_TOA': 'TEXT', 'Ubigeo_TOA': 'TEXT',
+        # Las columnas numéricas del reporte se guardan como REAL: los reportes por empresa reemplazan
+        # los vacíos por '' y una columna entera (Int64) no admite ese valor
+        **{col: 'REAL' for col in ('Coordenada_X', 'Coordenada_Y', 'Alarmas_Activas', 'Dias_Swap', 'Dias_TSS',
+                                   'Tiempo_TOA_Autin', 'Dias_Abastecimiento', 'Rechazos', 'Duracion_Horas')},
+        **{f"{evento}_PR{i}": 'DATETIME' for evento in ('Inicio', 'Fin') for i in range(1, 5)},
+    },
+}
+
+
+def fechas_aleatorias(rng, cantidad, inicio=inicio_datos, dias=dias_datos):
+    """Devuelve 'cantidad' fechas aleatorias (al minuto) entre 'inicio' y 'inicio + dias'."""
+    return pd.Series(inicio + pd.to_timedelta(rng.integers(0, dias * 24 * 60, cantidad), unit="m"))
+
+
+def sumar_horas(rng, fechas, minimo, maximo):
+    """Suma a cada fecha un número aleatorio de horas entre 'minimo' y 'maximo' (al minuto)."""
+    minutos = rng.integers(int(minimo * 60), int(maximo * 60) + 1, len(fechas))
+    return fechas.reset_index(drop=True) + pd.to_timedelta(minutos, unit="m")
+
+
+def formatear(fechas, formato, mascara=None):
+    """Convierte fechas a texto con el formato de la exportación; las filas fuera de la máscara quedan vacías."""
+    texto = fechas.dt.strftime(formato)
+    return texto.where(mascara, None) if mascara is not None else texto
+
+
+def elegir(rng, valores, cantidad, probabilidades=None):
+    """Elige 'cantidad' valores al azar (con reemplazo) de la lista."""
+    return np.asarray(valores, dtype=object)[rng.choice(len(valores), cantidad, p=probabilidades)]
+
+
+def escribir_excel(df, ruta, hoja="Sheet1", filas_previas=None, fecha_archivo=None):
+    """
+    Escribe un DataFrame en un archivo Excel con un libro de solo escritura de openpyxl.
+
+    Args:
+        df (pd.DataFrame): Datos a escribir (los valores nulos quedan como celdas vacías).
+        ruta (str): Ruta del archivo.
+        hoja (str, opcional): Nombre de la hoja.
+        filas_previas (list, opcional): Filas que se escriben antes del encabezado (ej. título del reporte).
+        fecha_archivo (datetime, opcional): Fecha de modificación que se asigna al archivo.
+    """
+    escribir_libro(ruta, {hoja: df}, {hoja: filas_previas} if filas_previas else None)
+    if fecha_archivo is not None:
+        marca = fecha_archivo.timestamp()
+        os.utime(ruta, (marca, marca))
+
+
+def escribir_libro(ruta, hojas, filas_previas=None):
+    """
+    Escribe varias hojas en un libro Excel.
+
+    Args:
+        ruta (str): Ruta del archivo.
+        hojas (dict): {nombre de la hoja: DataFrame}.
+        filas_previas (dict, opcional): {nombre de la hoja: filas a escribir antes del encabezado}.
+    """
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    wb = Workbook(write_only=True)
+    for nombre, df in hojas.items():
+        ws = wb.create_sheet(nombre)
+        for fila in (filas_previas or {}).get(nombre) or []:
+            ws.append(fila)
+        ws.append([str(col) for col in df.columns])
+        valores = df.astype(object).where(df.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            ws.append(fila)
+    wb.save(ruta)
+    wb.close()
+
+
+def dividir_en_archivos(df, columna_fecha, archivos, rng):
+    """
+    Reparte los registros en exportaciones diarias según su fecha. Cada archivo repite una parte de
+    los registros del anterior ('fraccion_solapamiento'), como las descargas reales que se superponen.
+
+    Args:
+        df (pd.DataFrame): Registros a repartir.
+        columna_fecha (pd.Series): Fecha de cada registro (define el orden y la fecha de cada archivo).
+        archivos (int): Cantidad mínima de archivos (se aumenta si se supera 'filas_max_archivo').
+        rng (np.random.Generator): Generador de números aleatorios.
+
+    Returns:
+        list: Lista de (fecha del archivo, DataFrame) en orden cronológico.
+    """
+    archivos = max(archivos, math.ceil(len(df) * (1 + fraccion_solapamiento) / filas_max_archivo))
+    orden = np.argsort(columna_fecha.to_numpy(), kind="stable")
+    partes = []
+    anterior = None
+    for indices in np.array_split(orden, archivos):
+        parte = df.iloc[indices]
+        if anterior is not None and len(anterior):
+            repetidos = anterior.iloc[rng.choice(len(anterior), int(len(anterior) * fraccion_solapamiento), replace=False)]
+            parte = pd.concat([repetidos, parte], ignore_index=True)
+        fecha = columna_fecha.iloc[indices].max() if len(indices) else inicio_datos
+        partes.append((fecha.to_pydatetime(), parte))
+        anterior = df.iloc[indices]
+    return partes
+
+
+def generar_sitios(rng, cantidad):
+    """
+    Genera la base de sitios y los casos SWAP y TSS.
+
+    Returns:
+        tuple: (base de sitios, casos SWAP, casos TSS) con los nombres de columna de las exportaciones.
+    """
+    codigos = [f"{prefijos_sitios[i % len(prefijos_sitios)]}{i:05d}" for i in range(cantidad)]
+    sitios = pd.DataFrame({
+        'Codigo Unico': codigos,
+        'Nombre Local': [f"Estación {codigo}" for codigo in codigos],
+        'Departamento': elegir(rng, ['Lima', 'Arequipa', 'Piura', 'Cusco', 'Puno', 'Junín'], cantidad),
+        'Provincia': elegir(rng, ['Lima', 'Cañete', 'Arequipa', 'Piura', 'Huancayo'], cantidad),
+        'Distrito': elegir(rng, ['Miraflores', 'San Isidro', 'Cercado', 'Yanahuara', 'Castilla'], cantidad),
+        'Tipo Local': elegir(rng, ['Outdoor', 'Indoor', 'Rooftop'], cantidad),
+        'Atencion': elegir(rng, ['Urbano', 'Rural'], cantidad),
+        'Zona': elegir(rng, ['Norte', 'Centro', 'Sur', 'Lima'], cantidad),
+        'Tipo Zona FLM': elegir(rng, ['Z1', 'Z2', 'Z3'], cantidad),
+        'Tipo Estacion': elegir(rng, ['Macro', 'Micro', 'Hub'], cantidad),
+        'SLA': elegir(rng, ['4h', '8h', '12h'], cantidad),
+        'ubigeotoa': [f"{n:06d}" for n in rng.integers(10101, 250000, cantidad)],
+        'priorizacion': elegir(rng, ['Black', 'Oro', 'Plata', 'Clasico', 'Sin prioridad'], cantidad, [0.1, 0.25, 0.3, 0.3, 0.05]),
+        'Proveedor FLM': elegir(rng, ['COMFICA', 'HUAWEI', 'TDP'], cantidad, [0.45, 0.45, 0.1]),
+    })
+
+    con_swap = rng.random(cantidad) < 0.3
+    casos_swap = pd.DataFrame({
+        'Codigo Estacion': sitios['Codigo Unico'][con_swap].to_numpy(),
+        'Fecha Fin Swap': formatear(fechas_aleatorias(rng, con_swap.sum(), inicio_datos - pd.Timedelta(days=90), dias_datos), '%Y-%m-%d %H:%M:%S'),
+        'Alarmas Activas Nodo': rng.integers(0, 6, con_swap.sum()),
+        'Proyecto': 'SWAP 2024',
+    })
+
+    con_tss = rng.random(cantidad) < 0.2
+    codigos_tss = sitios['Codigo Unico'][con_tss].to_numpy().astype(object)
+    con_sufijo = rng.random(len(codigos_tss)) < 0.3
+    codigos_tss[con_sufijo] = codigos_tss[con_sufijo] + "_Swap"
+    casos_tss = pd.DataFrame({
+        'Customer Site ID': codigos_tss,
+        'Fecha TSS': formatear(fechas_aleatorias(rng, con_tss.sum()), '%Y-%m-%d %H:%M:%S'),
+        'Estado TSS': elegir(rng, ['Aprobado', 'Pendiente'], con_tss.sum()),
+    })
+    return sitios, casos_swap, casos_tss
+
+
+def generar_remedy(rng, cantidad, sitios):
+    """
+    Genera las incidencias de Remedy (sin formatear) y la lista de alarmas.
+
+    Returns:
+        tuple: (incidencias, alarmas). Las incidencias incluyen el sitio y la alarma asociados.
+    """
+    alarmas = pd.DataFrame({
+        'Alarma': ['AC FAILURE', 'RECTIFIER FAILURE', 'HIGH TEMPERATURE', 'DOOR OPEN', 'LOW BATTERY', 'Fallo de AC', 'GENERATOR FAULT'],
+        'Tipo': ['TOTAL', 'PARCIAL', 'PARCIAL', 'SIN AFECTACION', 'PARCIAL', 'TOTAL', 'PARCIAL'],
+    })
+    inicio = fechas_aleatorias(rng, cantidad)
+    incidencias = pd.DataFrame({
+        'ID': [f"INC{i:07d}" for i in range(1, cantidad + 1)],
+        'Sitio': elegir(rng, sitios['Codigo Unico'].tolist(), cantidad),
+        'Alarma': elegir(rng, alarmas['Alarma'].tolist() + ['ALARMA DESCONOCIDA'], cantidad),
+        'Inicio': inicio,
+        'Envio': sumar_horas(rng, inicio, 0.1, 1),
+        'Fin': sumar_horas(rng, inicio, 1, 30),
+        'Grupo': elegir(rng, ['FLM COMFICA', 'FLM HUAWEI', 'NOC TDP'], cantidad, [0.45, 0.45, 0.1]),
+        'Estado': elegir(rng, ['Cerrado', 'Resuelto', 'En curso'], cantidad),
+    })
+    return incidencias, alarmas
+
+
+def formatear_remedy(rng, incidencias, toa):
+    """
+    Arma la exportación de Remedy: las notas incluyen la alarma y, según el caso, el código de sitio,
+    el número TOA o un circuito de empresa.
+
+    Args:
+        incidencias (pd.DataFrame): Incidencias generadas por 'generar_remedy'.
+        toa (pd.DataFrame): Tickets TOA generados (para citar su número en las notas).
+    """
+    cantidad = len(incidencias)
+    caso = rng.random(cantidad)
+    nros_toa = toa['Nro TOA'].astype(str).to_numpy()
+    notas = ("Alarma: " + incidencias['Alarma'].str.title() + "\n"
+             + np.where(caso < 0.6, "Sitio " + incidencias['Sitio'] + " sin energía comercial\n", "Sin datos del sitio\n"))
+    notas = notas + np.where((caso >= 0.6) & (caso < 0.75), "TOA: " + elegir(rng, nros_toa, cantidad) + "\n", "")
+    notas = notas + np.where(caso >= 0.95, "Circuito: CD" + pd.Series(rng.integers(100000, 999999, cantidad)).astype(str) + "\n", "")
+    return pd.DataFrame({
+        'ID de la incidencia*+': incidencias['ID'],
+        'Estado*': incidencias['Estado'],
+        'Fecha de envío': formatear(incidencias['Envio'], '%d/%m/%Y %H:%M:%S'),
+        'Fecha de cierre': formatear(incidencias['Fin'], '%d/%m/%Y %H:%M:%S', incidencias['Estado'] != 'En curso'),
+        'Fecha inicio incidente': formatear(incidencias['Inicio'], '%d/%m/%Y %H:%M:%S'),
+        'Fecha fin incidente': formatear(incidencias['Fin'], '%d/%m/%Y %H:%M:%S'),
+        'Tipo de Afectación': elegir(rng, ['Total', 'Parcial', 'Sin afectación'], cantidad),
+        'Resumen*': "FLM | " + incidencias['Alarma'] + " | " + incidencias['Sitio'],
+        'Notas': notas,
+        'Grupo asignado*+': incidencias['Grupo'],
+        'Prioridad*': elegir(rng, ['Alta', 'Media', 'Baja'], cantidad),
+    })
+
+
+def generar_toa(rng, cantidad, sitios, incidencias):
+    """
+    Genera los tickets TOA con las 'columnas_requeridas' y dos columnas extra. Una parte de los
+    tickets se asocia a incidencias de Remedy por 'ID del Ticket' o por 'Número de Petición'.
+
+    Returns:
+        pd.DataFrame: Tickets TOA con las fechas formateadas como en la exportación.
+    """
+    formato = '%d/%m/%y %I:%M %p'
+    registro = fechas_aleatorias(rng, cantidad)
+    sitio = elegir(rng, sitios['Codigo Unico'].tolist(), cantidad)
+    id_ticket = np.full(cantidad, None, dtype=object)
+    peticion = np.array([f"P{n:07d}" for n in rng.integers(0, 10 ** 7, cantidad)], dtype=object)
+
+    # Asociar tickets a incidencias Remedy: 60% por 'ID del Ticket' y 20% por 'Número de Petición'
+    por_id = min(int(len(incidencias) * 0.6), cantidad)
+    por_peticion = min(int(len(incidencias) * 0.2), cantidad - por_id)
+    asociadas = incidencias.iloc[:por_id + por_peticion]
+    id_ticket[:por_id] = asociadas['ID'].to_numpy()[:por_id]
+    peticion[por_id:por_id + por_peticion] = asociadas['ID'].to_numpy()[por_id:] + "-01"
+    sitio[:por_id + por_peticion] = asociadas['Sitio'].to_numpy()
+    registro[:por_id + por_peticion] = sumar_horas(rng, asociadas['Inicio'], 0.5, 12)
+
+    estado = elegir(rng, ['Completado', 'Cancelado', 'Pendiente', 'Pre cierre', 'Suspendido', 'Completado (antiguo)'],
+                    cantidad, [0.52, 0.25, 0.1, 0.05, 0.05, 0.03])
+    cancelado = pd.Series(estado == 'Cancelado')
+    con_pr = pd.Series(rng.random(cantidad) < 0.15)
+    notas = elegir(rng, ['Atención correctiva en sitio', 'Cliente reporta caída de servicio', 'Revisión de energía AC',
+                         'Ticket proactivo por alarma recurrente', 'Sin observaciones'], cantidad, [0.3, 0.3, 0.2, 0.1, 0.1])
+    # Tickets de prueba (todos se registran como confirmados en Tickets_cambios.xlsx)
+    prueba = rng.random(cantidad) < 0.002
+    notas[prueba] = 'ticket de prueba - TEST'
+
+    toa = pd.DataFrame({
+        'Técnico': [f"Técnico {n}" for n in rng.integers(1, 800, cantidad)],
+        'ID Recurso': [f"R{n:05d}" for n in rng.integers(1, 800, cantidad)],
+        'Nro TOA': 20_000_000 + np.arange(cantidad),
+        'Subtipo de Actividad': elegir(rng, ['Correctivo', 'Emergencia', 'Preventivo'], cantidad),
+        'Número de Petición': peticion,
+        'Fecha de Cita': formatear(sumar_horas(rng, registro, 1, 24), formato),
+        'SLA Inicio': formatear(registro, formato),
+        'SLA Fin': formatear(sumar_horas(rng, registro, 4, 12), formato),
+        'Localidad': elegir(rng, ['Lima', 'Arequipa', 'Piura', 'Cusco', 'Puno'], cantidad),
+        'Dirección': [f"Av. Principal {n}" for n in rng.integers(1, 2000, cantidad)],
+        'Direccion Polar X': rng.uniform(-81, -69, cantidad).round(6),
+        'Direccion Polar Y': rng.uniform(-18, -1, cantidad).round(6),
+        'Nombre Cliente': 'Telefónica del Perú',
+        'Hora de asignación de actividad': formatear(sumar_horas(rng, registro, 0, 2), formato),
+        'Fecha de Registro de actividad TOA': formatear(registro, formato),
+        'Notas': notas,
+        'Código de Cliente': sitio,
+        'Fecha Hora de Cancelación': formatear(sumar_horas(rng, registro, 1, 96), formato, cancelado),
+        'Empresa': elegir(rng, ['COMFICA', 'HUAWEI', 'TDP'], cantidad),
+        'Bucket Inicial': elegir(rng, ['BK_COMFICA_LIMA', 'BK_HUAWEI_NORTE', 'BK_TDP_SUR', 'BK_COMFICA_SUR', 'BK_HUAWEI_CENTRO'], cantidad),
+        'Usuario - Iniciado': [f"usuario{n}" for n in rng.integers(1, 50, cantidad)],
+        'Nombre Distrito': elegir(rng, ['Miraflores', 'San Isidro', 'Cercado', 'Yanahuara', 'Castilla'], cantidad),
+        'Sistema Origen': elegir(rng, ['REMEDY', 'SIOM', 'AUTIN'], cantidad),
+        'ID del Ticket': id_ticket,
+        'Quiebres': elegir(rng, [None, 'Sin acceso', 'Falta de repuesto'], cantidad, [0.85, 0.1, 0.05]),
+        'Fecha de Inicio PINT': formatear(registro, formato),
+    })
+    for i in range(1, 5):
+        con_evento = con_pr & pd.Series(rng.random(cantidad) < 0.6 ** (i - 1))
+        inicio_pr = sumar_horas(rng, registro, i, i + 4)
+        toa[f'Inicio PR{i}'] = formatear(inicio_pr, formato, con_evento)
+        toa[f'Fin PR{i}'] = formatear(sumar_horas(rng, inicio_pr, 0.5, 3), formato, con_evento)
+        toa[f'Motivo PR{i}'] = pd.Series(elegir(rng, ['Sin acceso', 'Espera de repuesto', 'Lluvia'], cantidad)).where(con_evento, None)
+    toa['Nombre Local'] = [f"Local {codigo}" for codigo in sitio]
+    toa['Tipo de local'] = elegir(rng, ['Estación', 'Nodo'], cantidad)
+    toa['Zona geográfica'] = elegir(rng, ['Costa', 'Sierra', 'Selva'], cantidad)
+    toa['Zona'] = elegir(rng, ['Norte', 'Centro', 'Sur', 'Lima'], cantidad)
+    toa['Estado TOA'] = estado
+    # Columnas de la exportación que el proceso no lee
+    toa['Ciudad'] = toa['Localidad']
+    toa['Observaciones internas'] = None
+    return toa[fn.columnas_requeridas + ['Ciudad', 'Observaciones internas']], registro
+
+
+def generar_autin(rng, toa, registro, sitios):
+    """
+    Genera los tickets de Autin: de 0 a 3 tickets correctivos (CM) por ticket TOA, tickets
+    proactivos (PLM) y tickets de abastecimiento de combustible por sitio.
+
+    Returns:
+        tuple: (tickets Autin con las fechas formateadas, fecha de creación de cada ticket).
+    """
+    formato = '%Y-%m-%d %H:%M:%S'
+    por_ticket = rng.choice(4, len(toa), p=[0.15, 0.55, 0.2, 0.1])
+    origen = np.repeat(np.arange(len(toa)), por_ticket)
+    cm = len(origen)
+    abastecimiento = max(1, len(toa) // 5)
+    cantidad = cm + abastecimiento
+
+    proactivo = rng.random(cm) < 0.05
+    task_id = np.array([f"{'PLM' if p else 'CM'}-{i:08d}" for i, p in zip(range(cm), proactivo)]
+                       + [f"AB-{i:08d}" for i in range(abastecimiento)], dtype=object)
+    creacion = pd.concat([sumar_horas(rng, registro.iloc[origen], -1, 6),
+                          fechas_aleatorias(rng, abastecimiento)], ignore_index=True)
+    sitio = np.concatenate([toa['Código de Cliente'].to_numpy()[origen],
+                            elegir(rng, sitios['Codigo Unico'].tolist(), abastecimiento)])
+    # Los tickets de abastecimiento no tienen ticket TOA; la exportación de Autin los muestra con '-'
+    nro_toa = np.concatenate([toa['Nro TOA'].astype(str).to_numpy()[origen], np.full(abastecimiento, '-', dtype=object)])
+    categoria = np.concatenate([np.where(proactivo, 'PROACTIVO', 'CORRECTIVO'),
+                                np.full(abastecimiento, 'Abastecimiento de combustible', dtype=object)])
+
+    estado = elegir(rng, ['closed', 'completed', 'canceled', 'accepted', 'dispatched', 'inprocess', 'unscheduled'],
+                    cantidad, [0.35, 0.2, 0.25, 0.05, 0.05, 0.05, 0.05])
+    cancelado = pd.Series(estado == 'canceled')
+    cerrado = pd.Series(np.isin(estado, ['closed', 'completed']))
+    llegada = cerrado & pd.Series(rng.random(cantidad) < 0.7)
+    motivo = pd.Series(elegir(rng, ['Duplicado', 'Other', 'Tarea de prueba', 'Monitoreo', 'Falsa alarma', 'Resuelto remoto'],
+                              cantidad)).where(cancelado, None)
+    observaciones = ['Se encendió el grupo electrógeno y se dejó operando', 'Se cambiaron baterías del banco 2',
+                     'Se reajustó ITM del tablero', 'Se subió el breaker principal', 'Sitio operativo a la llegada',
+                     'No hay grupo electrógeno en sitio', 'Se revisó la batería y se midió voltaje', None]
+
+    autin = pd.DataFrame({
+        'Task Id': task_id,
+        'Task Category': categoria,
+        'Createtime': formatear(creacion, formato),
+        'Cancel Reason': motivo,
+        'Task Status': estado,
+        'Site Id': sitio,
+        'Com Level 1 Aff Equip': elegir(rng, ['Energía', 'Transmisión', 'RAN'], cantidad),
+        'Nro TOA': nro_toa,
+        'Reject Counter': rng.choice(4, cantidad, p=[0.7, 0.2, 0.07, 0.03]),
+        'Complete Time': formatear(sumar_horas(rng, creacion, 1, 48), formato, cerrado),
+        'Cancel Time': formatear(sumar_horas(rng, creacion, 0.5, 100), formato, cancelado),
+        'Arrive Time': formatear(sumar_horas(rng, creacion, 0.5, 6), formato, llegada),
+        'Com Fault Speciality': elegir(rng, ['ENERGIA', 'TRANSMISION', 'RADIO'], cantidad),
+        'Com Fault Sub Speciality': elegir(rng, ['FALLA AC', 'BATERIAS', 'RECTIFICADOR', 'OTROS'], cantidad),
+        'Com Fault Cause': elegir(rng, ['Corte de energía comercial', 'Falla de equipo', 'Vandalismo'], cantidad),
+        'Leave Observations': elegir(rng, observaciones, cantidad),
+        'Detalle de actuación realizada': elegir(rng, observaciones, cantidad),
+        'Mes': creacion.dt.strftime('%Y-%m'),
+    })
+    return autin, creacion
+
+
+def generar_pr(rng, autin, creacion):
+    """
+    Genera las pausas (PR) de los tickets correctivos de Autin: de 1 a 3 eventos en el 40% de ellos.
+
+    Returns:
+        tuple: (eventos PR, fecha de cada evento).
+    """
+    correctivos = np.flatnonzero(autin['Task Id'].str.startswith('CM').to_numpy() & (rng.random(len(autin)) < 0.4))
+    eventos = rng.integers(1, 4, len(correctivos))
+    origen = np.repeat(correctivos, eventos)
+    # Cada evento ocurre después del anterior del mismo ticket, por lo que (Order ID, Operation Time) es único
+    paso = pd.Series(origen).groupby(origen).cumcount().to_numpy()
+    operacion = (creacion.iloc[origen].reset_index(drop=True)
+                 + pd.to_timedelta(paso * 180 + rng.integers(1, 180, len(origen)), unit="m"))
+    pr = pd.DataFrame({
+        'Order ID': autin['Task Id'].to_numpy()[origen],
+        'Operation Time': formatear(operacion, '%Y-%m-%d %H:%M:%S'),
+        'Pause Time': np.where(paso % 2 == 0, 'Pause', 'Resume'),
+        'Reason': elegir(rng, ['Sin acceso al sitio', 'Espera de repuesto', 'Condiciones climáticas'], len(origen)),
+        'Operator': [f"operador{n}" for n in rng.integers(1, 30, len(origen))],
+    })
+    return pr, operacion
+
+
+def crear_base_datos(ruta):
+    """
+    Crea la base de datos del proceso con la tabla 'metadatos_de_tablas' ('metadatos_sinteticos').
+
+    Args:
+        ruta (str): Ruta del archivo SQLite (se reemplaza si existe).
+    """
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    conexion = sqlite3.connect(ruta)
+    try:
+        conexion.execute("CREATE TABLE metadatos_de_tablas (nombre_tabla TEXT, nombre_columna TEXT, tipo_dato TEXT)")
+        conexion.executemany(
+            "INSERT INTO metadatos_de_tablas VALUES (?, ?, ?)",
+            [(tabla, columna, tipo) for tabla, columnas in metadatos_sinteticos.items() for columna, tipo in columnas.items()]
+        )
+        conexion.commit()
+    finally:
+        conexion.close()
+
+
+def generar(carpeta_usuario, tickets, semilla=0, archivos=3):
+    """
+    Genera todos los archivos de entrada del proceso y una base de datos vacía.
+
+    Args:
+        carpeta_usuario (str): Carpeta que hace de perfil de usuario (USERPROFILE) para el proceso.
+        tickets (int): Cantidad de tickets TOA. El resto se escala a partir de ella: un sitio cada
+                       20 tickets, una incidencia Remedy cada 2 tickets, unos 1,4 tickets Autin por ticket.
+        semilla (int, opcional): Semilla de los números aleatorios (los mismos parámetros generan los mismos datos).
+        archivos (int, opcional): Cantidad de exportaciones diarias de TOA, Autin, PR y Remedy.
+
+    Returns:
+        dict: Ruta base del proceso ('base_path') y cantidad de filas generadas de cada fuente.
+    """
+    inicio = time.time()
+    rng = np.random.default_rng(semilla)
+    base_path = os.path.join(carpeta_usuario, ruta_proceso)
+    print(f"▶️Generando datos sintéticos ({tickets} tickets TOA) en: {base_path}")
+
+    sitios, casos_swap, casos_tss = generar_sitios(rng, min(99_999, max(100, tickets // 20)))
+    incidencias, alarmas = generar_remedy(rng, max(50, tickets // 2), sitios)
+    toa, registro = generar_toa(rng, tickets, sitios, incidencias)
+    autin, creacion = generar_autin(rng, toa, registro, sitios)
+    pr, operacion = generar_pr(rng, autin, creacion)
+    remedy = formatear_remedy(rng, incidencias, toa)
+
+    # Exportaciones diarias (el nombre empieza con el día y el mes, como las descargas reales)
+    fuentes = [
+        (os.path.join(base_path, "TOA base"), "TOA", toa, registro),
+        (os.path.join(base_path, "Autin base", "Autin Tickets"), "Autin", autin, creacion),
+        (os.path.join(base_path, "Autin base", "Autin PR"), "PR", pr, operacion),
+    ]
+    for carpeta, nombre, df, fechas in fuentes:
+        for fecha, parte in dividir_en_archivos(df, fechas, archivos, rng):
+            escribir_excel(parte, os.path.join(carpeta, f"{fecha:%d.%m} {nombre}.xlsx"), fecha_archivo=fecha)
+        print(f"\t{nombre}: {len(df)} registros en {carpeta}")
+
+    carpeta_remedy = os.path.join(base_path, "Remedy base")
+    for i, (fecha, parte) in enumerate(dividir_en_archivos(remedy, incidencias['Inicio'], archivos, rng), 1):
+        escribir_excel(parte, os.path.join(carpeta_remedy, f"Remedy_{i:02d}_{fecha:%Y%m%d}.xlsx"),
+                       filas_previas=[["Reporte de incidencias"], [f"Generado: {fecha:%d/%m/%Y}"]], fecha_archivo=fecha)
+    escribir_excel(alarmas, os.path.join(carpeta_remedy, "alarmas.xlsx"))
+    print(f"\tRemedy: {len(remedy)} incidencias en {carpeta_remedy}")
+
+    carpeta_sitios = os.path.join(base_path, "DATA", "SITIOS")
+    escribir_excel(sitios, os.path.join(carpeta_sitios, "base_sitios.xlsx"))
+    escribir_excel(casos_swap, os.path.join(carpeta_sitios, "casos_swap.xlsx"))
+    escribir_excel(casos_tss, os.path.join(carpeta_sitios, "casos_tss.xlsx"))
+    print(f"\tSITIOS: {len(sitios)} sitios, {len(casos_swap)} casos SWAP y {len(casos_tss)} casos TSS")
+
+    # Archivos de referencia: tickets de prueba confirmados y reporte PINT
+    prueba = toa[toa['Notas'].str.contains('prueba', na=False)]
+    tickets_test = pd.DataFrame({'Nro_TOA': prueba['Nro TOA'].astype(str), 'Notas': prueba['Notas'],
+                                 'Confirmado': elegir(rng, ['SI', 'NO'], len(prueba), [0.8, 0.2])})
+    errores = toa.sample(n=min(len(toa), 20), random_state=semilla)
+    tickets_errores = pd.DataFrame({'Nro_TOA': errores['Nro TOA'].astype(str),
+                                    'Sustituido': elegir(rng, ['TEST', 'DUPLICADO'], len(errores))})
+    escribir_libro(os.path.join(base_path, "DATA", "INFO TICKETS", "Tickets_cambios.xlsx"),
+                   {'TEST': tickets_test, 'ERRORES': tickets_errores})
+    en_tde = toa.sample(frac=0.3, random_state=semilla)
+    escribir_excel(pd.DataFrame({'activityId': en_tde['Nro TOA'].to_numpy(),
+                                 'timeOfBooking': formatear(fechas_aleatorias(rng, len(en_tde), inicio_datos + pd.Timedelta(days=30), 90),
+                                                            '%Y-%m-%d %H:%M:%S').to_numpy()}),
+                   os.path.join(base_path, "REPORTES TDE", "PINT_Reporte_Mtto_Correctivo.xlsx"))
+
+    crear_base_datos(os.path.join(base_path, "tickets_data.db"))
+    print(f"✅ Datos sintéticos generados en {time.time() - inicio:.1f} segundos.")
+    return {'base_path': base_path, 'TOA': len(toa), 'Autin': len(autin), 'PR': len(pr),
+            'Remedy': len(remedy), 'SITIOS': len(sitios)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera archivos de entrada sintéticos para el proceso TOA.")
+    parser.add_argument("--tickets", type=int, default=10_000, help="Cantidad de tickets TOA (ej. 10000, 100000, 1000000).")
+    parser.add_argument("--carpeta", default=os.path.join(tempfile.gettempdir(), "TOA_sinteticos"),
+                        help="Carpeta que hace de perfil de usuario (USERPROFILE) para el proceso.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los números aleatorios.")
+    parser.add_argument("--archivos", type=int, default=3, help="Cantidad de exportaciones diarias por fuente.")
+    argumentos = parser.parse_args()
+    generar(argumentos.carpeta, argumentos.tickets, argumentos.semilla, argumentos.archivos)
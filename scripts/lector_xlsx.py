@@ -0,0 +1,469 @@
+"""
+Lector de archivos .xlsx que recorre directamente el XML de la hoja y la tabla de textos compartidos,
+sin construir los objetos de celda de openpyxl.
+
+Los valores se convierten con las mismas reglas que 'pd.read_excel' con el motor openpyxl (fechas
+según el formato numérico de la celda, números enteros sin decimales, errores como NaN y celdas
+vacías como ""), y las filas se entregan al mismo 'TextParser' que usa pandas, por lo que el
+DataFrame resultante es igual al de 'pd.read_excel'. Con 'usecols' solo se convierten las celdas
+de las columnas pedidas.
+
+Uso como comprobación de paridad contra pandas:
+    python lector_xlsx.py archivo.xlsx [archivo2.xlsx ...] [--hoja Sheet1] [--skiprows 2]
+"""
+import argparse
+import posixpath
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+# Espacios de nombres del formato .xlsx
+ns_hoja = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ns_relaciones = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+ns_paquete = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+tag_fila = f"{{{ns_hoja}}}row"
+tag_celda = f"{{{ns_hoja}}}c"
+tag_valor = f"{{{ns_hoja}}}v"
+tag_texto_en_linea = f"{{{ns_hoja}}}is"
+tag_texto = f"{{{ns_hoja}}}t"
+tag_tramo = f"{{{ns_hoja}}}r"
+
+# Nombre de la columna auxiliar que se agrega al leer solo algunas columnas (ver 'leer_filas')
+columna_marca = "\x00fila_con_datos"
+
+# Versión del lector: se incrementa al cambiar cómo se interpretan las celdas, para que la cache de
+# archivos leídos (ver 'funciones.usar_cache_excel') no entregue resultados de la versión anterior
+version = 1
+
+# Parámetros de 'pd.read_excel' que admite este lector; con cualquier otro se usa pandas
+parametros_soportados = {'sheet_name', 'header', 'skiprows', 'usecols', 'dtype', 'engine'}
+
+
+class ErrorLectorXlsx(Exception):
+    """El archivo no tiene la estructura .xlsx esperada por este lector."""
+
+
+def ruta_relacion(base, destino):
+    """
+    Resuelve la ruta dentro del paquete de un destino de relación ('Target').
+
+    Args:
+        base (str): Ruta de la parte que declara la relación (ej. 'xl/workbook.xml').
+        destino (str): Valor del atributo 'Target'.
+
+    Returns:
+        str: Ruta del destino dentro del archivo zip.
+    """
+    if destino.startswith("/"):
+        return destino.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), destino))
+
+
+def leer_relaciones(paquete, parte):
+    """
+    Lee las relaciones de una parte del paquete.
+
+    Args:
+        paquete (zipfile.ZipFile): Archivo .xlsx abierto.
+        parte (str): Ruta de la parte (ej. 'xl/workbook.xml'; '' para la raíz).
+
+    Returns:
+        dict: {Id: (tipo, ruta del destino)}.
+    """
+    carpeta, nombre = posixpath.split(parte)
+    ruta = posixpath.join(carpeta, "_rels", f"{nombre}.rels")
+    try:
+        raiz = ET.fromstring(paquete.read(ruta))
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id"): (rel.get("Type", ""), ruta_relacion(parte, rel.get("Target", "")))
+        for rel in raiz.iter(f"{{{ns_paquete}}}Relationship")
+        if rel.get("TargetMode") != "External"
+    }
+
+
+def leer_libro(paquete):
+    """
+    Obtiene de un archivo .xlsx las hojas, la tabla de textos compartidos, los estilos de fecha
+    y la fecha base (epoch) del libro, con las mismas reglas que openpyxl.
+
+    Args:
+        paquete (zipfile.ZipFile): Archivo .xlsx abierto.
+
+    Returns:
+        dict: 'hojas' (lista de (nombre, ruta) en orden), 'textos', 'estilos_fecha',
+              'estilos_duracion' y 'epoch'.
+    """
+    ruta_libro = next((ruta for tipo, ruta in leer_relaciones(paquete, "").values()
+                       if tipo.endswith("/officeDocument")), None)
+    if ruta_libro is None:
+        raise ErrorLectorXlsx("El archivo no contiene un libro de Excel")
+    relaciones = leer_relaciones(paquete, ruta_libro)
+    libro = ET.fromstring(paquete.read(ruta_libro))
+
+    # Hojas de cálculo en el orden del libro (las hojas de gráfico no cuentan para el índice)
+    hojas = []
+    for hoja in libro.iter(f"{{{ns_hoja}}}sheet"):
+        tipo, ruta = relaciones.get(hoja.get(f"{{{ns_relaciones}}}id"), ("", None))
+        if tipo.endswith("/worksheet"):
+            hojas.append((hoja.get("name"), ruta))
+
+    propiedades = libro.find(f"{{{ns_hoja}}}workbookPr")
+    fecha_1904 = propiedades is not None and propiedades.get("date1904", "").lower() in ("1", "true")
+
+    textos = []
+    estilos_fecha, estilos_duracion = set(), set()
+    for tipo, ruta in relaciones.values():
+        if tipo.endswith("/sharedStrings"):
+            with paquete.open(ruta) as fuente:
+                textos = read_string_table(fuente)
+        elif tipo.endswith("/styles"):
+            estilos_fecha, estilos_duracion = leer_estilos_fecha(paquete.read(ruta))
+
+    return {
+        'hojas': hojas,
+        'textos': textos,
+        'estilos_fecha': estilos_fecha,
+        'estilos_duracion': estilos_duracion,
+        'epoch': CALENDAR_MAC_1904 if fecha_1904 else CALENDAR_WINDOWS_1900,
+    }
+
+
+def leer_estilos_fecha(xml_estilos):
+    """
+    Identifica los estilos de celda (índices de 'cellXfs') cuyo formato numérico es de fecha o de
+    duración, con el mismo criterio que openpyxl.
+
+    Args:
+        xml_estilos (bytes): Contenido de 'styles.xml'.
+
+    Returns:
+        tuple: (conjunto de estilos de fecha, conjunto de estilos de duración).
+    """
+    raiz = ET.fromstring(xml_estilos)
+    formatos_propios = {}
+    num_fmts = raiz.find(f"{{{ns_hoja}}}numFmts")
+    if num_fmts is not None:
+        for fmt in num_fmts.iter(f"{{{ns_hoja}}}numFmt"):
+            formatos_propios[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+
+    estilos_fecha, estilos_duracion = set(), set()
+    cell_xfs = raiz.find(f"{{{ns_hoja}}}cellXfs")
+    if cell_xfs is not None:
+        for indice, xf in enumerate(cell_xfs.iter(f"{{{ns_hoja}}}xf")):
+            id_formato = int(xf.get("numFmtId", 0))
+            formato = formatos_propios.get(id_formato) if id_formato in formatos_propios else builtin_format_code(id_formato)
+            if is_date_format(formato):
+                estilos_fecha.add(indice)
+            if is_timedelta_format(formato):
+                estilos_duracion.add(indice)
+    return estilos_fecha, estilos_duracion
+
+
+def buscar_hoja(libro, sheet_name):
+    """
+    Devuelve la ruta del XML de una hoja, con los mismos errores que 'pd.read_excel'.
+
+    Args:
+        libro (dict): Resultado de 'leer_libro'.
+        sheet_name (str o int): Nombre o posición de la hoja.
+
+    Returns:
+        str: Ruta de la hoja dentro del archivo zip.
+    """
+    if isinstance(sheet_name, str):
+        for nombre, ruta in libro['hojas']:
+            if nombre == sheet_name:
+                return ruta
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    if isinstance(sheet_name, (int, np.integer)) and not isinstance(sheet_name, bool):
+        if 0 <= sheet_name < len(libro['hojas']):
+            return libro['hojas'][sheet_name][1]
+        raise ValueError(f"Worksheet index {sheet_name} is invalid, {len(libro['hojas'])} worksheets found")
+    raise ErrorLectorXlsx(f"sheet_name no soportado: {sheet_name!r}")
+
+
+def leer_filas(fuente, libro, fila_encabezado=None, usecols=None):
+    """
+    Recorre el XML de una hoja y devuelve sus filas con los valores convertidos como lo hace pandas.
+
+    Las filas y celdas que faltan en el XML se completan con "", se eliminan las celdas vacías al
+    final de cada fila y las filas vacías al final de la hoja. Si se indican 'usecols' (nombres) y
+    'fila_encabezado', a partir del encabezado solo se convierten las celdas de esas columnas; si
+    algún nombre no aparece una única vez en el encabezado, se convierten todas.
+
+    Args:
+        fuente: Archivo abierto con el XML de la hoja.
+        libro (dict): Resultado de 'leer_libro'.
+        fila_encabezado (int, opcional): Posición (desde 0) de la fila de encabezado.
+        usecols (list, opcional): Nombres de las columnas a leer.
+
+    Returns:
+        list: Lista de filas (listas de valores).
+    """
+    textos = libro['textos']
+    estilos_fecha = libro['estilos_fecha']
+    estilos_duracion = libro['estilos_duracion']
+    epoch = libro['epoch']
+    columnas_por_letra = {}
+
+    filas = []
+    ultima_fila_con_datos = -1
+    numero_fila = 0
+    # Posiciones (desde 0) de las columnas que se convierten; None mientras se convierten todas
+    proyeccion = None
+    proyectar = usecols is not None and fila_encabezado is not None
+
+    for _, elemento in ET.iterparse(fuente):
+        if elemento.tag != tag_fila:
+            continue
+        referencia_fila = elemento.get("r")
+        numero = int(referencia_fila) if referencia_fila else numero_fila + 1
+        if numero <= numero_fila:
+            # Fila repetida o fuera de orden: openpyxl la ignora
+            elemento.clear()
+            continue
+        # Filas ausentes en el XML
+        vacia = [] if proyeccion is None else [""] * (len(proyeccion) + 1)
+        filas.extend(list(vacia) for _ in range(numero - numero_fila - 1))
+        numero_fila = numero
+
+        valores = {}
+        tiene_datos = False
+        columna = -1
+        for celda in elemento:
+            if celda.tag != tag_celda:
+                continue
+            referencia = celda.get("r")
+            if referencia:
+                letras = referencia.rstrip("0123456789")
+                columna = columnas_por_letra.get(letras)
+                if columna is None:
+                    columna = columnas_por_letra[letras] = column_index_from_string(letras) - 1
+            else:
+                columna += 1
+            tipo = celda.get("t", "n")
+
+            if proyeccion is not None and columna not in columnas_proyectadas:
+                # Celda no requerida: solo importa si tiene datos, para no recortar la fila
+                if not tiene_datos:
+                    if tipo == "inlineStr":
+                        hijo = celda.find(tag_texto_en_linea)
+                        tiene_datos = hijo is not None and texto_en_linea(hijo) != ""
+                    else:
+                        texto = celda.findtext(tag_valor)
+                        tiene_datos = bool(texto) and (tipo != "s" or textos[int(texto)] != "")
+                continue
+
+            if tipo == "inlineStr":
+                hijo = celda.find(tag_texto_en_linea)
+                valor = texto_en_linea(hijo) if hijo is not None else ""
+            else:
+                texto = celda.findtext(tag_valor)
+                if not texto:
+                    valor = ""
+                elif tipo == "n":
+                    numero_celda = float(texto) if ("." in texto or "E" in texto or "e" in texto) else int(texto)
+                    estilo = celda.get("s")
+                    estilo = int(estilo) if estilo else 0
+                    if estilo in estilos_fecha:
+                        try:
+                            valor = from_excel(numero_celda, epoch, timedelta=estilo in estilos_duracion)
+                        except (OverflowError, ValueError):
+                            valor = np.nan
+                    elif isinstance(numero_celda, float) and numero_celda.is_integer():
+                        valor = int(numero_celda)
+                    else:
+                        valor = numero_celda
+                elif tipo == "s":
+                    valor = textos[int(texto)]
+                elif tipo == "b":
+                    valor = bool(int(texto))
+                elif tipo == "e":
+                    valor = np.nan
+                elif tipo == "d":
+                    valor = from_ISO8601(texto)
+                else:
+                    valor = texto
+            valores[columna] = valor
+            if not tiene_datos and not (isinstance(valor, str) and valor == ""):
+                tiene_datos = True
+        elemento.clear()
+
+        posicion = numero_fila - 1
+        if proyeccion is None and proyectar and posicion == fila_encabezado:
+            proyeccion = posiciones_columnas(valores, usecols)
+            if proyeccion is not None:
+                columnas_proyectadas = set(proyeccion)
+                # Las filas anteriores al encabezado se recortan a las mismas columnas
+                filas = [[fila[i] if i < len(fila) else "" for i in proyeccion] + [1 if fila else ""]
+                         for fila in filas]
+
+        if proyeccion is not None:
+            # La última columna marca las filas con datos en columnas no leídas, para que pandas no
+            # las trate como filas en blanco; 'usecols' la descarta
+            fila = [valores.get(i, "") for i in proyeccion]
+            fila.append(columna_marca if posicion == fila_encabezado else (1 if tiene_datos else ""))
+        elif valores:
+            fila = [""] * (max(valores) + 1)
+            for i, valor in valores.items():
+                fila[i] = valor
+            while fila and isinstance(fila[-1], str) and fila[-1] == "":
+                fila.pop()
+        else:
+            fila = []
+        if tiene_datos:
+            ultima_fila_con_datos = posicion
+        filas.append(fila)
+
+    filas = filas[:ultima_fila_con_datos + 1]
+    if filas and proyeccion is None:
+        ancho = max(len(fila) for fila in filas)
+        filas = [fila + [""] * (ancho - len(fila)) if len(fila) < ancho else fila for fila in filas]
+    return filas
+
+
+def texto_en_linea(elemento):
+    """
+    Obtiene el texto de una celda con texto en línea ('inlineStr'): el texto simple seguido del de
+    cada tramo con formato, sin las guías fonéticas (igual que 'Text.content' de openpyxl).
+
+    Args:
+        elemento (Element): Elemento 'is' de la celda.
+
+    Returns:
+        str: Texto de la celda.
+    """
+    partes = []
+    simple = elemento.find(tag_texto)
+    if simple is not None and simple.text:
+        partes.append(simple.text)
+    for tramo in elemento.iterfind(tag_tramo):
+        texto = tramo.find(tag_texto)
+        if texto is not None and texto.text:
+            partes.append(texto.text)
+    return "".join(partes)
+
+
+def posiciones_columnas(encabezado, usecols):
+    """
+    Obtiene las posiciones de las columnas pedidas a partir de la fila de encabezado.
+
+    Args:
+        encabezado (dict): {posición: valor} de la fila de encabezado.
+        usecols (list): Nombres de las columnas a leer.
+
+    Returns:
+        list: Posiciones ordenadas, o None si algún nombre falta o se repite en el encabezado.
+    """
+    posiciones = {}
+    for posicion, valor in encabezado.items():
+        if valor in usecols and isinstance(valor, str):
+            if valor in posiciones:
+                return None
+            posiciones[valor] = posicion
+    if len(posiciones) != len(set(usecols)):
+        return None
+    return sorted(posiciones.values())
+
+
+def leer_xlsx(ruta, sheet_name=0, header=0, skiprows=None, usecols=None, dtype=None, engine=None):
+    """
+    Lee una hoja de un archivo .xlsx y devuelve el mismo DataFrame que 'pd.read_excel' con el motor
+    openpyxl, recorriendo el XML sin construir los objetos de openpyxl.
+
+    Args:
+        ruta (str): Ruta del archivo .xlsx.
+        sheet_name (str o int, opcional): Nombre o posición de la hoja. Por defecto la primera.
+        header (int, opcional): Fila del encabezado (solo se admite 0).
+        skiprows (int, opcional): Cantidad de filas a omitir al inicio.
+        usecols (list, opcional): Nombres de las columnas a leer.
+        dtype (dict o tipo, opcional): Tipos de las columnas, como en 'pd.read_excel'.
+        engine (str, opcional): Se acepta por compatibilidad con 'pd.read_excel' (solo 'openpyxl').
+
+    Returns:
+        pd.DataFrame: Datos de la hoja.
+
+    Raises:
+        ErrorLectorXlsx: Si el archivo o los parámetros no son soportados por este lector.
+    """
+    if header != 0 or engine not in (None, "openpyxl"):
+        raise ErrorLectorXlsx("Solo se admite header=0 y el motor openpyxl")
+    if skiprows is not None and (isinstance(skiprows, bool) or not isinstance(skiprows, (int, np.integer))):
+        raise ErrorLectorXlsx("Solo se admite skiprows entero")
+    if usecols is not None and (isinstance(usecols, str) or not all(isinstance(c, str) for c in usecols)):
+        raise ErrorLectorXlsx("Solo se admite usecols como lista de nombres")
+
+    try:
+        with zipfile.ZipFile(ruta) as paquete:
+            libro = leer_libro(paquete)
+            ruta_hoja = buscar_hoja(libro, sheet_name)
+            with paquete.open(ruta_hoja) as fuente:
+                filas = leer_filas(fuente, libro, fila_encabezado=skiprows or 0,
+                                   usecols=list(usecols) if usecols is not None else None)
+    except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+        raise ErrorLectorXlsx(f"No se pudo leer {ruta}: {e}") from e
+
+    try:
+        parser = TextParser(filas, header=header, skiprows=skiprows, usecols=usecols, dtype=dtype,
+                            skip_blank_lines=False)
+        return parser.read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def comparar_con_pandas(ruta, **parametros):
+    """
+    Comprueba que 'leer_xlsx' devuelva el mismo DataFrame que 'pd.read_excel' para un archivo,
+    mostrando los tiempos de ambos lectores y la primera diferencia encontrada.
+
+    Args:
+        ruta (str): Ruta del archivo .xlsx.
+        **parametros: Parámetros de lectura comunes a ambos lectores.
+
+    Returns:
+        bool: True si ambos resultados son iguales (valores, tipos y columnas).
+    """
+    inicio = time.perf_counter()
+    esperado = pd.read_excel(ruta, engine="openpyxl", **parametros)
+    tiempo_pandas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenido = leer_xlsx(ruta, **parametros)
+    tiempo_lector = time.perf_counter() - inicio
+
+    print(f"▶️{ruta} {parametros or ''}")
+    print(f"\tpd.read_excel: {tiempo_pandas:.2f} s | lector_xlsx: {tiempo_lector:.2f} s "
+          f"({esperado.shape[0]} filas x {esperado.shape[1]} columnas)")
+    try:
+        pd.testing.assert_frame_equal(obtenido, esperado)
+    except AssertionError as e:
+        print(f"\t❌ Diferencias con pd.read_excel:\n{e}")
+        return False
+    print("\t✅ Resultado idéntico a pd.read_excel")
+    return True
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Compara lector_xlsx con pd.read_excel.")
+    argumentos.add_argument("archivos", nargs="+", help="Archivos .xlsx a comparar")
+    argumentos.add_argument("--hoja", default=0, help="Nombre de la hoja (por defecto la primera)")
+    argumentos.add_argument("--skiprows", type=int, default=None, help="Filas a omitir al inicio")
+    opciones = argumentos.parse_args()
+
+    parametros = {'sheet_name': opciones.hoja}
+    if opciones.skiprows is not None:
+        parametros['skiprows'] = opciones.skiprows
+    resultados = [comparar_con_pandas(archivo, **parametros) for archivo in opciones.archivos]
+    raise SystemExit(0 if all(resultados) else 1)
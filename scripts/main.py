@@ -1,28 +1,47 @@
-import sqlite3
 import funciones as fn  # Importa el módulo de funciones con toda la lógica de procesamiento
+import etapas  # Ejecución de las etapas del proceso según sus dependencias
+import telemetria as tm  # Mediciones de rendimiento de cada etapa
+import perfilado  # Perfilado opcional de las etapas (cProfile y tracemalloc)
+import copia_local  # Copia local de la base de datos y publicación en OneDrive
+import remedy_logic  # Análisis de las incidencias de Remedy (etapa opcional)
+import argparse
 import pandas as pd
 import traceback
 import time
 import os
 
-def procesar_datos():
+def procesar_datos(perfilar=None, remedy=False):
     """
     Función principal para procesar los datos:
       1. Define rutas y parámetros de origen (archivos y base de datos).
       2. Abre la conexión a la base de datos.
-      3. Procesa los archivos de las distintas fuentes (TOA, Autin, Autin PR y SITIOS).
+      3. Procesa los archivos de las distintas fuentes (TOA, Autin, Autin PR y SITIOS) a la vez.
       4. Combina los datos de las tablas en una tabla consolidada.
-      5. Exporta el resultado final a un archivo Excel.
+      5. Exporta el resultado final a un archivo Excel y, si se pide, ejecuta el análisis de Remedy
+         con la misma base de datos (ver remedy_logic.py).
+      Los pasos 3 a 5 se ejecutan como etapas con dependencias (ver etapas.py): una etapa que falla
+      solo detiene las etapas que dependen de ella.
       6. Muestra estadísticas de las tablas en la base de datos y el tiempo de ejecución total.
+      7. Si todas las etapas terminaron bien, publica la base de datos en OneDrive (ver copia_local.py).
+      8. Guarda el reporte de rendimiento en 'telemetria/' (JSON) y muestra su resumen.
+
+    Args:
+        perfilar (str, opcional): Etapas a perfilar con cProfile y tracemalloc ("todas" o nombres separados
+                                  por comas). Por defecto se usa la variable de entorno TOA_PERFILADO.
+        remedy (bool, opcional): Agregar la etapa REMEDY, que genera 'Remedy base/Remedy_procesado.xlsx'.
     """
     # Registrar el tiempo de inicio para medir la duración del proceso
     start_time = time.time()
+    tm.iniciar_ejecucion("procesar_datos")
 
     # Definir la ruta principal donde se encuentran los archivos en OneDrive
     # Obtener el directorio del perfil del usuario actual:
     user_profile = os.environ.get("USERPROFILE")
     base_path = os.path.join(user_profile, "OneDrive - Telefonica", "Dalia Paola Rodriguez Cruz's files - TOA_proceso")
     print(f"Ruta base: {base_path}")
+
+    # Perfilado opcional de las etapas (desactivado salvo que se pida con --perfilar o TOA_PERFILADO)
+    perfilado.configurar(perfilar or os.environ.get("TOA_PERFILADO"), os.path.join(base_path, "perfiles"))
     
     # Verificar si se tienen permisos de lectura y escritura en la carpeta base
     if not os.access(base_path, os.R_OK):
@@ -35,9 +54,12 @@ def procesar_datos():
     carpeta_origen_autin = os.path.join(base_path, "Autin base", "Autin Tickets")
     carpeta_origen_autin_pr = os.path.join(base_path, "Autin base", "Autin PR")
     carpeta_origen_sitios = os.path.join(base_path, "DATA", "SITIOS")
+    carpeta_remedy = os.path.join(base_path, remedy_logic.carpeta_base)
     
-    # Ruta de la base de datos (archivo SQLite) ubicado en OneDrive
-    base_datos = os.path.join(base_path, "tickets_data.db")
+    # Ruta de la base de datos (archivo SQLite) ubicado en OneDrive. El proceso trabaja sobre una
+    # copia local en modo WAL que se publica en OneDrive al terminar sin errores.
+    base_datos_onedrive = os.path.join(base_path, "tickets_data.db")
+    base_datos = copia_local.preparar(base_datos_onedrive)
 
     # Definir los nombres de las tablas a utilizar en la base de datos
     tabla_TOA = "tickets_TOA"
@@ -47,62 +69,68 @@ def procesar_datos():
     tabla_final = "tabla_consolidada"
 
     # Abrir la conexión a la base de datos (se reutiliza durante todo el proceso)
-    conexion = sqlite3.connect(base_datos)
-    
-    # Eliminar la tabla consolidada si existe para reiniciar el proceso
-    cursor = conexion.cursor()
-    cursor.execute(f"DROP TABLE IF EXISTS {tabla_final}")
-    conexion.commit()
-    
-    try:
-        # ============================================================
-        # 🔹 1️⃣ Limpiar información de las arpetas Old
-        fn.procesar_old()
-        print("Proceso completado exitosamente OLD.")
+    conexion = copia_local.conectar(base_datos)
+    exito = False
 
-        # ============================================================
-        # 🔹 2️⃣ Procesar los archivos descargados de las diferentes fuentes
-        print("\nProcesando archivos...\n")
-        
-        # Procesa los archivos de TOA y actualiza la tabla correspondiente
-        fn.procesar_archivos_tickets(carpeta_origen_TOA, tabla_TOA, conexion, 'Nro_TOA')
-        print("Proceso completado exitosamente TOA.\n")
-        
-        # Procesa los archivos de Autin y actualiza la tabla correspondiente
-        fn.procesar_archivos_tickets(carpeta_origen_autin, tabla_autin, conexion, 'Task_Id')
-        print("Proceso completado exitosamente AUTIN.\n")
-        
-        # Procesa los archivos de Autin PR y actualiza la tabla correspondiente
-        fn.procesar_archivos_tickets(carpeta_origen_autin_pr, tabla_autin_pr, conexion, 'Index')
-        print("Proceso completado exitosamente PR.\n")
-        
-        # Combina los datos de los archivos de SITIOS y actualiza la tabla correspondiente
-        fn.combinar_datos_sitios(carpeta_origen_sitios, tabla_sitios, conexion, 'Codigo_Unico')
-        print("Proceso completado exitosamente SITIOS.\n")
-
-        # ============================================================
-        # 🔹 3️⃣ Combinar tablas y generar el reporte final consolidado
-        fn.combinar_tablas(conexion, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
-        print("Proceso completado exitosamente ANALISIS COMPLETO.")
+    # Los planes de conversión de tipos se leen de los metadatos una vez por ejecución
+    fn.limpiar_planes_conversion()
+    
+    # Archivos de referencia que se leen al combinar las tablas
+    archivo_tickets_cambios = os.path.join(base_path, "DATA", "INFO TICKETS", "Tickets_cambios.xlsx")
+    archivo_pint = os.path.join(base_path, "REPORTES TDE", "PINT_Reporte_Mtto_Correctivo.xlsx")
+    reportes_empresas = [os.path.join(base_path, "reporte_Comfica.xlsx"), os.path.join(base_path, "reporte_Huawei.xlsx")]
 
-        print("\nTiempo de ejecución sin excel: %s segundos\n" % (time.time() - start_time))
+    def analizar(con):
+        # Eliminar la tabla consolidada si existe para reconstruirla desde cero
+        with fn.bloqueo_escritura:
+            con.execute(f"DROP TABLE IF EXISTS {tabla_final}")
+            con.commit()
+        fn.combinar_tablas(con, tabla_TOA, tabla_autin, tabla_sitios, tabla_final)
 
+    try:
         # ============================================================
-        # 🔹 4️⃣ Exportar el resultado final a Excel
+        # 🔹 Definir las etapas del proceso con sus entradas y salidas. Las etapas independientes
+        #    (limpieza de carpetas Old y carga de TOA, Autin, Autin PR y SITIOS) se ejecutan a la vez;
+        #    el análisis espera a las cargas y la exportación a Excel espera al análisis.
+        #    Las etapas con memorizar=True no se ejecutan si sus entradas no cambiaron desde la última vez.
+        archivo = os.path.join(base_path, "ArchivoFinal.xlsx")
+        lista_etapas = [
+            # 1️⃣ Limpiar información de las carpetas Old
+            etapas.crear_etapa('OLD', lambda con: fn.procesar_old()),
+            # 2️⃣ Procesar los archivos descargados de las diferentes fuentes
+            etapas.crear_etapa('TOA', lambda con: fn.procesar_archivos_tickets(carpeta_origen_TOA, tabla_TOA, con, 'Nro_TOA'),
+                               entradas=[carpeta_origen_TOA], salidas=[tabla_TOA]),
+            etapas.crear_etapa('AUTIN', lambda con: fn.procesar_archivos_tickets(carpeta_origen_autin, tabla_autin, con, 'Task_Id'),
+                               entradas=[carpeta_origen_autin], salidas=[tabla_autin]),
+            etapas.crear_etapa('PR', lambda con: fn.procesar_archivos_tickets(carpeta_origen_autin_pr, tabla_autin_pr, con, 'Index'),
+                               entradas=[carpeta_origen_autin_pr], salidas=[tabla_autin_pr]),
+            etapas.crear_etapa('SITIOS', lambda con: fn.combinar_datos_sitios(carpeta_origen_sitios, tabla_sitios, con, 'Codigo_Unico'),
+                               entradas=[carpeta_origen_sitios], salidas=[tabla_sitios], memorizar=True),
+            # 3️⃣ Combinar tablas y generar el reporte final consolidado
+            etapas.crear_etapa('ANALISIS COMPLETO', analizar,
+                               entradas=[tabla_TOA, tabla_autin, tabla_autin_pr, tabla_sitios, archivo_tickets_cambios, archivo_pint],
+                               salidas=[tabla_final] + reportes_empresas, memorizar=True),
+            # 4️⃣ Convertir la tabla consolidada a un archivo Excel formateado
+            etapas.crear_etapa('EXCEL', lambda con: fn.convertir_tabla_a_excel(tabla_final, archivo, con, hoja_nombre='Sheet1'),
+                               entradas=[tabla_final], salidas=[archivo], memorizar=True),
+        ]
+        # 5️⃣ (Opcional) Analizar las incidencias de Remedy con la tabla consolidada, en la misma base de datos
+        if remedy:
+            archivo_remedy = os.path.join(carpeta_remedy, "Remedy_procesado.xlsx")
+            lista_etapas.append(
+                etapas.crear_etapa('REMEDY', lambda con: remedy_logic.procesar_remedy(con, base_path),
+                                   entradas=[tabla_TOA, tabla_autin, tabla_sitios, tabla_final, carpeta_remedy],
+                                   salidas=[remedy_logic.tabla_base, archivo_remedy]))
+        print("\nProcesando archivos...\n")
+        # Con TOA_FORZAR_ETAPAS=1 se ejecutan todas las etapas aunque sus entradas no hayan cambiado
+        estados = etapas.ejecutar_etapas(lista_etapas, base_datos, forzar=os.environ.get("TOA_FORZAR_ETAPAS") == "1")
+        exito = all(estado in ('completada', 'reutilizada') for estado in estados.values())
 
         # (Opcional) Guardar todas las tablas en un solo archivo Excel con hojas separadas
         archivo_salida = os.path.join(base_path, "Reporte.xlsx")
         # fn.guardar_todas_las_tablas(conexion, archivo_salida)
         # print(f"\nTodas las tablas han sido guardadas en '{archivo_salida}' correctamente.")
 
-        # Se puede generar un nombre de archivo con marca de tiempo (en este caso se usa una ruta fija)
-        hora = time.strftime("%Y%m%d-%H%M%S")
-        # archivo = 'ArchivoFinal_' + hora + '.xlsx'
-        archivo = os.path.join(base_path, "ArchivoFinal.xlsx")
-        
-        # Convertir la tabla consolidada a un archivo Excel formateado
-        fn.convertir_tabla_a_excel(tabla_final, archivo, conexion, hoja_nombre='Sheet1')
-        
     except Exception as e:
         # En caso de error, se muestra el error y la traza completa
         print(f"Error durante la actualización de la base de datos: {e}")
@@ -114,17 +142,40 @@ def procesar_datos():
         tablas = cursor.fetchall()
         print("\nTablas en la base de datos:")
 
+        tamaños = {}
         for tabla in tablas:
             cursor.execute(f"SELECT COUNT(*) FROM {tabla[0]}")
             tamaño = cursor.fetchone()[0]
+            tamaños[tabla[0]] = tamaño
             print(f"\tTabla: {tabla[0]}, Tamaño: {tamaño}")
         
-        # Cerrar la conexión a la base de datos
+        # Cerrar la conexión a la base de datos y publicarla en OneDrive si el proceso terminó sin errores
         conexion.close()
+        if exito:
+            copia_local.publicar(base_datos, base_datos_onedrive)
+        elif base_datos != base_datos_onedrive:
+            print(f"\n⚠️ La base de datos no se publicó en OneDrive porque hubo errores. "
+                  f"La próxima ejecución partirá de la última base publicada.")
+
+        # Informar las columnas cuyo tipo de dato se infirió sin metadatos
+        fn.reportar_columnas_provisionales()
+
+        # Guardar el reporte de rendimiento de la ejecución y mostrar su resumen
+        tm.mostrar_resumen()
+        tm.guardar_reporte(os.path.join(base_path, "telemetria"), tablas=tamaños)
 
         print("\nTiempo de ejecución: %s segundos" % (time.time() - start_time))
 
 
-# Ejecutar la función principal
-procesar_datos()
+# Ejecutar la función principal. La guarda evita que los procesos de lectura en paralelo
+# (que en Windows vuelven a importar este módulo) ejecuten de nuevo todo el proceso.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Procesa los archivos TOA, Autin, PR y SITIOS y genera el reporte consolidado.")
+    parser.add_argument("--perfilar", nargs="?", const="todas", metavar="ETAPAS",
+                        help="Perfila las etapas con cProfile y tracemalloc (todas, o nombres separados por comas) "
+                             "y guarda los perfiles en la carpeta 'perfiles'.")
+    parser.add_argument("--remedy", action="store_true",
+                        help="Ejecuta también el análisis de Remedy (remedy_logic.py) con la misma base de datos.")
+    argumentos = parser.parse_args()
+    procesar_datos(perfilar=argumentos.perfilar, remedy=argumentos.remedy)
 
@@ -0,0 +1,173 @@
+"""
+Perfilado opcional de las etapas del proceso con cProfile y tracemalloc.
+
+Se activa con la variable de entorno TOA_PERFILADO o con la opción --perfilar de main.py:
+  - "1" o "todas": se perfilan todas las etapas (y cada paso de remedy_logic.py).
+  - Una lista separada por comas (ej. "TOA,ANALISIS COMPLETO,merge TOA-Autin"): solo esas etapas o
+    pasos, con el nombre con el que aparecen en el resumen de rendimiento (ver telemetria.py).
+
+Por cada etapa perfilada se guardan en 'carpeta_perfiles':
+  - <etapa>_<fecha>.prof: estadísticas de cProfile (se abren con pstats, snakeviz, etc.).
+  - <etapa>_<fecha>_funciones.txt: las 'cantidad_top' funciones con mayor tiempo acumulado.
+  - <etapa>_<fecha>_memoria.txt: las 'cantidad_top' líneas con más memoria asignada y el pico.
+
+Con el perfilado desactivado no se importa cProfile ni tracemalloc y cada etapa solo hace una
+comprobación. Mientras está activo las etapas y la lectura de archivos se ejecutan en serie, ya que
+cProfile solo mide el hilo en el que se activa y tracemalloc mide todo el proceso.
+"""
+import os
+import re
+import threading
+from datetime import datetime
+
+# Etapas a perfilar: None (perfilado desactivado), 'todas' o un conjunto de nombres en minúsculas.
+# Se inicializa con TOA_PERFILADO al final del módulo y se puede cambiar con 'configurar'.
+etapas_perfiladas = None
+
+# Carpeta donde se guardan los perfiles (la asigna 'configurar'; se puede cambiar con TOA_CARPETA_PERFILES)
+carpeta_perfiles = os.environ.get("TOA_CARPETA_PERFILES") or os.path.join(os.getcwd(), "perfiles")
+
+# Cantidad de funciones y de líneas con más memoria asignada que se incluyen en los reportes de texto
+cantidad_top = 30
+
+# Perfil activo de cada hilo (no se anidan perfiles: cProfile admite uno por hilo)
+perfiles_activos = threading.local()
+
+
+def leer_seleccion(valor):
+    """
+    Interpreta el valor de TOA_PERFILADO o de --perfilar.
+
+    Args:
+        valor (str): None, "" o "0" desactiva el perfilado; "1" o "todas" perfila todas las etapas;
+                     cualquier otro valor es la lista de etapas a perfilar separadas por comas.
+
+    Returns:
+        None, 'todas' o set: Etapas a perfilar.
+    """
+    valor = (valor or "").strip()
+    if valor in ("", "0"):
+        return None
+    if valor.lower() in ("1", "todas"):
+        return 'todas'
+    return {nombre.strip().lower() for nombre in valor.split(",") if nombre.strip()}
+
+
+def configurar(valor, carpeta=None):
+    """
+    Activa o desactiva el perfilado.
+
+    Args:
+        valor (str): Etapas a perfilar (ver 'leer_seleccion').
+        carpeta (str, opcional): Carpeta de los perfiles. Se ignora si está definida TOA_CARPETA_PERFILES.
+    """
+    global etapas_perfiladas, carpeta_perfiles
+    etapas_perfiladas = leer_seleccion(valor)
+    if carpeta and not os.environ.get("TOA_CARPETA_PERFILES"):
+        carpeta_perfiles = carpeta
+    if etapas_perfiladas is not None:
+        print(f"🔬 Perfilado activo ({valor}). Los perfiles se guardarán en: {carpeta_perfiles}")
+
+
+def activo():
+    """Indica si el perfilado está activo."""
+    return etapas_perfiladas is not None
+
+
+def debe_perfilar(nombre, nivel=0):
+    """
+    Indica si una etapa o paso se debe perfilar.
+
+    Args:
+        nombre (str): Nombre de la etapa o paso (ej. 'etapa TOA' o 'Remedy: alarmas').
+        nivel (int, opcional): Nivel de anidamiento. Con 'todas' solo se perfilan las etapas (nivel 0).
+
+    Returns:
+        bool: True si se debe perfilar.
+    """
+    if etapas_perfiladas is None or getattr(perfiles_activos, 'perfil', None) is not None:
+        return False
+    if etapas_perfiladas == 'todas':
+        return nivel == 0
+    nombre = nombre.lower()
+    return nombre in etapas_perfiladas or (nombre.startswith("etapa ") and nombre[len("etapa "):] in etapas_perfiladas)
+
+
+def iniciar(nombre, nivel=0):
+    """
+    Inicia el perfilado de una etapa si está seleccionada.
+
+    Args:
+        nombre (str): Nombre de la etapa o paso.
+        nivel (int, opcional): Nivel de anidamiento de la etapa.
+
+    Returns:
+        dict: Perfil en curso, o None si la etapa no se perfila.
+    """
+    if not debe_perfilar(nombre, nivel):
+        return None
+    import cProfile
+    import tracemalloc
+
+    perfil = {'nombre': nombre, 'iniciar_tracemalloc': not tracemalloc.is_tracing()}
+    if perfil['iniciar_tracemalloc']:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    perfil['memoria_inicial'] = tracemalloc.take_snapshot()
+    perfil['perfilador'] = cProfile.Profile()
+    perfiles_activos.perfil = perfil
+    perfil['perfilador'].enable()
+    return perfil
+
+
+def terminar(perfil):
+    """
+    Detiene el perfilado de una etapa y guarda sus reportes.
+
+    Args:
+        perfil (dict): Perfil devuelto por 'iniciar' (con None no se hace nada).
+
+    Returns:
+        str: Ruta del archivo .prof, o None si no se guardó.
+    """
+    if perfil is None:
+        return None
+    import io
+    import pstats
+    import tracemalloc
+
+    perfil['perfilador'].disable()
+    perfiles_activos.perfil = None
+    memoria_final = tracemalloc.take_snapshot()
+    _, pico = tracemalloc.get_traced_memory()
+    if perfil['iniciar_tracemalloc']:
+        tracemalloc.stop()
+
+    nombre = re.sub(r'[^\w-]+', '_', perfil['nombre']).strip('_')
+    base = os.path.join(carpeta_perfiles, f"{nombre}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    try:
+        os.makedirs(carpeta_perfiles, exist_ok=True)
+        perfil['perfilador'].dump_stats(f"{base}.prof")
+
+        texto = io.StringIO()
+        pstats.Stats(perfil['perfilador'], stream=texto).sort_stats('cumulative').print_stats(cantidad_top)
+        with open(f"{base}_funciones.txt", "w", encoding="utf-8") as archivo:
+            archivo.write(texto.getvalue())
+
+        diferencias = memoria_final.compare_to(perfil['memoria_inicial'], 'lineno')
+        with open(f"{base}_memoria.txt", "w", encoding="utf-8") as archivo:
+            archivo.write(f"Etapa: {perfil['nombre']}\n")
+            archivo.write(f"Pico de memoria asignada por Python: {pico / 1024 ** 2:.1f} MB\n\n")
+            archivo.write(f"{cantidad_top} líneas con más memoria asignada durante la etapa:\n")
+            for diferencia in diferencias[:cantidad_top]:
+                archivo.write(f"{diferencia}\n")
+    except OSError as e:
+        print(f"\tNo se pudo guardar el perfil de {perfil['nombre']}: {e}")
+        return None
+    print(f"\t🔬 Perfil de {perfil['nombre']} guardado en: {base}.prof")
+    return f"{base}.prof"
+
+
+# Selección inicial desde el entorno (TOA_PERFILADO)
+etapas_perfiladas = leer_seleccion(os.environ.get("TOA_PERFILADO"))
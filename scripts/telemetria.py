@@ -0,0 +1,307 @@
+"""
+Mediciones de rendimiento de las etapas y pasos del proceso.
+
+Cada medición registra el tiempo transcurrido, el tiempo de CPU del hilo, las filas de entrada y de
+salida y la memoria máxima del proceso (pico de RSS). Las mediciones se anidan según el hilo que las
+toma (una etapa y sus pasos) y al final de la ejecución se guardan en un reporte JSON y se muestran
+en un resumen en consola, para comparar ejecuciones diarias.
+
+Uso:
+    with tm.medir("merge TOA-sitios", filas_entrada=len(df)) as medicion:
+        ...
+        medicion['filas_salida'] = len(df_merged)
+
+    @tm.medido()                          # filas del primer DataFrame recibido y del devuelto
+    def clasificar(df): ...
+
+    paso = tm.iniciar("Remedy: alarmas")   # para código que no está dentro de una función
+    ...
+    tm.terminar(paso, filas_salida=len(df))
+"""
+import json
+import os
+import sys
+import functools
+import inspect
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import perfilado
+
+# Mediciones terminadas de la ejecución actual, en orden de término
+mediciones = []
+
+# Datos generales de la ejecución actual (nombre y hora de inicio)
+ejecucion = {}
+
+# Bloqueo para registrar mediciones desde varios hilos
+bloqueo_mediciones = threading.Lock()
+
+# Contador para ordenar las mediciones según su inicio (los pasos quedan debajo de su etapa)
+contador_mediciones = itertools.count()
+
+# Pila de mediciones abiertas de cada hilo (para anidar los pasos dentro de su etapa)
+pilas = threading.local()
+
+
+def memoria_pico_mb():
+    """
+    Devuelve la memoria máxima usada por el proceso hasta el momento (pico del conjunto residente).
+
+    Returns:
+        float: Memoria en MB, o None si no se puede obtener en esta plataforma.
+    """
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ContadoresMemoria(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            contadores = ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(ContadoresMemoria)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+                return None
+            return contadores.PeakWorkingSetSize / 1024 ** 2
+
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa el valor en KB y macOS en bytes
+        return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+    except (ImportError, OSError, AttributeError):
+        return None
+
+
+def iniciar_ejecucion(nombre):
+    """
+    Inicia el registro de una ejecución, descartando las mediciones anteriores.
+
+    Args:
+        nombre (str): Nombre de la ejecución (ej. 'procesar_datos').
+    """
+    with bloqueo_mediciones:
+        mediciones.clear()
+        ejecucion.clear()
+        ejecucion.update({'nombre': nombre, 'inicio': datetime.now().isoformat(timespec='seconds'),
+                          'reloj_inicio': time.perf_counter()})
+
+
+def pila_actual():
+    """Devuelve la pila de mediciones abiertas del hilo actual."""
+    if not hasattr(pilas, 'mediciones'):
+        pilas.mediciones = []
+    return pilas.mediciones
+
+
+def iniciar(nombre, filas_entrada=None):
+    """
+    Inicia una medición. Si el hilo tiene otra medición abierta, la nueva queda anidada en ella.
+
+    Args:
+        nombre (str): Nombre de la etapa o paso.
+        filas_entrada (int, opcional): Filas que recibe el paso.
+
+    Returns:
+        dict: Medición abierta; se cierra con 'terminar'.
+    """
+    pila = pila_actual()
+    padre = pila[-1] if pila else None
+    medicion = {
+        'orden': (padre['orden'] if padre else []) + [next(contador_mediciones)],
+        'nombre': nombre,
+        'ruta': f"{padre['ruta']}/{nombre}" if padre else nombre,
+        'nivel': padre['nivel'] + 1 if padre else 0,
+        'proceso': os.getpid(),
+        'hilo': threading.current_thread().name,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'filas_entrada': filas_entrada,
+        'filas_salida': None,
+        'reloj_inicio': time.perf_counter(),
+        'cpu_inicio': time.thread_time(),
+        'memoria_inicio_mb': memoria_pico_mb(),
+    }
+    pila.append(medicion)
+    # Con el perfilado activo (TOA_PERFILADO) las etapas seleccionadas se perfilan con cProfile y tracemalloc
+    perfil = perfilado.iniciar(nombre, medicion['nivel'])
+    if perfil is not None:
+        medicion['perfil'] = perfil
+    return medicion
+
+
+def terminar(medicion, filas_salida=None, error=None, pendiente=False):
+    """
+    Cierra una medición y la registra.
+
+    Args:
+        medicion (dict): Medición devuelta por 'iniciar'.
+        filas_salida (int, opcional): Filas que entrega el paso.
+        error (str, opcional): Error con el que terminó el paso.
+        pendiente (bool, opcional): No registrar la medición (se registra después con 'registrar',
+                                    por ejemplo cuando se toma en otro proceso).
+
+    Returns:
+        dict: La medición registrada.
+    """
+    if 'perfil' in medicion:
+        medicion['perfil'] = perfilado.terminar(medicion['perfil'])
+    pila = pila_actual()
+    if medicion in pila:
+        del pila[pila.index(medicion):]
+    if filas_salida is not None:
+        medicion['filas_salida'] = filas_salida
+    memoria = memoria_pico_mb()
+    medicion.update({
+        'segundos': round(time.perf_counter() - medicion.pop('reloj_inicio'), 3),
+        'cpu_segundos': round(time.thread_time() - medicion.pop('cpu_inicio'), 3),
+        'memoria_pico_mb': round(memoria, 1) if memoria is not None else None,
+        'aumento_memoria_mb': round(memoria - medicion['memoria_inicio_mb'], 1)
+        if memoria is not None and medicion['memoria_inicio_mb'] is not None else None,
+        'error': error,
+    })
+    medicion.pop('memoria_inicio_mb')
+    if not pendiente:
+        registrar(medicion, anidar=False)
+    return medicion
+
+
+@contextmanager
+def medir(nombre, filas_entrada=None, pendiente=False):
+    """
+    Mide un bloque de código. Las filas de salida se indican asignando medicion['filas_salida'].
+
+    Args:
+        nombre (str): Nombre del paso.
+        filas_entrada (int, opcional): Filas que recibe el paso.
+        pendiente (bool, opcional): No registrar la medición al terminar (ver 'terminar').
+
+    Yields:
+        dict: Medición abierta.
+    """
+    medicion = iniciar(nombre, filas_entrada)
+    try:
+        yield medicion
+    except BaseException as e:
+        terminar(medicion, error=repr(e), pendiente=pendiente)
+        raise
+    terminar(medicion, pendiente=pendiente)
+
+
+def contar_filas(valor):
+    """Devuelve la cantidad de filas de un DataFrame, o None si el valor no es un DataFrame."""
+    return len(valor) if hasattr(valor, 'columns') else None
+
+
+def medido(nombre=None):
+    """
+    Decorador que mide cada llamada a una función. Las filas de entrada son las del primer
+    DataFrame recibido y las de salida las del DataFrame devuelto.
+
+    Args:
+        nombre (str, opcional): Nombre del paso; puede incluir argumentos de la función entre llaves
+                                (ej. "tipos de datos {tabla}"). Por defecto, el nombre de la función.
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs).arguments
+            filas_entrada = next((contar_filas(a) for a in argumentos.values() if contar_filas(a) is not None), None)
+            with medir(nombre.format(**argumentos) if nombre else funcion.__name__, filas_entrada) as medicion:
+                resultado = funcion(*args, **kwargs)
+                medicion['filas_salida'] = contar_filas(resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def registrar(medicion, anidar=True):
+    """
+    Registra una medición terminada, por ejemplo la devuelta por un proceso de lectura en paralelo.
+
+    Args:
+        medicion (dict): Medición terminada.
+        anidar (bool, opcional): Anidarla en la medición abierta del hilo actual.
+    """
+    pila = pila_actual()
+    if anidar and pila:
+        medicion['ruta'] = f"{pila[-1]['ruta']}/{medicion['nombre']}"
+        medicion['nivel'] = pila[-1]['nivel'] + 1
+        medicion['orden'] = pila[-1]['orden'] + [next(contador_mediciones)]
+    with bloqueo_mediciones:
+        mediciones.append(medicion)
+
+
+def generar_reporte(tablas=None):
+    """
+    Arma el reporte de la ejecución actual.
+
+    Args:
+        tablas (dict, opcional): Cantidad de filas de cada tabla de la base de datos al terminar.
+
+    Returns:
+        dict: Reporte con los datos de la ejecución y sus mediciones.
+    """
+    with bloqueo_mediciones:
+        lista = sorted(mediciones, key=lambda m: m['orden'])
+    memoria = memoria_pico_mb()
+    return {
+        'ejecucion': ejecucion.get('nombre'),
+        'inicio': ejecucion.get('inicio'),
+        'segundos': round(time.perf_counter() - ejecucion['reloj_inicio'], 3) if 'reloj_inicio' in ejecucion else None,
+        'memoria_pico_mb': round(memoria, 1) if memoria is not None else None,
+        'mediciones': lista,
+        'tablas': tablas or {},
+    }
+
+
+def guardar_reporte(carpeta, tablas=None):
+    """
+    Guarda el reporte de la ejecución actual en un archivo JSON con la fecha y hora en el nombre.
+
+    Args:
+        carpeta (str): Carpeta donde se guardan los reportes (se crea si no existe).
+        tablas (dict, opcional): Cantidad de filas de cada tabla de la base de datos al terminar.
+
+    Returns:
+        str: Ruta del reporte, o None si no se pudo guardar.
+    """
+    reporte = generar_reporte(tablas)
+    nombre = f"{reporte['ejecucion'] or 'ejecucion'}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    ruta = os.path.join(carpeta, nombre)
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2, default=str)
+    except OSError as e:
+        print(f"\tNo se pudo guardar el reporte de rendimiento: {e}")
+        return None
+    print(f"\nReporte de rendimiento guardado en: {ruta}")
+    return ruta
+
+
+def mostrar_resumen():
+    """
+    Muestra en consola una tabla con las mediciones de la ejecución actual.
+    """
+    reporte = generar_reporte()
+    print("\nResumen de rendimiento:")
+    print(f"\t{'Paso':<60} {'Tiempo (s)':>10} {'CPU (s)':>9} {'Filas ent.':>11} {'Filas sal.':>11} {'Mem. pico (MB)':>15}")
+    for m in reporte['mediciones']:
+        nombre = ("  " * m['nivel'] + m['nombre'])[:60]
+        filas_entrada = '' if m['filas_entrada'] is None else m['filas_entrada']
+        filas_salida = '' if m['filas_salida'] is None else m['filas_salida']
+        memoria = '' if m['memoria_pico_mb'] is None else m['memoria_pico_mb']
+        marca = " ❌" if m.get('error') else ""
+        print(f"\t{nombre:<60} {m['segundos']:>10.2f} {m['cpu_segundos']:>9.2f} {filas_entrada:>11} {filas_salida:>11} {memoria:>15}{marca}")
+    if reporte['segundos'] is not None:
+        print(f"\tTotal: {reporte['segundos']:.2f} s, memoria pico: {reporte['memoria_pico_mb']} MB")
@@ -0,0 +1,7 @@
+"""Configuración común de las pruebas: los módulos del proceso están en 'scripts/'."""
+import os
+import sys
+
+# funciones.py arma la ruta base a partir del perfil del usuario al importarse
+os.environ.setdefault("USERPROFILE", os.path.expanduser("~"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
@@ -0,0 +1,53 @@
+"""Pruebas de copia_local.py."""
+import os
+import sqlite3
+
+import copia_local
+
+
+def crear_base(ruta, valores):
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("CREATE TABLE IF NOT EXISTS t (valor TEXT)")
+    conexion.executemany("INSERT INTO t VALUES (?)", [(v,) for v in valores])
+    conexion.commit()
+    conexion.close()
+
+
+def leer_valores(ruta):
+    conexion = sqlite3.connect(ruta)
+    valores = [fila[0] for fila in conexion.execute("SELECT valor FROM t ORDER BY valor")]
+    conexion.close()
+    return valores
+
+
+def test_publicar_reemplaza_la_base_sin_cambios(tmp_path, monkeypatch):
+    monkeypatch.setattr(copia_local, "carpeta_bd_local", str(tmp_path / "local"))
+    ruta_origen = str(tmp_path / "tickets_data.db")
+    crear_base(ruta_origen, ["a"])
+
+    ruta_local = copia_local.preparar(ruta_origen)
+    crear_base(ruta_local, ["b"])
+    assert copia_local.publicar(ruta_local, ruta_origen)
+    assert leer_valores(ruta_origen) == ["a", "b"]
+    assert copia_local.leer_estado(ruta_local)['estado'] == 'publicada'
+
+
+def test_publicar_no_sobrescribe_cambios_de_otra_ejecucion(tmp_path, monkeypatch):
+    monkeypatch.setattr(copia_local, "carpeta_bd_local", str(tmp_path / "local"))
+    ruta_origen = str(tmp_path / "tickets_data.db")
+    crear_base(ruta_origen, ["a"])
+
+    ruta_local = copia_local.preparar(ruta_origen)
+    crear_base(ruta_local, ["b"])
+    # Otro usuario publica durante la ejecución
+    crear_base(ruta_origen, ["otro"])
+    os.utime(ruta_origen, ns=(0, 0))
+
+    assert not copia_local.publicar(ruta_local, ruta_origen)
+    assert leer_valores(ruta_origen) == ["a", "otro"]
+    assert copia_local.leer_estado(ruta_local)['estado'] == 'en_uso'
+    assert not [nombre for nombre in os.listdir(tmp_path) if nombre.endswith(".tmp")]
+
+    # La siguiente ejecución vuelve a copiar la base de OneDrive
+    ruta_local = copia_local.preparar(ruta_origen)
+    assert leer_valores(ruta_local) == ["a", "otro"]
@@ -0,0 +1,20 @@
+"""Pruebas de etapas.py."""
+import sqlite3
+
+import etapas
+
+
+def test_huella_cambia_al_editar_metadatos():
+    conexion = sqlite3.connect(":memory:")
+    etapa = etapas.crear_etapa('EXCEL', lambda con: None, entradas=['tabla_consolidada'], memorizar=True)
+    sin_metadatos = etapas.calcular_huella(conexion, etapa)
+
+    conexion.execute("CREATE TABLE metadatos_de_tablas (nombre_tabla TEXT, nombre_columna TEXT, tipo_dato TEXT)")
+    conexion.execute("INSERT INTO metadatos_de_tablas VALUES ('tabla_consolidada', 'Rechazos', 'INTEGER')")
+    inicial = etapas.calcular_huella(conexion, etapa)
+    assert inicial != sin_metadatos
+    assert etapas.calcular_huella(conexion, etapa) == inicial
+
+    # Editar un tipo de dato no cambia la cantidad de filas ni el mayor rowid
+    conexion.execute("UPDATE metadatos_de_tablas SET tipo_dato = 'TEXT'")
+    assert etapas.calcular_huella(conexion, etapa) != inicial
@@ -0,0 +1,98 @@
+"""Pruebas de funciones.py."""
+import sqlite3
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import funciones as fn
+
+
+def mtime(año, mes, dia):
+    """Fecha de modificación en nanosegundos, como os.stat().st_mtime_ns."""
+    return int(datetime(año, mes, dia, 12).timestamp() * 1e9)
+
+
+def test_fecha_desde_nombre_ejemplo_documentado():
+    assert fn.fecha_desde_nombre('03.02 TOA.xlsx', mtime(2025, 3, 1)) == date(2025, 2, 3)
+
+
+def test_fecha_desde_nombre_año_anterior():
+    # Un día y mes posteriores a la fecha de modificación corresponden al año anterior
+    assert fn.fecha_desde_nombre('29.11 TOA.xlsx', mtime(2025, 2, 1)) == date(2024, 11, 29)
+    assert fn.fecha_desde_nombre('28.01 TOA.xlsx', mtime(2025, 2, 1)) == date(2025, 1, 28)
+
+
+def test_fecha_desde_nombre_sin_fecha():
+    assert fn.fecha_desde_nombre('TOA.xlsx', mtime(2025, 3, 1)) is None
+    assert fn.fecha_desde_nombre('31.02 TOA.xlsx', mtime(2025, 3, 1)) is None
+
+
+def test_parsear_fechas_igual_que_strptime():
+    valores = ['03/02/25 10:44 AM', '2025-02-03 09:45:00', '03/02/25 15:02:15', '03/02/25', '2025-02-03 09:48',
+               '03/02/2025 07:38 PM', '31/01/2025 13:04', ' 3/2/25 ', '2025-2-3 9:45:00', '31/02/25', 'sin fecha', '-', None, '03/02/25']
+    serie = pd.Series(valores, dtype=object)
+    resultado, no_convertidos = fn.parsear_fechas(serie)
+
+    def con_strptime(valor):
+        if valor is None or valor in fn.valores_fecha_vacios:
+            return pd.NaT
+        for formato in fn.formatos_fecha:
+            try:
+                return datetime.strptime(valor.strip(), formato)
+            except ValueError:
+                pass
+        return pd.NaT
+
+    esperado = pd.Series([con_strptime(v) for v in valores], dtype='datetime64[ns]')
+    pd.testing.assert_series_equal(resultado, esperado)
+    assert no_convertidos.tolist() == ['31/02/25', 'sin fecha']
+
+
+def base_con_metadatos(metadatos):
+    """Base de datos en memoria con 'metadatos_de_tablas' ({tabla: {columna: tipo_dato}})."""
+    conexion = sqlite3.connect(":memory:")
+    conexion.execute("CREATE TABLE metadatos_de_tablas (nombre_tabla TEXT, nombre_columna TEXT, tipo_dato TEXT)")
+    conexion.executemany("INSERT INTO metadatos_de_tablas VALUES (?, ?, ?)",
+                         [(tabla, col, tipo) for tabla, columnas in metadatos.items() for col, tipo in columnas.items()])
+    fn.limpiar_planes_conversion()
+    return conexion
+
+
+def test_actualizar_base_datos_clave_vacia_no_se_duplica():
+    # Las claves INTEGER vacías llegan a la base como NULL (las TEXT, según la versión de pandas, como 'nan')
+    conexion = base_con_metadatos({'tickets_TOA': {'Nro_TOA': 'INTEGER', 'Estado_TOA': 'TEXT'}})
+    for estado in ['a', 'b']:
+        df = pd.DataFrame({'Nro_TOA': [1, np.nan], 'Estado_TOA': [estado, estado]})
+        fn.actualizar_base_datos(conexion, 'tickets_TOA', df, 'Nro_TOA')
+    filas = conexion.execute('SELECT Nro_TOA, Estado_TOA FROM tickets_TOA ORDER BY Nro_TOA').fetchall()
+    assert filas == [(None, 'b'), (1, 'b')]
+
+
+def test_actualizar_base_datos_clave_compuesta_incompleta():
+    conexion = base_con_metadatos({'tickets_pr': {'Order_ID': 'INTEGER', 'Operation_Time': 'INTEGER',
+                                                  'Index': 'TEXT', 'Valor': 'TEXT'}})
+    for valor in ['a', 'b']:
+        df = pd.DataFrame({'Order_ID': [1, 2, np.nan], 'Operation_Time': [10, np.nan, np.nan], 'Valor': valor})
+        fn.actualizar_base_datos(conexion, 'tickets_pr', df, 'Index')
+    filas = conexion.execute('SELECT Order_ID, Operation_Time, Valor FROM tickets_pr').fetchall()
+    assert sorted(filas, key=str) == sorted([(1, 10, 'b'), (2, None, 'b'), (None, None, 'b')], key=str)
+
+
+def test_cache_excel_depende_del_lector(tmp_path, monkeypatch):
+    monkeypatch.setattr(fn, "carpeta_cache_excel", str(tmp_path / "cache"))
+    ruta = tmp_path / "archivo.xlsx"
+    ruta.write_bytes(b"contenido")
+    lecturas = []
+
+    def lector():
+        lecturas.append(1)
+        return pd.DataFrame({'a': [len(lecturas)]})
+
+    assert fn.usar_cache_excel(str(ruta), {}, lector)['a'].tolist() == [1]
+    assert fn.usar_cache_excel(str(ruta), {}, lector)['a'].tolist() == [1]
+    # Otro motor o una nueva versión del lector no usan los resultados guardados
+    monkeypatch.setattr(fn, "motor_excel", "pandas")
+    assert fn.usar_cache_excel(str(ruta), {}, lector)['a'].tolist() == [2]
+    monkeypatch.setattr(fn.lector_xlsx, "version", fn.lector_xlsx.version + 1)
+    assert fn.usar_cache_excel(str(ruta), {}, lector)['a'].tolist() == [3]
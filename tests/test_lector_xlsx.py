@@ -0,0 +1,148 @@
+"""Pruebas de paridad de lector_xlsx.leer_xlsx contra pd.read_excel (motor openpyxl)."""
+import glob
+import os
+import re
+import zipfile
+from datetime import date, datetime, time
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Font
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+import generar_datos_sinteticos as gds
+import lector_xlsx
+
+
+def comparar(ruta, **parametros):
+    """Verifica que ambos lectores devuelvan el mismo DataFrame (valores, tipos y columnas)."""
+    esperado = pd.read_excel(ruta, engine="openpyxl", **parametros)
+    obtenido = lector_xlsx.leer_xlsx(ruta, **parametros)
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def guardar(libro, ruta):
+    libro.save(ruta)
+    return str(ruta)
+
+
+def reemplazar_en_hoja(ruta, patron, reemplazo):
+    """Reescribe el XML de la primera hoja (para casos que openpyxl no genera, como textos en línea)."""
+    with zipfile.ZipFile(ruta) as paquete:
+        partes = {nombre: paquete.read(nombre) for nombre in paquete.namelist()}
+    hoja = "xl/worksheets/sheet1.xml"
+    partes[hoja] = re.sub(patron, reemplazo, partes[hoja].decode("utf-8")).encode("utf-8")
+    with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as paquete:
+        for nombre, contenido in partes.items():
+            paquete.writestr(nombre, contenido)
+
+
+@pytest.fixture
+def libro_tipos(tmp_path):
+    """Hoja con textos compartidos, números, booleanos, fechas, horas, errores y celdas vacías."""
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Texto", "Entero", "Decimal", "Booleano", "Fecha", "FechaHora", "Hora", "Error", "Vacia"])
+    hoja.append(["uno", 1, 1.5, True, date(2025, 2, 3), datetime(2025, 2, 3, 10, 44), time(9, 45), "#N/A", None])
+    hoja.append(["dos", 2.0, 3.25, False, date(2024, 11, 29), datetime(2024, 11, 29, 23, 59, 59), time(0, 0), "#DIV/0!", None])
+    hoja.append([None, None, None, None, None, None, None, None, None])
+    hoja.append(["tres", 30000000001, -0.1, None, None, datetime(2025, 1, 1), None, "#VALUE!", None])
+    hoja["A6"].font = Font(bold=True)  # celda vacía con estilo al final
+    return guardar(libro, tmp_path / "tipos.xlsx")
+
+
+def test_tipos_de_celda(libro_tipos):
+    comparar(libro_tipos)
+
+
+def test_usecols(libro_tipos):
+    comparar(libro_tipos, usecols=["FechaHora", "Texto", "Error"])
+
+
+def test_dtype(libro_tipos):
+    comparar(libro_tipos, dtype={"Entero": str, "Texto": str})
+    comparar(libro_tipos, dtype=str)
+
+
+def test_skiprows_y_hoja_por_nombre(tmp_path):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.title = "Datos"
+    hoja.append(["Reporte de incidencias"])
+    hoja.append([])
+    hoja.append(["ID de la incidencia*+", "Estado*", "Fecha de envío"])
+    hoja.append(["INC0000001", "Cerrado", "03/02/2025 10:44:00"])
+    hoja.append(["INC0000002", "Asignado", datetime(2025, 2, 4, 8, 0)])
+    ruta = guardar(libro, tmp_path / "remedy.xlsx")
+    comparar(ruta, skiprows=2)
+    comparar(ruta, sheet_name="Datos", skiprows=2, usecols=["Estado*"])
+
+
+def test_encabezados_duplicados_y_filas_incompletas(tmp_path):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Codigo", "Nombre", "Codigo", "Nombre", None])
+    hoja.append(["LI00001", "Sitio 1"])
+    hoja["D3"] = "solo D"
+    hoja["A5"] = "LI00005"
+    ruta = guardar(libro, tmp_path / "duplicados.xlsx")
+    comparar(ruta)
+
+
+def test_textos_en_linea(tmp_path):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Notas", "Resumen"])
+    hoja.append([123, 456])
+    hoja.append(["texto compartido", "otro"])
+    ruta = guardar(libro, tmp_path / "textos.xlsx")
+    # openpyxl guarda los textos como compartidos; los números se reemplazan por textos en línea,
+    # uno simple y otro enriquecido (con tramos de formato)
+    reemplazar_en_hoja(ruta, r'<c r="A2"([^>]*?)( t="n")?><v>123</v></c>',
+                       r'<c r="A2" t="inlineStr"><is><r><rPr><b/></rPr><t xml:space="preserve">Alarma: </t></r>'
+                       r'<r><t>AC failure</t></r></is></c>')
+    reemplazar_en_hoja(ruta, r'<c r="B2"([^>]*?)( t="n")?><v>456</v></c>',
+                       r'<c r="B2" t="inlineStr"><is><t xml:space="preserve"> en línea </t></is></c>')
+    with zipfile.ZipFile(ruta) as paquete:
+        hoja = paquete.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert '<rPr><b/></rPr>' in hoja and ' en línea ' in hoja
+    comparar(ruta)
+
+
+def test_texto_enriquecido_compartido(tmp_path):
+    # openpyxl escribe textos enriquecidos desde la versión 3.1
+    rich_text = pytest.importorskip("openpyxl.cell.rich_text")
+    texto = pytest.importorskip("openpyxl.cell.text")
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(["Notas"])
+    hoja.append([rich_text.CellRichText("Alarma: ", rich_text.TextBlock(texto.InlineFont(b=True), "AC failure"))])
+    ruta = guardar(libro, tmp_path / "enriquecido.xlsx")
+    comparar(ruta)
+
+
+def test_calendario_1904(tmp_path):
+    libro = Workbook()
+    libro.epoch = CALENDAR_MAC_1904
+    hoja = libro.active
+    hoja.append(["Fecha", "FechaHora"])
+    hoja.append([date(2025, 2, 3), datetime(2025, 2, 3, 10, 44)])
+    hoja.append([date(1904, 1, 2), datetime(2000, 2, 29, 12, 0)])
+    ruta = guardar(libro, tmp_path / "1904.xlsx")
+    comparar(ruta)
+
+
+def test_archivos_sinteticos(tmp_path):
+    base_path = gds.generar(str(tmp_path), 200, semilla=1, archivos=1)['base_path']
+    archivos = {
+        "TOA base": {},
+        os.path.join("Autin base", "Autin Tickets"): {},
+        os.path.join("DATA", "SITIOS"): {},
+        "Remedy base": {'skiprows': 2},
+    }
+    for carpeta, parametros in archivos.items():
+        rutas = [r for r in glob.glob(os.path.join(base_path, carpeta, "*.xlsx")) if "alarmas" not in r]
+        assert rutas, carpeta
+        for ruta in rutas:
+            comparar(ruta, **parametros)
@@ -0,0 +1,33 @@
+"""Pruebas de remedy_logic.py."""
+import os
+import sqlite3
+
+import pandas as pd
+
+import funciones as fn
+import generar_datos_sinteticos as gds
+import remedy_logic
+
+
+def test_cargar_base_remedy_lee_cada_exportacion_una_vez(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(fn, "tamano_max_cache", 0)
+    base_path = gds.generar(str(tmp_path), 200, semilla=1, archivos=2)['base_path']
+    carpeta_remedy = os.path.join(base_path, remedy_logic.carpeta_base)
+    conexion = sqlite3.connect(":memory:")
+
+    primera = remedy_logic.cargar_base_remedy(conexion, carpeta_remedy)
+    assert capsys.readouterr().out.count("Procesando archivo") == 2
+    assert not os.path.exists(os.path.join(carpeta_remedy, "old"))
+
+    # Las exportaciones ya cargadas no se vuelven a leer y las fechas guardadas se conservan
+    segunda = remedy_logic.cargar_base_remedy(conexion, carpeta_remedy)
+    assert "Procesando archivo" not in capsys.readouterr().out
+    assert len(primera) > 0
+    pd.testing.assert_frame_equal(segunda.reset_index(drop=True), primera.reset_index(drop=True))
+
+    # Fecha_inicio_incidente corresponde a la de la exportación (día primero)
+    exportaciones = pd.concat([pd.read_excel(os.path.join(carpeta_remedy, nombre), skiprows=2)
+                               for nombre in sorted(os.listdir(carpeta_remedy)) if nombre.startswith("Remedy_")])
+    fechas = exportaciones.drop_duplicates("ID de la incidencia*+", keep="last").set_index("ID de la incidencia*+")
+    esperadas = pd.to_datetime(fechas.loc[primera["ID_incidencia"], "Fecha inicio incidente"], dayfirst=True)
+    assert (primera["Fecha_inicio_incidente"].values == esperadas.values).all()